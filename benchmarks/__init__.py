@@ -0,0 +1,81 @@
+""" curd组件的性能测试脚本，每一个模块都可以单独运行，比如:
+        python -m benchmarks.row_render
+
+    benchmarks.suite在临时数据库中生成指定规模的数据，测试列表页面、搜索、组合搜索、编辑页面和批量操作，
+    并与benchmarks/baseline.json比较查询次数和相对同一次运行中参考场景的延迟比值，出现退化时返回非0的退出码:
+        python -m benchmarks.suite --scale 10k --output result.json
+
+"""
+
+import math
+import os
+import time
+
+
+def setup():
+    """ 初始化Django环境 """
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'seconds.settings')
+    import django
+    django.setup()
+
+
+def setup_database():
+    """ 创建一个临时的测试数据库并执行迁移，不会影响项目的数据库，需要访问数据库的测试脚本使用 """
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def measure(func, repeat):
+    """ 多次执行func，返回每次执行耗时(秒)的中位数
+    Args:
+        func: 要测试的函数
+        repeat: 执行次数
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def make_models(count, app_label='trial'):
+    """ 动态生成count个不对应数据表的模型类，用来模拟注册了大量模型类的项目
+    Args:
+        count: 模型类的数量
+        app_label: 模型类所属的应用
+    Return:
+        模型类组成的列表
+    """
+
+    from django.db import models
+
+    model_list = []
+    for i in range(count):
+        meta = type('Meta', (), {"app_label": app_label, "managed": False})
+        model_list.append(type('Synthetic%s' % i, (models.Model, ), {
+            "__module__": 'benchmarks',
+            "Meta": meta,
+            "name": models.CharField(max_length=32),
+        }))
+    return model_list
+
+
+def percentile(sorted_values, percent):
+    """ 计算百分位数(nearest-rank)
+    Args:
+        sorted_values: 升序排列的数值列表
+        percent: 百分位，比如50、90、99
+    """
+
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
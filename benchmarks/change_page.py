@@ -0,0 +1,58 @@
+""" 编辑页面渲染的基准测试，对比缓存表单类和popup链接前后的耗时
+    运行方式: python -m benchmarks.change_page --repeat 200
+
+"""
+
+import argparse
+from unittest import mock
+
+from benchmarks import setup, setup_database, measure
+
+setup()
+
+from django.test import Client
+from django.urls import reverse
+
+from curd.service import sites
+from curd.templatetags import popup
+from trial import models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_database()
+    publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+    book = models.Book.objects.create(book_name='图书', price=10, publish=publish)
+    book.authors.set([models.Author.objects.create(author_name='作者%s' % i, age=30, gender=1) for i in range(3)])
+
+    config_obj = sites.site.get_config('trial', 'book')
+    url = reverse('curd:trial_book_change', args=(book.pk, ))
+    client = Client()
+
+    def legacy():
+        """ 优化之前: 每次请求都重新生成表单类，popup链接每个字段都调用reverse() """
+
+        with mock.patch.object(popup, 'cached_reverse', reverse):
+            for key in [key for key in config_obj._cache if isinstance(key, tuple) and key[0] == 'model_form_class']:
+                del config_obj._cache[key]
+            client.get(url)
+
+    # 不使用BookModelForm，测试默认生成的ViewModelForm
+    with mock.patch.object(type(config_obj), 'model_form_class', None):
+        client.get(url)             # 预热模板等缓存
+        before = measure(legacy, args.repeat)
+        after = measure(lambda: client.get(url), args.repeat)
+        build = measure(config_obj.build_model_form_class, args.repeat)
+        cached = measure(config_obj.get_model_form_class, args.repeat)
+
+    print('get_model_form_class: build %8.3f us, cached %8.3f us' % (build * 1e6, cached * 1e6))
+    print('before: %8.3f ms/request' % (before * 1e3))
+    print('after:  %8.3f ms/request' % (after * 1e3))
+    print('speedup: %.2fx' % (before / after))
+
+
+if __name__ == '__main__':
+    main()
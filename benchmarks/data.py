@@ -0,0 +1,125 @@
+""" 为trial应用生成测试数据，使用bulk_create分批写入，内存占用不会随着数据量增加
+    运行方式: python -m benchmarks.data --books 100000
+
+"""
+
+import argparse
+import random
+import sys
+import time
+from itertools import islice
+
+from benchmarks import setup
+
+SCALES = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+    '1m': 1000000,
+    '10m': 10000000,
+}
+
+
+def batched(iterable, batch_size):
+    """ 将生成器分成每一批batch_size个元素的列表 """
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def reset_sequences(model_list):
+    """ 指定了id写入记录时数据库的序列不会更新，将序列重置为表中最大的id，SQLite等没有序列的数据库不需要处理
+    Args:
+        model_list: 模型类组成的列表
+    """
+
+    from django.core.management.color import no_style
+    from django.db import connection
+
+    sql_list = connection.ops.sequence_reset_sql(no_style(), model_list)
+    if sql_list:
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
+
+
+def parse_scale(scale):
+    """ 将数据规模转换成图书数量，可以是数字或者SCALES中的名称，不区分大小写 """
+
+    return SCALES.get(str(scale).lower()) or int(scale)
+
+
+def populate(books, authors=None, publishers=None, fanout=3, batch_size=5000, seed=0, stdout=None):
+    """ 生成图书、作者、出版社以及图书与作者的多对多关系。记录的id从1开始连续分配，
+        不需要数据库返回bulk_create生成的id，写入之后重置数据库的序列(PostgreSQL等)，之后新增的记录不会主键冲突
+    Args:
+        books: 图书的数量
+        authors: 作者的数量，默认为图书数量的1/10
+        publishers: 出版社的数量，默认为图书数量的1/1000
+        fanout: 每本图书的作者数量
+        batch_size: 每一批生成并写入的记录数
+        seed: 随机数种子，同样的参数生成同样的数据
+        stdout: 输出进度的文件对象
+    Return:
+        {"books": 图书数量, "authors": 作者数量, "publishers": 出版社数量, "book_authors": 多对多关系数量}
+    """
+
+    from trial import models
+
+    authors = authors or max(books // 10, fanout, 10)
+    publishers = publishers or max(books // 1000, 10)
+    fanout = min(fanout, authors)
+    rand = random.Random(seed)
+
+    def write(model_class, objs, total):
+        start = time.perf_counter()
+        for batch in batched(objs, batch_size):
+            model_class.objects.bulk_create(batch)          # 数据库对一条语句的参数个数有限制时由Django再拆分
+        if stdout is not None:
+            stdout.write('%s: %s条，%.1fs\n' % (model_class._meta.label, total, time.perf_counter() - start))
+
+    write(models.Publish, (
+        models.Publish(id=i, publish_name='出版社%s' % i, city='城市%s' % (i % 50), email='p%s@example.com' % i)
+        for i in range(1, publishers + 1)
+    ), publishers)
+    write(models.Author, (
+        models.Author(id=i, author_name='作者%s' % i, age=20 + i % 60, gender=1 + i % 2)
+        for i in range(1, authors + 1)
+    ), authors)
+    write(models.Book, (
+        models.Book(id=i, book_name='图书%s' % i, price=i % 1000, publish_id=rand.randint(1, publishers))
+        for i in range(1, books + 1)
+    ), books)
+
+    through = models.Book.authors.through
+    author_range = range(1, authors + 1)
+    write(through, (
+        through(book_id=book_id, author_id=author_id)
+        for book_id in range(1, books + 1)
+        for author_id in rand.sample(author_range, fanout)
+    ), books * fanout)
+    reset_sequences([models.Publish, models.Author, models.Book, through])
+
+    return {"books": books, "authors": authors, "publishers": publishers, "book_authors": books * fanout}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', default='1k', help='图书数量，可以是数字或者%s' % '/'.join(SCALES))
+    parser.add_argument('--authors', type=int, default=None)
+    parser.add_argument('--publishers', type=int, default=None)
+    parser.add_argument('--fanout', type=int, default=3, help='每本图书的作者数量')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup()
+    books = parse_scale(args.books)
+    populate(books, args.authors, args.publishers, args.fanout, args.batch_size, stdout=sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+""" 列表页面表格渲染的微基准测试，对比优化前后每一行数据的生成耗时
+    运行方式: python -m benchmarks.row_render --rows 500
+
+"""
+
+import argparse
+from unittest import mock
+
+from benchmarks import setup, measure
+
+setup()
+
+from curd.service import sites
+from curd.service.views import ShowView
+from curd.service import profiler
+from curd.service.profiler import ColumnProfiler
+from trial import models
+
+
+class RenderConfig(sites.CURDConfig):
+    def price_display(self, obj=None, is_header=False):
+        if is_header:
+            return '价格'
+        return '￥%s' % obj.price
+
+    price_display.depends_on = ('price', )
+
+    list_display = ['book_name', 'price', 'publish', price_display]
+
+    def get_list_display(self):
+        """ 不包含删除/编辑链接，避免reverse()的耗时掩盖渲染本身的开销 """
+
+        return [RenderConfig.checkbox] + self.list_display
+
+
+def legacy_td_list(show_obj):
+    """ 优化之前的td_list实现，每一行都会调用get_list_display()，每一个单元格都要做类型判断 """
+
+    def generator_tr(objects):
+        def generator_td(obj):
+            if show_obj.config_obj.get_list_display():
+                for field in show_obj.list_display:
+                    if isinstance(field, str):
+                        val = getattr(obj, field)
+                    else:
+                        val = field(show_obj.config_obj, obj, is_header=False)
+                    yield val
+            else:
+                yield from show_obj.config_obj.model_class.objects.all()
+        yield from [generator_td(obj) for obj in objects]
+    return generator_tr(show_obj.page_data_list)
+
+
+def make_show_obj(rows):
+    """ 不经过数据库，直接使用内存中的记录对象构造ShowView """
+
+    publish = models.Publish(id=1, publish_name='出版社', city='北京', email='p@example.com')
+    book_list = []
+    for i in range(rows):
+        book = models.Book(id=i + 1, book_name='图书%s' % i, price=i, publish=publish)
+        book_list.append(book)
+
+    config_obj = RenderConfig(models.Book, sites.site).bind_request(None)
+    show_obj = ShowView.__new__(ShowView)
+    show_obj.config_obj = config_obj
+    show_obj.model_class = models.Book
+    show_obj.list_display = config_obj.get_list_display()
+    show_obj.columns = config_obj.get_list_columns(show_obj.list_display)
+    show_obj.page_data_list = book_list
+    show_obj.profiler = None
+    return show_obj
+
+
+def consume(rows):
+    """ 模拟模板遍历每一个单元格 """
+
+    for tr in rows:
+        for td in tr:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    show_obj = make_show_obj(args.rows)
+    before = measure(lambda: consume(legacy_td_list(show_obj)), args.repeat)
+    after = measure(lambda: consume(show_obj.td_list()), args.repeat)
+
+    print('rows: %s, columns: %s' % (args.rows, len(show_obj.list_display)))
+    print('before: %8.3f us/row' % (before / args.rows * 1e6))
+    print('after:  %8.3f us/row' % (after / args.rows * 1e6))
+    print('speedup: %.2fx' % (before / after))
+
+    # 开启各列耗时统计(?_profile=1)时的额外开销
+    show_obj.profiler = ColumnProfiler(show_obj.config_obj, show_obj.columns)
+    with mock.patch.object(profiler, 'logger'):
+        profiled = measure(lambda: consume(show_obj.td_list()), args.repeat)
+    print('profiled: %8.3f us/row' % (profiled / args.rows * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+""" 项目启动耗时的基准测试，对比注册大量模型类时立即导入配置类和按路径延迟注册的耗时。
+    每个模型类的配置类和ModelForm放在单独生成的模块中，
+    启动耗时包括导入模块和注册，第一次反向解析时Django会为所有路由生成反向解析的数据，两种方式相同
+    运行方式: python -m benchmarks.startup --models 200
+
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from importlib import import_module
+
+from benchmarks import setup, make_models
+
+setup()
+
+from django.urls import clear_url_caches
+from django.urls.resolvers import URLResolver, RegexPattern
+
+from curd.service import sites
+
+
+MODULE_TEMPLATE = '''from django.apps import apps
+from django.forms import ModelForm, widgets
+from curd.service import sites
+
+model_class = apps.get_model('trial', '%(name)s')
+
+
+class %(name)sModelForm(ModelForm):
+    class Meta:
+        model = model_class
+        fields = '__all__'
+        widgets = {
+            'name': widgets.TextInput(attrs={"class": 'form-control'}),
+        }
+
+
+class %(name)sConfig(sites.CURDConfig):
+    list_display = ['name']
+    search_list = ['name__contains']
+    model_form_class = %(name)sModelForm
+'''
+
+
+def write_package(directory, package, model_list):
+    """ 为每个模型类生成一个包含配置类的模块
+    Return:
+        [(模型类, 配置类的路径)]
+    """
+
+    os.makedirs(os.path.join(directory, package))
+    open(os.path.join(directory, package, '__init__.py'), 'w').close()
+    config_list = []
+    for model_class in model_list:
+        name = model_class.__name__
+        with open(os.path.join(directory, package, '%s.py' % name.lower()), 'w') as f:
+            f.write(MODULE_TEMPLATE % {"name": name})
+        config_list.append((model_class, '%s.%s.%sConfig' % (package, name.lower(), name)))
+    return config_list
+
+
+def start(config_list, lazy):
+    """ 模拟项目启动: 注册所有模型类并加载路由，然后执行第一次反向解析(第一个请求)
+    Return:
+        (CURDSite对象, 启动耗时, 第一次反向解析的耗时)
+    """
+
+    start_time = time.perf_counter()
+    site = sites.CURDSite(enable_api=True)
+    for model_class, config_path in config_list:
+        if lazy:
+            site.register(model_class, config_path)
+        else:
+            module_path, _, class_name = config_path.rpartition('.')
+            site.register(model_class, getattr(import_module(module_path), class_name))
+    resolver = URLResolver(RegexPattern(r'^/'), [site.urls[0][0]])
+    startup = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    resolver.reverse('trial_%s_show' % config_list[-1][0]._meta.model_name)
+    return site, startup, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--models', type=int, default=200)
+    args = parser.parse_args()
+
+    model_list = make_models(args.models)
+    directory = tempfile.mkdtemp()
+    sys.path.insert(0, directory)
+    eager_list = write_package(directory, 'curd_bench_eager', model_list)
+    lazy_list = write_package(directory, 'curd_bench_lazy', model_list)
+
+    eager_site, eager, eager_reverse = start(eager_list, lazy=False)
+    clear_url_caches()
+    lazy_site, lazy, lazy_reverse = start(lazy_list, lazy=True)
+
+    # 第一次访问某个模型类的url时才导入配置类
+    path = 'trial/%s/' % model_list[0]._meta.model_name
+    start_time = time.perf_counter()
+    lazy_site.urls[0][0].resolve(path)
+    first_hit = time.perf_counter() - start_time
+
+    print('models: %s' % args.models)
+    print('startup:       eager %8.3f ms, lazy %8.3f ms' % (eager * 1e3, lazy * 1e3))
+    print('first reverse: eager %8.3f ms, lazy %8.3f ms' % (eager_reverse * 1e3, lazy_reverse * 1e3))
+    print('lazy first hit of one model: %8.3f ms' % (first_hit * 1e3))
+    print('imported config modules: eager %s, lazy %s' % (
+        len([name for name in sys.modules if name.startswith('curd_bench_eager.')]),
+        len([name for name in sys.modules if name.startswith('curd_bench_lazy.')]),
+    ))
+
+
+if __name__ == '__main__':
+    main()
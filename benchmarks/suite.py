@@ -0,0 +1,208 @@
+""" trial应用的场景测试: 在临时数据库中生成指定规模的数据，使用Django的测试客户端依次请求各个场景，
+    记录每个场景的延迟百分位数和查询次数，写入json文件，并与保存的基准结果比较，出现退化时返回非0的退出码。
+    不同机器的绝对延迟不能比较，每个场景的p50除以同一次运行中参考场景(不经过curd的ORM查询)的p50，比较这个比值
+    运行方式:
+        python -m benchmarks.suite --scale 10k --output result.json
+        python -m benchmarks.suite --scale 1k --update-baseline         # 更新benchmarks/baseline.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks import setup, setup_database, percentile
+
+setup()
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from benchmarks.data import SCALES, parse_scale, populate
+from curd.service import sites
+from trial import models
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def get_scenarios(counts):
+    """ 生成要测试的场景
+    Args:
+        counts: populate()的返回值
+    Return:
+        [(场景名称, 请求方法, url, 参数)]
+    """
+
+    book_config = sites.site.get_config('trial', 'book')
+    last_page = max(counts['books'] // book_config.per_page_count, 1)
+    first_author_ids = [str(i) for i in range(1, 11)]
+    return [
+        ('list_first_page', 'get', reverse('curd:trial_book_show'), {}),
+        ('list_middle_page', 'get', reverse('curd:trial_book_show'), {"page": max(last_page // 2, 1)}),
+        ('list_last_page', 'get', reverse('curd:trial_book_show'), {"page": last_page}),
+        ('search', 'get', reverse('curd:trial_author_show'), {"query": '作者12'}),
+        ('combain_filter', 'get', reverse('curd:trial_book_show'), {"authors": ['1', '2'], "publish": '1'}),
+        ('change_page', 'get', reverse('curd:trial_book_change', args=(1, )), {}),
+        ('bulk_action', 'post', reverse('curd:trial_author_show'), {
+            "action": 'bulk_update', "id": first_author_ids, "_update_field": 'age', "_update_value": '40',
+        }),
+    ]
+
+
+REFERENCE_TEMPLATE = Template(
+    '<table>{% for book in book_list %}'
+    '<tr><td>{{ book.book_name }}</td><td>{{ book.price }}</td><td>{{ book.publish }}</td></tr>'
+    '{% endfor %}</table>'
+)
+
+
+def reference_workload():
+    """ 参考场景: 不经过curd，直接使用ORM查询一页图书及其出版社，再用Django模板渲染成表格，
+        它的耗时只与机器、数据库和Django的性能有关，用来换算其他场景的延迟
+    """
+
+    per_page = sites.site.get_config('trial', 'book').per_page_count
+    book_list = models.Book.objects.select_related('publish').order_by('pk')[:per_page]
+    return REFERENCE_TEMPLATE.render(Context({"book_list": book_list}))
+
+
+def request_workload(client, method, url, data):
+    """ 生成请求一个场景的函数，响应状态码为4xx/5xx时抛出异常 """
+
+    request = getattr(client, method)
+
+    def inner():
+        response = request(url, data)
+        if response.status_code >= 400:
+            raise RuntimeError('%s %s 返回了%s' % (method.upper(), url, response.status_code))
+    return inner
+
+
+def run_scenario(func, repeat, warmup):
+    """ 执行一个场景
+    Args:
+        func: 执行一次场景的函数
+        repeat: 执行次数
+        warmup: 预热次数，预热模板、url、组合搜索选项等缓存
+    Return:
+        {"p50": 毫秒, "p90": 毫秒, "p99": 毫秒, "mean": 毫秒, "queries": 最多的查询次数}
+    """
+
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, len(context.captured_queries))
+    timings.sort()
+    return {
+        "p50": round(percentile(timings, 50), 3),
+        "p90": round(percentile(timings, 90), 3),
+        "p99": round(percentile(timings, 99), 3),
+        "mean": round(sum(timings) / len(timings), 3),
+        "queries": queries,
+    }
+
+
+def compare(results, baseline, tolerance, compare_ratio=True):
+    """ 与基准结果比较，查询次数增加，或者p50与参考场景p50的比值超过基准的(1 + tolerance)倍视为退化
+    Args:
+        results: 本次的结果
+        baseline: 基准结果
+        tolerance: 允许的比值增加比例
+        compare_ratio: 是否比较延迟的比值，数据规模不同时只比较查询次数
+    Return:
+        退化描述组成的列表
+    """
+
+    regressions = []
+    for name, result in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append('%s: 查询次数 %s -> %s' % (name, base['queries'], result['queries']))
+        if compare_ratio and 'ratio' in base and result['ratio'] > base['ratio'] * (1 + tolerance):
+            regressions.append('%s: p50/参考场景 %.2f -> %.2f' % (name, base['ratio'], result['ratio']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='1k', help='图书数量，可以是数字或者%s' % '/'.join(SCALES))
+    parser.add_argument('--fanout', type=int, default=3, help='每本图书的作者数量')
+    parser.add_argument('--repeat', type=int, default=50, help='每个场景的请求次数')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--output', help='结果写入的json文件')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基准结果的json文件')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='允许的p50/参考场景比值增加比例')
+    parser.add_argument('--update-baseline', action='store_true', help='将本次结果保存为基准结果')
+    args = parser.parse_args()
+
+    setup_database()
+    cache.clear()
+    start = time.perf_counter()
+    counts = populate(parse_scale(args.scale), fanout=args.fanout)
+    sites.site.get_config('trial', 'author').get_search_backend().rebuild()
+    sys.stdout.write('生成数据%s，%.1fs\n' % (counts, time.perf_counter() - start))
+
+    client = Client()
+    results = {
+        "scale": args.scale.lower(),
+        "counts": counts,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "scenarios": {},
+    }
+    reference = results['reference'] = run_scenario(reference_workload, args.repeat, args.warmup)
+    sys.stdout.write('%-18s p50 %8.3fms  p90 %8.3fms  p99 %8.3fms  %3s次查询\n' % (
+        'reference', reference['p50'], reference['p90'], reference['p99'], reference['queries']
+    ))
+    for name, method, url, data in get_scenarios(counts):
+        result = run_scenario(request_workload(client, method, url, data), args.repeat, args.warmup)
+        result['ratio'] = round(result['p50'] / max(reference['p50'], 0.001), 3)
+        results['scenarios'][name] = result
+        sys.stdout.write('%-18s p50 %8.3fms  p90 %8.3fms  p99 %8.3fms  %3s次查询  %6.2fx\n' % (
+            name, result['p50'], result['p90'], result['p99'], result['queries'], result['ratio']
+        ))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        sys.stdout.write('已更新基准结果: %s\n' % args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    same_scale = baseline.get('counts') == counts
+    if not same_scale:
+        sys.stdout.write('基准结果的数据规模为%s，只比较查询次数\n' % baseline.get('counts'))
+    regressions = compare(results, baseline, args.tolerance, compare_ratio=same_scale)
+    if regressions:
+        sys.stdout.write('性能退化:\n  %s\n' % '\n  '.join(regressions))
+        sys.exit(1)
+    sys.stdout.write('与基准结果相比没有退化\n')
+
+
+if __name__ == '__main__':
+    main()
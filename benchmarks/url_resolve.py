@@ -0,0 +1,70 @@
+""" 路由生成和匹配的基准测试，对比逐个匹配所有模型类的正则和按"<app>/<model>/"字典分发的耗时
+    运行方式: python -m benchmarks.url_resolve --models 200
+
+"""
+
+import argparse
+
+from benchmarks import setup, measure, make_models
+
+setup()
+
+from django.urls import URLResolver
+from django.urls.resolvers import RegexPattern
+
+from curd.service import sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--models', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    site = sites.CURDSite(enable_api=True)
+    model_list = make_models(args.models)
+    for model_class in model_list:
+        site.register(model_class)
+
+    # 最后注册的模型类在列表的末尾，逐个匹配时最慢
+    last = model_list[-1]._meta.model_name
+    path_list = ['trial/%s/' % last, 'trial/%s/1/change/' % last, 'api/trial/%s/1/' % last]
+
+    def clear_config_urls():
+        for config_obj in site._registry.values():
+            config_obj._cache.pop('urls', None)
+            config_obj._cache.pop('api_urls', None)
+
+    def legacy_build():
+        """ 优化之前: 每次访问urls都重新生成所有模型类的路由 """
+
+        clear_config_urls()
+        return site.get_urls()
+
+    def build():
+        """ 优化之后: 从头生成路由以及按前缀分发的字典 """
+
+        clear_config_urls()
+        site.clear_urls()
+        return site.get_url_map()
+
+    # 优化之前: 匹配时逐个尝试所有模型类的路由
+    build_before = measure(legacy_build, 20)
+    legacy_resolver = URLResolver(RegexPattern(r''), site.get_urls())
+    resolve_before = measure(lambda: [legacy_resolver.resolve(path) for path in path_list], args.repeat)
+
+    build_after = measure(build, 20)
+    cached_after = measure(site.get_url_map, args.repeat)        # 生成之后每次访问直接返回缓存
+    resolver = site.urls[0][0]
+    resolve_after = measure(lambda: [resolver.resolve(path) for path in path_list], args.repeat)
+
+    print('models: %s' % args.models)
+    print('build urls:   before %8.3f ms, after %8.3f ms' % (build_before * 1e3, build_after * 1e3))
+    print('cached urls:  after %8.3f us' % (cached_after * 1e6))
+    print('resolve x%s:  before %8.3f us, after %8.3f us' % (
+        len(path_list), resolve_before * 1e6, resolve_after * 1e6))
+    print('speedup: %.2fx' % (resolve_before / resolve_after))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,27 @@
-from django.apps import AppConfig
+from importlib import import_module
+
+from django.apps import AppConfig, apps
+from django.utils.module_loading import module_has_submodule
 
 
 class CurdConfig(AppConfig):
     name = 'curd'
+
+    def ready(self):
+        """ 项目启动时注册所有应用的模型类:
+            1. 应用的AppConfig中定义了curd_configs({模型类名: 配置类的路径})时延迟注册，
+               不导入配置类所在的模块，第一次访问该模型类的url时才导入
+            2. 否则导入应用中的curd.py文件，由其中的site.register()注册
+
+        """
+
+        from curd.service.sites import site
+
+        for app_config in apps.get_app_configs():
+            curd_configs = getattr(app_config, 'curd_configs', None)
+            if curd_configs is None:
+                if app_config is not self and module_has_submodule(app_config.module, 'curd'):
+                    import_module('%s.curd' % app_config.name)
+                continue
+            for model_name, config_path in curd_configs.items():
+                site.register('%s.%s' % (app_config.label, model_name), config_path)
@@ -0,0 +1,58 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+
+from curd.service.sites import site
+from curd.service.importer import IMPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = '从CSV/JSONL文件中分批导入一个模型类的记录，使用该模型类config对象的ModelForm校验每一行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='要导入的模型类，格式为"app_label.model_name"')
+        parser.add_argument('file', help='要导入的文件，"-"表示标准输入')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='文件格式，默认根据文件后缀判断')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+        parser.add_argument('--chunk-size', type=int, help='每一批校验和写入的行数，默认为config对象的import_chunk_size')
+        parser.add_argument('--batch-size', type=int, help='每一条INSERT/UPDATE语句包含的记录数')
+        parser.add_argument('--report', help='错误报告文件的路径(CSV格式)，默认输出到标准错误')
+
+    def handle(self, *args, **options):
+        app_label, _, model_name = options['model'].lower().partition('.')
+        config_obj = site.get_config(app_label, model_name)
+        if config_obj is None:
+            raise CommandError('模型%s没有注册' % options['model'])
+        import_format = options['format'] or os.path.splitext(options['file'])[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError('不支持的导入格式: %s，可以使用--format指定' % import_format)
+
+        config_obj = config_obj.bind_request(HttpRequest())
+        importer = config_obj.get_importer(dry_run=options['dry_run'])
+        if options['chunk_size']:
+            importer.chunk_size = options['chunk_size']
+        if options['batch_size']:
+            importer.batch_size = options['batch_size']
+
+        def progress(count):
+            self.stdout.write('已处理%s行' % count)
+
+        if options['file'] == '-':
+            text_file = sys.stdin
+        else:
+            text_file = open(options['file'], encoding='utf-8-sig', newline='')
+        if options['report']:
+            report_file = open(options['report'], 'w', encoding='utf-8-sig', newline='')
+        else:
+            report_file = self.stderr
+            report_file.ending = ''             # csv.writer写入的每一行已经包含换行符
+        try:
+            result = importer.run(text_file, import_format, report_file=report_file, progress=progress)
+        finally:
+            if text_file is not sys.stdin:
+                text_file.close()
+            if options['report']:
+                report_file.close()
+        self.stdout.write(str(result))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from curd.service.sites import site
+
+
+class Command(BaseCommand):
+    help = '重建使用了全文索引搜索后端(FullTextSearchBackend)的模型类的索引表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='要重建索引的模型类，格式为"app_label.model_name"，默认为全部')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每一批写入索引的记录数')
+
+    def handle(self, *args, **options):
+        config_list = []
+        if options['models']:
+            for label in options['models']:
+                app_label, _, model_name = label.lower().partition('.')
+                config_obj = site.get_config(app_label, model_name)
+                if config_obj is None:
+                    raise CommandError('模型%s没有注册' % label)
+                config_list.append(config_obj)
+        else:
+            config_list = list(site._registry.values())
+
+        for config_obj in config_list:
+            backend = config_obj.get_search_backend()
+            count = backend.rebuild(batch_size=options['batch_size'])
+            if count or getattr(backend, 'index_fields', None):
+                self.stdout.write('%s.%s: 写入%s条记录' % (config_obj.get_app_model() + (count, )))
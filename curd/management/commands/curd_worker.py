@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from curd.service.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = '执行列表页面提交的后台任务(批量操作action、导出)，只依赖数据库，不需要消息队列'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='同时执行任务的线程数')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='没有任务时的轮询间隔(秒)')
+        parser.add_argument('--once', action='store_true', help='执行完当前所有等待执行的任务后退出')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            thread_count=max(options['workers'], 1),
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            stdout=self.stdout
+        )
+        self.stdout.write('后台任务进程%s已启动，线程数: %s' % (worker.name, worker.thread_count))
+        worker.run()
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_label', models.CharField(max_length=100, verbose_name='应用名')),
+                ('model_name', models.CharField(max_length=100, verbose_name='模型名')),
+                ('action', models.CharField(max_length=100, verbose_name='任务')),
+                ('params', models.TextField(default='{}', verbose_name='请求参数')),
+                ('user_id', models.CharField(blank=True, max_length=64, verbose_name='提交用户')),
+                ('status', models.CharField(choices=[('pending', '等待执行'), ('running', '正在执行'), ('done', '执行成功'), ('failed', '执行失败')], db_index=True, default='pending', max_length=16, verbose_name='状态')),
+                ('total', models.IntegerField(blank=True, null=True, verbose_name='记录总数')),
+                ('processed', models.IntegerField(default=0, verbose_name='已处理记录数')),
+                ('result', models.TextField(blank=True, verbose_name='执行结果')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='执行进程')),
+                ('created_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_time', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_time', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+            ],
+            options={
+                'verbose_name_plural': '后台任务表',
+            },
+        ),
+    ]
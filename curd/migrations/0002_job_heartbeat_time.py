@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curd', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最后活动时间'),
+        ),
+    ]
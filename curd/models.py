@@ -1,3 +1,96 @@
+import json
+
 from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """ 后台任务表，耗时较长的批量操作action和导出会保存为一条任务记录，
+        由management命令"curd_worker"启动的进程执行
+    普通字段:
+        app_label, model_name: 任务所属的模型类
+        action: 要执行的action函数名，导出任务为"_export"
+        params: 提交任务时请求中的参数(json)
+        status, total, processed: 任务状态和进度
+        result, error: 执行结果和错误信息
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    status_choices = [
+        (PENDING, '等待执行'),
+        (RUNNING, '正在执行'),
+        (DONE, '执行成功'),
+        (FAILED, '执行失败'),
+    ]
+
+    app_label = models.CharField(max_length=100, verbose_name='应用名')
+    model_name = models.CharField(max_length=100, verbose_name='模型名')
+    action = models.CharField(max_length=100, verbose_name='任务')
+    params = models.TextField(default='{}', verbose_name='请求参数')
+    user_id = models.CharField(max_length=64, blank=True, verbose_name='提交用户')
+
+    status = models.CharField(max_length=16, choices=status_choices, default=PENDING, db_index=True, verbose_name='状态')
+    total = models.IntegerField(null=True, blank=True, verbose_name='记录总数')
+    processed = models.IntegerField(default=0, verbose_name='已处理记录数')
+    result = models.TextField(blank=True, verbose_name='执行结果')
+    error = models.TextField(blank=True, verbose_name='错误信息')
+    worker = models.CharField(max_length=100, blank=True, verbose_name='执行进程')
+
+    created_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_time = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    heartbeat_time = models.DateTimeField(null=True, blank=True, verbose_name='最后活动时间')
+    finished_time = models.DateTimeField(null=True, blank=True, verbose_name='结束时间')
+
+    def __str__(self):
+        return '%s.%s %s #%s' % (self.app_label, self.model_name, self.action, self.pk)
+
+    def get_params(self):
+        """ 获取提交任务时请求中的参数 """
+
+        return json.loads(self.params or '{}')
+
+    def update_progress(self, processed=None, total=None):
+        """ 更新任务进度，直接使用UPDATE语句，不会覆盖其他字段。同时更新最后活动时间(心跳)，
+            执行进程是否还活着由心跳判断，见curd.service.jobs.expire_jobs
+        Args:
+            processed: 已处理的记录数
+            total: 要处理的记录总数
+        """
+
+        fields = {'heartbeat_time': timezone.now()}
+        self.heartbeat_time = fields['heartbeat_time']
+        if processed is not None:
+            fields['processed'] = self.processed = processed
+        if total is not None:
+            fields['total'] = self.total = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def finish(self, result='', error=''):
+        """ 将任务标记为执行成功或执行失败。只有任务仍然处于"正在执行"状态并且属于当前执行进程时才会修改，
+            任务因为超时已经被其他进程标记为执行失败时不会被覆盖
+        Args:
+            result: 执行结果
+            error: 错误信息，不为空时任务标记为执行失败
+        Return:
+            是否修改成功
+        """
+
+        fields = {
+            'status': self.FAILED if error else self.DONE,
+            'result': result,
+            'error': error,
+            'finished_time': timezone.now(),
+        }
+        updated = Job.objects.filter(pk=self.pk, status=self.RUNNING, worker=self.worker).update(**fields)
+        if updated:
+            for name, value in fields.items():
+                setattr(self, name, value)
+        else:
+            self.refresh_from_db(fields=list(fields))
+        return bool(updated)
 
-# Create your models here.
+    class Meta:
+        verbose_name_plural = '后台任务表'
@@ -0,0 +1,114 @@
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+
+
+def json_response(data, status=200):
+    """ 返回json响应，中文不转义 """
+
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={"ensure_ascii": False}
+    )
+
+
+def error_response(message, status=400, errors=None):
+    """ 返回错误信息 """
+
+    data = {"error": message}
+    if errors is not None:
+        data["errors"] = errors
+    return json_response(data, status=status)
+
+
+def parse_body(request):
+    """ 解析请求体中的json数据。写入接口只接受"application/json"，跨站的表单无法提交这种请求，
+        因此接口可以不校验CSRF token
+    Args:
+        request: 当前请求对象
+    Return:
+        解析后的数据
+    Raise:
+        ValueError: 请求体不是合法的json
+    """
+
+    if request.content_type != 'application/json':
+        raise ValueError('Content-Type必须为application/json')
+    try:
+        return json.loads(request.body.decode(request.encoding or 'utf-8') or 'null')
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('请求体不是合法的json')
+
+
+def split_fields(model_class, fields):
+    """ 将字段分为可以直接使用values()读取的字段和多对多字段，不存在的字段(属性、方法)会被忽略
+    Args:
+        model_class: 模型类
+        fields: 字段名组成的列表，可以包含"publish__city"这样的关联路径
+    Return:
+        二元元组: (values()字段列表, 多对多字段对象列表)
+    """
+
+    value_fields = [model_class._meta.pk.name]
+    m2m_fields = []
+    for name in fields:
+        try:
+            field = model_class._meta.get_field(name.split('__')[0])
+        except FieldDoesNotExist:
+            continue
+        if field.many_to_many and '__' not in name:
+            if field.concrete and field not in m2m_fields:
+                m2m_fields.append(field)
+            continue
+        if (field.many_to_many or field.one_to_many) or name in value_fields:     # 反向关联会产生重复记录
+            continue
+        value_fields.append(name)
+    return value_fields, m2m_fields
+
+
+def attach_m2m(rows, model_class, m2m_fields):
+    """ 为values()返回的记录添加多对多字段，每个字段只查询一次关系表，值为关联记录主键组成的列表
+    Args:
+        rows: values()返回的字典组成的列表
+        model_class: 模型类
+        m2m_fields: 多对多字段对象列表
+    """
+
+    pk_name = model_class._meta.pk.name
+    pk_list = [row[pk_name] for row in rows]
+    for field in m2m_fields:
+        through = field.remote_field.through
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        mapping = {}
+        if pk_list:
+            relations = through._base_manager.filter(**{'%s__in' % source: pk_list}).values_list(source, target)
+            for source_pk, target_pk in relations:
+                mapping.setdefault(source_pk, []).append(target_pk)
+        for row in rows:
+            row[field.name] = mapping.get(row[pk_name], [])
+
+
+def serialize(queryset, fields):
+    """ 使用values()读取记录，不创建记录对象
+    Args:
+        queryset: 要读取的QuerySet对象
+        fields: 字段名组成的列表
+    Return:
+        字典组成的列表
+    """
+
+    value_fields, m2m_fields = split_fields(queryset.model, fields)
+    rows = list(queryset.values(*value_fields))
+    attach_m2m(rows, queryset.model, m2m_fields)
+    return rows
+
+
+def form_errors(form):
+    """ 表单的错误信息，{字段名: [错误信息]} """
+
+    return {name: [str(message) for message in messages] for name, messages in form.errors.items()}
@@ -0,0 +1,427 @@
+import copy
+
+from django.db import transaction, router, connections
+from django.db.models import signals, CASCADE, DO_NOTHING, QuerySet
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceField, ModelMultipleChoiceField
+
+from curd.service import caching
+from curd.service.signals import rows_created, rows_deleted, rows_updated
+
+try:        # 直接删除依赖Django的内部接口，不同版本中不存在时退回到QuerySet.delete()
+    from django.db.models.deletion import get_candidate_relations_to_delete
+except ImportError:
+    get_candidate_relations_to_delete = None
+
+CAN_RAW_DELETE = get_candidate_relations_to_delete is not None and hasattr(QuerySet, '_raw_delete')
+
+
+def iter_pk_batches(queryset, batch_size):
+    """ 按照主键顺序分批读取queryset中记录的主键，每一批都使用"pk > 上一批最后一个主键"查询，
+        处理过程中删除记录也不会影响后面的批次
+    Args:
+        queryset: 要处理的QuerySet对象
+        batch_size: 每一批的记录数
+    Return:
+        一个生成器，每次返回一批主键组成的列表
+    """
+
+    pk_queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        batch = pk_queryset if last_pk is None else pk_queryset.filter(pk__gt=last_pk)
+        pk_list = list(batch[:batch_size])
+        if not pk_list:
+            return
+        yield pk_list
+        last_pk = pk_list[-1]
+
+
+def _has_delete_listeners(model):
+    """ 模型类是否注册了删除相关的信号(不包括版本号的信号处理函数) """
+
+    return (
+        caching.has_listeners(signals.pre_delete, model) or
+        caching.has_listeners(signals.post_delete, model) or
+        caching.has_listeners(signals.m2m_changed, model)
+    )
+
+
+def get_fast_delete_fields(model):
+    """ 判断模型类的记录能否直接使用一条DELETE语句删除，而不需要在Python中加载记录、发送信号和处理级联关系。
+        自动创建的多对多关系表不会阻止直接删除，只需要先删除关系表中的记录
+    Args:
+        model: 模型类
+    Return:
+        可以直接删除时，返回自动创建的多对多关系表中指向该模型类的外键字段组成的列表；
+        否则返回None
+    """
+
+    opts = model._meta
+    if not CAN_RAW_DELETE or _has_delete_listeners(model) or opts.parents:
+        return None
+    if any(hasattr(field, 'bulk_related_objects') for field in opts.private_fields):     # GenericRelation
+        return None
+
+    through_fields = []
+    for related in get_candidate_relations_to_delete(opts):
+        on_delete = related.field.remote_field.on_delete
+        if on_delete is DO_NOTHING:
+            continue
+        related_model = related.related_model
+        if related_model._meta.auto_created and on_delete is CASCADE and not _has_delete_listeners(related_model):
+            through_fields.append(related.field)
+            continue
+        return None             # 级联删除、SET_NULL等需要在Python中处理
+    return through_fields
+
+
+def has_save_listeners(model):
+    """ 模型类是否注册了保存相关的信号(不包括版本号的信号处理函数) """
+
+    return caching.has_listeners(signals.pre_save, model) or caching.has_listeners(signals.post_save, model)
+
+
+def bulk_delete(queryset, batch_size=1000, progress=None):
+    """ 分批删除queryset中的记录，每一批在一个事务中执行。没有注册信号和级联关系时
+        使用_raw_delete()直接删除，否则每一批使用QuerySet.delete()
+    Args:
+        queryset: 要删除的记录
+        batch_size: 每一批的记录数
+        progress: 每一批执行完成之后的回调函数，参数为已经删除的记录数
+    Return:
+        删除的记录数
+    """
+
+    model = queryset.model
+    using = router.db_for_write(model)
+    through_fields = get_fast_delete_fields(model)
+    manager = model._base_manager.db_manager(using)
+
+    deleted = 0
+    for pk_list in iter_pk_batches(queryset, batch_size):
+        with transaction.atomic(using=using):
+            batch = manager.filter(pk__in=pk_list)
+            if through_fields is None:
+                deleted += batch.delete()[1].get(model._meta.label, 0)
+            else:
+                for field in through_fields:
+                    field.model._base_manager.db_manager(using).filter(
+                        **{'%s__in' % field.name: pk_list}
+                    )._raw_delete(using)
+                deleted += batch._raw_delete(using)
+                rows_deleted.send(sender=model, pk_list=pk_list)
+        if progress:
+            progress(deleted)
+    if through_fields is not None and deleted:      # 直接删除不会发送信号
+        caching.bump_model_version(model)
+    return deleted
+
+
+def bulk_update(queryset, field_name, value, batch_size=1000, progress=None):
+    """ 分批将queryset中记录的某个字段修改为同一个值，每一批在一个事务中执行。没有注册保存信号时
+        使用QuerySet.update()，否则逐条调用save()以保证信号被发送
+    Args:
+        queryset: 要修改的记录
+        field_name: 字段名
+        value: 修改后的值，需要已经经过校验
+        batch_size: 每一批的记录数
+        progress: 每一批执行完成之后的回调函数，参数为已经修改的记录数
+    Return:
+        修改的记录数
+    """
+
+    model = queryset.model
+    using = router.db_for_write(model)
+    field = model._meta.get_field(field_name)
+    manager = model._base_manager.db_manager(using)
+    use_update = not has_save_listeners(model)
+
+    updated = 0
+    for pk_list in iter_pk_batches(queryset, batch_size):
+        with transaction.atomic(using=using):
+            batch = manager.filter(pk__in=pk_list)
+            if use_update:
+                updated += batch.update(**{field.attname: value})
+                rows_updated.send(sender=model, pk_list=pk_list, field_names=[field.name])
+            else:
+                for obj in batch:
+                    setattr(obj, field.attname, value)
+                    obj.save(update_fields=[field.name])
+                    updated += 1
+        if progress:
+            progress(updated)
+    if use_update and updated:
+        caching.bump_model_version(model)
+    return updated
+
+
+def _m2m_field_names(form):
+    """ 表单中的多对多字段 """
+
+    return [field.name for field in form._meta.model._meta.many_to_many if field.name in form.fields]
+
+
+def _choice_key(field, value):
+    """ 关联记录或者提交的值在ModelChoiceField中对应的字符串 """
+
+    if isinstance(value, field.queryset.model):
+        value = getattr(value, field.to_field_name) if field.to_field_name else value.pk
+    return str(value)
+
+
+class PrefetchedChoiceMixin(object):
+    """ 使用prefetch_choices()一次性查询好的关联记录校验ModelChoiceField，代替to_python()中每个表单一次的查询。
+        关联记录是从字段的queryset中查询的，queryset中的过滤条件和limit_choices_to同样生效
+    """
+
+    prefetched = None           # {值: 关联记录}，为None时和父类相同
+
+    def to_python(self, value):
+        if self.prefetched is None:
+            return super().to_python(value)
+        if value in self.empty_values:
+            return None
+        try:
+            return self.prefetched[_choice_key(self, value)]
+        except KeyError:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class PrefetchedMultipleChoiceMixin(object):
+    """ 使用prefetch_choices()一次性查询好的关联记录校验ModelMultipleChoiceField，代替_check_values()中的查询 """
+
+    prefetched = None           # {值: 关联记录}，为None时和父类相同
+
+    def _check_values(self, value):
+        if self.prefetched is None:
+            return super()._check_values(value)
+        try:
+            value = frozenset(value)
+        except TypeError:
+            raise ValidationError(self.error_messages['list'], code='list')
+        result = []
+        for pk in value:
+            obj = self.prefetched.get(_choice_key(self, pk))
+            if obj is None:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': pk},
+                )
+            result.append(obj)
+        return result
+
+
+class PrefetchedFormMixin(object):
+    """ 模型校验时跳过已经使用预先查询的关联记录校验过的外键字段，ForeignKey.validate()会为每条记录查询一次关联记录
+        是否存在。预先查询时已经加上了模型字段的limit_choices_to，见prefetch_choices()
+    """
+
+    prefetched_fields = ()
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        return exclude + [name for name in self.prefetched_fields if name not in exclude]
+
+
+_prefetched_classes = {}
+
+
+def _prefetched_class(cls, mixin):
+    """ 生成(并缓存)cls加上mixin的派生类 """
+
+    key = (cls, mixin)
+    if key not in _prefetched_classes:
+        _prefetched_classes[key] = type('Prefetched%s' % cls.__name__, (mixin, cls), {"__module__": cls.__module__})
+    return _prefetched_classes[key]
+
+
+def _prefetched_field(field, objects):
+    """ 复制表单字段，替换成使用预先查询好的关联记录校验的派生类
+    Args:
+        field: ModelChoiceField或ModelMultipleChoiceField对象
+        objects: {值: 关联记录}
+    Return:
+        新的表单字段对象
+    """
+
+    new_field = copy.copy(field)
+    if not isinstance(field, (PrefetchedChoiceMixin, PrefetchedMultipleChoiceMixin)):
+        mixin = PrefetchedMultipleChoiceMixin if isinstance(field, ModelMultipleChoiceField) else PrefetchedChoiceMixin
+        new_field.__class__ = _prefetched_class(type(field), mixin)
+    new_field.prefetched = objects
+    return new_field
+
+
+def prefetch_choices(forms):
+    """ 多个表单一起校验时，为外键、多对多字段一次性查询所有表单提交的关联记录。
+        ModelChoiceField默认每个表单查询一次，校验几千条记录时会产生几千次查询。
+        关联记录从表单字段的queryset中查询，模型的外键字段同时加上limit_choices_to，与逐条校验的结果相同
+    Args:
+        forms: 同一个表单类的未校验的表单对象组成的列表
+    """
+
+    if not forms:
+        return
+    model = getattr(getattr(forms[0], '_meta', None), 'model', None)
+    model_fks = {field.name: field for field in model._meta.concrete_fields if field.many_to_one} if model else {}
+    prefetched_fields = []
+    for name, field in forms[0].fields.items():
+        if not isinstance(field, ModelChoiceField):
+            continue
+        multiple = isinstance(field, ModelMultipleChoiceField)
+        values = set()
+        for form in forms:
+            value = form[name].data
+            for item in (value or []) if multiple else [value]:
+                if item not in field.empty_values:
+                    values.add(str(item))
+
+        queryset = field.queryset
+        model_field = None if multiple else model_fks.get(name)
+        if model_field is not None and model_field.related_model is queryset.model:
+            queryset = queryset.complex_filter(model_field.get_limit_choices_to())
+        lookup = '%s__in' % (field.to_field_name or 'pk')
+        try:
+            objects = {_choice_key(field, obj): obj for obj in queryset.filter(**{lookup: values})} if values else {}
+        except (ValueError, TypeError, ValidationError):       # 有不合法的值时由每个表单自己校验
+            continue
+        for form in forms:
+            form.fields[name] = _prefetched_field(form.fields[name], objects)
+        if model_field is not None and model_field.related_model is field.queryset.model:
+            prefetched_fields.append(name)
+
+    if not prefetched_fields:
+        return
+    for form in forms:
+        if not isinstance(form, PrefetchedFormMixin):
+            form.__class__ = _prefetched_class(type(form), PrefetchedFormMixin)
+        form.prefetched_fields = prefetched_fields
+
+
+def share_choices(forms):
+    """ 渲染多个表单时，外键、多对多字段的下拉选项只查询一次，所有表单共用同一个选项列表
+    Args:
+        forms: 同一个表单类的表单对象组成的列表
+    """
+
+    if not forms:
+        return
+    for name, field in forms[0].fields.items():
+        if getattr(field.widget, 'is_autocomplete', False):        # 自动补全控件只渲染选中的选项
+            continue
+        if isinstance(field, ModelChoiceField) and not field.widget.is_hidden:      # formset中隐藏的主键字段不需要选项
+            choices = list(iter(field.choices))     # list()会调用__len__()，产生一次COUNT查询
+            for form in forms:
+                form.fields[name].choices = choices
+
+
+def _save_m2m(forms, model, batch_size, is_new=False):
+    """ 批量保存多个表单的多对多字段。关系表为自动生成且没有注册m2m_changed信号时，
+        先删除这些记录原有的关系(新增的记录不需要)，再使用一条bulk_create写入所有关系；
+        否则逐个调用表单的save_m2m()
+    Args:
+        forms: 已经调用过save(commit=False)并且记录已经保存的表单对象组成的列表
+        model: 模型类
+        batch_size: 每一条INSERT语句包含的记录数
+        is_new: 记录是否是刚刚新增的
+    """
+
+    forms = [form for form in forms if _m2m_field_names(form)]
+    if not forms:
+        return
+    fields = [field for field in model._meta.many_to_many if field.name in forms[0].fields]
+    private_names = {field.name for field in model._meta.private_fields}
+    slow = (not is_new and not CAN_RAW_DELETE) or any(name in private_names for name in forms[0].fields) or any(
+        not field.remote_field.through._meta.auto_created or
+        caching.has_listeners(signals.m2m_changed, field.remote_field.through)
+        for field in fields
+    )
+    if slow:
+        for form in forms:
+            form.save_m2m()
+        return
+
+    pk_list = [form.instance.pk for form in forms]
+    for field in fields:
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name())
+        target = through._meta.get_field(field.m2m_reverse_field_name())
+        if not is_new:
+            through._base_manager.filter(**{'%s__in' % source.name: pk_list})._raw_delete(through._base_manager.db)
+        through_list = []
+        for form in forms:
+            source_value = getattr(form.instance, source.target_field.attname)
+            for obj in form.cleaned_data.get(field.name) or []:
+                through_list.append(through(**{
+                    source.attname: source_value,
+                    target.attname: getattr(obj, target.target_field.attname),
+                }))
+        through._base_manager.bulk_create(through_list, batch_size=batch_size)
+        caching.bump_model_version(field.related_model)
+
+
+def save_forms(forms, batch_size=1000):
+    """ 在一个事务中保存多个已经通过校验的ModelForm，新增的记录使用bulk_create()，修改的记录使用bulk_update()。
+        模型类注册了保存信号时逐条调用save()；数据库不能返回bulk_create()生成的主键时(比如SQLite)，
+        有多对多数据的记录以及需要维护搜索索引的模型类同样逐条保存
+    Args:
+        forms: 已经通过校验的ModelForm对象组成的列表，同一个模型类
+        batch_size: 每一条INSERT/UPDATE语句包含的记录数
+    Return:
+        保存之后的记录对象组成的列表
+    """
+
+    if not forms:
+        return []
+    model = forms[0]._meta.model
+    using = router.db_for_write(model)
+    features = connections[using].features
+    can_return_ids = getattr(
+        features, 'can_return_rows_from_bulk_insert',
+        getattr(features, 'can_return_ids_from_bulk_insert', False)
+    )
+    use_bulk = not has_save_listeners(model)
+    manager = model._base_manager.db_manager(using)
+    create_forms = [form for form in forms if form.instance._state.adding]
+    update_forms = [form for form in forms if not form.instance._state.adding]
+
+    with transaction.atomic(using=using):
+        # 新增
+        bulk_forms = []
+        # 不能返回主键时无法通知搜索索引等内部的信号处理函数
+        if use_bulk and (can_return_ids or not signals.post_save.has_listeners(model)):
+            bulk_forms = [
+                form for form in create_forms
+                if can_return_ids or not any(form.cleaned_data.get(name) for name in _m2m_field_names(form))
+            ]
+        if bulk_forms:
+            obj_list = manager.bulk_create([form.save(commit=False) for form in bulk_forms], batch_size=batch_size)
+            pk_list = [obj.pk for obj in obj_list if obj.pk is not None]
+            if pk_list:
+                rows_created.send(sender=model, pk_list=pk_list)
+        bulk_form_ids = {id(form) for form in bulk_forms}
+        for form in create_forms:
+            if id(form) not in bulk_form_ids:
+                form.save(commit=False).save()
+        # 不能返回主键时有多对多数据的记录逐条插入，它们的关系仍然可以一起写入
+        _save_m2m([form for form in create_forms if form.instance.pk is not None], model, batch_size, is_new=True)
+
+        # 修改
+        if use_bulk and update_forms:
+            field_names = [
+                field.name for field in model._meta.concrete_fields
+                if not field.primary_key and field.name in update_forms[0].fields
+            ]
+            obj_list = [form.save(commit=False) for form in update_forms]
+            if field_names:
+                manager.bulk_update(obj_list, field_names, batch_size=batch_size)
+                rows_updated.send(sender=model, pk_list=[obj.pk for obj in obj_list], field_names=field_names)
+            _save_m2m(update_forms, model, batch_size)
+        else:
+            for form in update_forms:
+                form.save()
+
+    caching.bump_model_version(model)           # bulk_create/bulk_update以及批量写入的多对多关系不会发送信号
+    return [form.instance for form in forms]
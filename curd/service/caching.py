@@ -0,0 +1,145 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import signals
+
+
+def _version_key(model):
+    return 'curd:version:%s' % model._meta.label_lower
+
+
+def _new_version():
+    """ 版本号丢失(缓存被清空、淘汰)之后使用的初始值。使用当前时间的纳秒数而不是固定的1，
+        不会与丢失之前的版本号重复，旧版本号的缓存不会被误认为仍然有效
+    """
+
+    return time.time_ns()
+
+
+def get_model_version(model):
+    """ 获取模型类的数据版本号，模型类的记录被保存或者删除时版本号会增加，
+        缓存的key中包含版本号，数据变化之后旧的缓存自然失效
+    Args:
+        model: 模型类
+    Return:
+        整数形式的版本号
+    """
+
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def get_versions(models):
+    """ 获取多个模型类的数据版本号，用于拼接缓存的key，任何一个模型类的数据变化之后key都会改变
+    Args:
+        models: 模型类组成的列表
+    Return:
+        "版本号1.版本号2..."形式的字符串
+    """
+
+    return '.'.join(str(get_model_version(model)) for model in models)
+
+
+def bump_model_version(model):
+    """ 增加模型类的数据版本号，使依赖该模型类数据的缓存失效。
+        QuerySet.update()、_raw_delete()等不会发送信号的批量操作需要手动调用
+    Args:
+        model: 模型类
+    """
+
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:              # key不存在或者已经过期
+        cache.set(key, _new_version(), None)
+
+
+def _model_changed(sender, **kwargs):
+    """ 记录被保存或者删除时增加版本号 """
+
+    bump_model_version(sender)
+
+
+def _m2m_changed(sender, instance, action, **kwargs):
+    """ 多对多关系发生变化时增加关系表两端的模型类的版本号 """
+
+    if action.startswith('post_'):
+        bump_model_version(type(instance))
+        bump_model_version(kwargs['model'])
+
+
+def replay_signal(signal, sender, **kwargs):
+    """ 对一次已经发送过的信号执行增加版本号的处理，用于延迟注册的配置类在信号处理过程中导入的情况，
+        见search.replay_signal。多增加一次版本号只会让缓存提前失效
+    Args:
+        signal: 信号对象
+        sender: 发送信号的模型类或者多对多关系表
+        kwargs: 信号的参数
+    """
+
+    if signal is signals.post_save or signal is signals.post_delete:
+        bump_model_version(sender)
+    elif signal is signals.m2m_changed:
+        _m2m_changed(sender, **kwargs)
+
+
+_internal_receivers = [_model_changed, _m2m_changed]
+
+
+def add_internal_receiver(receiver):
+    """ 登记curd内部的信号处理函数(版本号、搜索索引等)，它们不会阻止批量操作直接使用UPDATE/DELETE语句，
+        批量操作会通过curd.service.signals中的信号通知它们
+    Args:
+        receiver: 信号处理函数
+    """
+
+    if receiver not in _internal_receivers:
+        _internal_receivers.append(receiver)
+
+
+def watch_model(model):
+    """ 监听模型类的保存、删除以及多对多关系变化的信号，数据变化时增加版本号。
+        只监听需要缓存的模型类，全局监听会让Django的QuerySet.delete()无法直接删除记录。
+        可以重复调用
+    Args:
+        model: 模型类
+    """
+
+    label = model._meta.label_lower
+    signals.post_save.connect(_model_changed, sender=model, dispatch_uid='curd_version_save_%s' % label)
+    signals.post_delete.connect(_model_changed, sender=model, dispatch_uid='curd_version_delete_%s' % label)
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if isinstance(through, str):                # 关系表还没有加载
+            continue
+        signals.m2m_changed.connect(
+            _m2m_changed,
+            sender=through,
+            dispatch_uid='curd_version_m2m_%s' % through._meta.label_lower
+        )
+
+
+def has_listeners(signal, model):
+    """ 判断模型类是否注册了curd内部之外的信号处理函数，内部的信号处理函数
+        不会阻止批量操作直接使用UPDATE/DELETE语句
+    Args:
+        signal: 信号对象
+        model: 模型类
+    Return:
+        布尔值
+    """
+
+    if not signal.has_listeners(model):
+        return False
+    live_receivers = getattr(signal, '_live_receivers', None)       # Django的内部接口
+    if live_receivers is None:          # 无法区分内部的信号处理函数时，按照注册了其他信号处理函数处理
+        return True
+    receivers = live_receivers(model)
+    if isinstance(receivers, tuple):    # Django 5.0开始分别返回同步和异步的信号处理函数
+        receivers = [receiver for group in receivers for receiver in group]
+    return any(receiver not in _internal_receivers for receiver in receivers)
@@ -0,0 +1,77 @@
+from operator import attrgetter
+from types import MethodType
+
+
+class Column(object):
+    """ 列表页面表格中的一列，由list_display中的一个元素编译而来
+
+    """
+
+    __slots__ = ('field', 'header', 'getter', 'func')
+
+    def __init__(self, field, header=None, getter=None, func=None):
+        """ 初始化Column的实例
+        Args:
+            field: list_display中的原始元素，字段名字符串或者功能函数
+            header: 字段列预先计算好的表头(verbose_name)，功能函数列为None
+            getter: 字段列读取记录对象属性的函数
+            func: 功能函数列对应的功能函数
+        """
+
+        self.field = field
+        self.header = header
+        self.getter = getter
+        self.func = func
+
+    @property
+    def name(self):
+        """ 列的名称: 字段名或者功能函数的函数名，性能统计时使用 """
+
+        if self.func is not None:
+            return self.func.__name__
+        return self.field or '__str__'
+
+    def get_header(self, config_obj):
+        """ 获取表头数据
+        Args:
+            config_obj: 当前请求的config对象
+        """
+
+        if self.func is None:
+            return self.header
+        return self.func(config_obj, is_header=True)
+
+    def bind(self, config_obj):
+        """ 将该列绑定到当前请求的config对象上
+        Args:
+            config_obj: 当前请求的config对象
+        Return:
+            一个只接收记录对象作为参数的函数，返回该单元格的数据
+        """
+
+        if self.func is None:
+            return self.getter
+        return MethodType(self.func, config_obj)        # 功能函数的is_header参数默认为False
+
+
+def compile_list_display(model_class, list_display):
+    """ 将list_display编译成Column对象组成的元组，字段名会被转换成attrgetter并预先计算表头，
+        功能函数会在渲染时绑定到当前请求的config对象上
+    Args:
+        model_class: 模型类
+        list_display: 列表页面表格要显示的字段与功能函数
+    Return:
+        Column对象组成的元组
+    """
+
+    if not list_display:        # 没有配置list_display时，只显示记录对象本身
+        return (Column(None, header=model_class._meta.verbose_name_plural, getter=str), )
+
+    columns = []
+    for field in list_display:
+        if isinstance(field, str):
+            verbose_name = model_class._meta.get_field(field).verbose_name
+            columns.append(Column(field, header=verbose_name, getter=attrgetter(field)))
+        else:
+            columns.append(Column(field, func=field))
+    return tuple(columns)
@@ -0,0 +1,97 @@
+import logging
+
+from django.core.cache import cache
+from django.db import connections, DatabaseError
+
+
+logger = logging.getLogger(__name__)
+
+EXACT = 'exact'             # 每次都执行COUNT(*)
+CACHED = 'cached'           # 执行COUNT(*)之后将结果缓存一段时间
+ESTIMATED = 'estimated'     # 没有过滤条件时使用数据库的统计信息估算记录总数
+
+
+def exact_count(queryset):
+    """ 精确统计记录总数
+    Args:
+        queryset: 要统计的QuerySet对象
+    Return:
+        记录总数
+    """
+
+    return queryset.count()
+
+
+def cached_count(queryset, cache_key, timeout):
+    """ 精确统计记录总数，并使用Django的缓存框架缓存统计结果
+    Args:
+        queryset: 要统计的QuerySet对象
+        cache_key: 缓存的key，需要包含模型类以及过滤条件
+        timeout: 缓存的过期时间，单位为秒
+    Return:
+        记录总数
+    """
+
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, timeout)
+    return count
+
+
+def estimated_count(model_class, using='default'):
+    """ 从数据库的统计信息中读取表的估算记录数，目前支持SQLite(sqlite_stat1，需要执行过ANALYZE)，
+        PostgreSQL(pg_class.reltuples)和MySQL(information_schema.TABLES)
+    Args:
+        model_class: 模型类
+        using: 数据库别名
+    Return:
+        估算的记录数，数据库不支持或者还没有统计信息时返回None
+    """
+
+    connection = connections[using]
+    table = model_class._meta.db_table
+    vendor = connection.vendor
+
+    if vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s'
+        params = [table]
+    elif vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)'
+        params = [connection.ops.quote_name(table)]
+    elif vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        params = [table]
+    else:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError as e:      # 比如SQLite中还没有执行过ANALYZE，sqlite_stat1表不存在
+        logger.debug('无法读取%s的统计信息: %s', table, e)
+        return None
+
+    estimates = []
+    for (value, ) in rows:
+        if vendor == 'sqlite':      # stat列的第一个数字是表的记录数
+            value = value.split()[0] if value else None
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            continue
+        if value >= 0:              # PostgreSQL中从未ANALYZE过的表reltuples为-1
+            estimates.append(value)
+    return max(estimates) if estimates else None
+
+
+def is_filtered(queryset):
+    """ 判断QuerySet中是否有过滤条件
+    Args:
+        queryset: QuerySet对象
+    Return:
+        有过滤条件时返回True
+    """
+
+    return bool(queryset.query.where)
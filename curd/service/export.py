@@ -0,0 +1,239 @@
+import csv
+import json
+import datetime
+import decimal
+import uuid
+from tempfile import TemporaryFile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from curd.service.columns import compile_list_display
+from curd.service.planner import QueryPlanner
+
+try:
+    import openpyxl
+except ImportError:             # 导出xlsx需要安装openpyxl，其他格式不受影响
+    openpyxl = None
+
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'xlsx')
+FILE_CHUNK_SIZE = 64 * 1024     # 流式返回xlsx临时文件时每次读取的字节数
+
+# DjangoJSONEncoder可以直接序列化的数据类型
+JSON_TYPES = (str, bool, int, float, decimal.Decimal, datetime.date, datetime.time, datetime.timedelta, uuid.UUID)
+
+
+class Echo(object):
+    """ csv.writer需要一个文件对象，这里直接返回写入的内容，用于流式响应 """
+
+    def write(self, value):
+        return value
+
+
+class Exporter(object):
+    """ 将列表页面过滤后的记录分批读取并导出，内存占用不会随着记录数增加
+
+    """
+
+    def __init__(self, config_obj, queryset, export_display, chunk_size=2000, combain_condition=None):
+        """ 初始化Exporter的实例
+        Args:
+            config_obj: 当前请求的config对象
+            queryset: 包含了搜索条件的QuerySet对象
+            export_display: 要导出的字段与功能函数
+            chunk_size: 每一批读取的记录数
+            combain_condition: 当前生效的组合搜索条件，用于判断是否需要去重
+        """
+
+        self.config_obj = config_obj
+        self.model_class = config_obj.model_class
+        self.queryset = queryset
+        self.export_display = export_display
+        self.chunk_size = chunk_size
+        self.columns = compile_list_display(self.model_class, export_display)
+        self.plan = QueryPlanner(
+            model_class=self.model_class,
+            list_display=export_display,
+            combain_search_field_list=config_obj.get_combain_search_field_list(),
+            combain_condition=combain_condition
+        )
+
+    def keys(self):
+        """ 每一列的名称，字段列为字段名，功能函数列为函数名，用于jsonl格式 """
+
+        return [field if isinstance(field, str) else field.__name__ for field in self.export_display]
+
+    def headers(self):
+        """ 每一列的表头，用于csv和xlsx格式 """
+
+        return [str(column.get_header(self.config_obj)) for column in self.columns]
+
+    def _is_plain(self):
+        """ 导出的列是否全部是当前表中的普通字段，是的话可以直接使用values_list()读取 """
+
+        if not self.export_display:
+            return False
+        for field in self.export_display:
+            if not isinstance(field, str):
+                return False
+            model_field = self.model_class._meta.get_field(field)
+            if model_field.is_relation or not model_field.concrete:
+                return False
+        return True
+
+    def rows(self):
+        """ 一个生成器，每次返回一行要导出的数据 """
+
+        if self._is_plain():
+            queryset = self.queryset.values_list(*self.export_display)
+            if self.plan.distinct:
+                queryset = queryset.distinct()
+            yield from queryset.iterator(chunk_size=self.chunk_size)
+            return
+
+        # 有关联字段或者功能函数时需要记录对象，按照主键分批查询，每一批使用select_related/prefetch_related
+        queryset = self.plan.plan(self.queryset).order_by('pk')
+        cells = [column.bind(self.config_obj) for column in self.columns]
+        last_pk = None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            object_list = list(chunk[:self.chunk_size])
+            if not object_list:
+                break
+            for obj in object_list:
+                yield [cell(obj) for cell in cells]
+            last_pk = object_list[-1].pk
+
+    def csv_response(self, filename):
+        """ 流式导出csv文件 """
+
+        writer = csv.writer(Echo())
+
+        def content():
+            yield '\ufeff'                     # BOM，保证Excel打开中文不乱码
+            yield writer.writerow(self.headers())
+            for row in self.rows():
+                yield writer.writerow([_to_text(value) for value in row])
+
+        response = StreamingHttpResponse(content(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="%s.csv"' % filename
+        return response
+
+    def jsonl_response(self, filename):
+        """ 流式导出jsonl文件，每一行是一个json对象 """
+
+        keys = self.keys()
+
+        def content():
+            for row in self.rows():
+                data = dict(zip(keys, [_to_json_value(value) for value in row]))
+                yield json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+        response = StreamingHttpResponse(content(), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="%s.jsonl"' % filename
+        return response
+
+    def xlsx_response(self, filename):
+        """ 流式导出xlsx文件。xlsx是zip格式，只能在全部写入之后才能返回，这里在响应开始迭代时才查询数据库，
+            使用openpyxl的write_only模式逐行写入临时文件，再分块读取临时文件返回，内存占用与记录数无关。
+            记录很多时第一个字节要等文件生成之后才会返回，可能导致代理超时，需要设置async_export = True在后台导出
+        """
+
+        def content():
+            with TemporaryFile() as tmp_file:
+                self._write_xlsx(tmp_file, self.rows())
+                tmp_file.seek(0)
+                yield from iter(lambda: tmp_file.read(FILE_CHUNK_SIZE), b'')
+
+        response = StreamingHttpResponse(
+            content(),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        response['Content-Disposition'] = 'attachment; filename="%s.xlsx"' % filename
+        return response
+
+    def _write_xlsx(self, file_obj, rows):
+        """ 使用openpyxl的write_only模式逐行写入xlsx文件
+        Args:
+            file_obj: 文件路径或者文件对象
+            rows: 要导出的数据，每次返回一行
+        """
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(self.headers())
+        for row in rows:
+            sheet.append([_to_xlsx_value(value) for value in row])
+        workbook.save(file_obj)
+
+    def _counted_rows(self, progress=None):
+        """ 和rows()相同，每读取chunk_size行调用一次progress回调函数，参数为已经导出的行数 """
+
+        count = 0
+        for row in self.rows():
+            yield row
+            count += 1
+            if progress and count % self.chunk_size == 0:
+                progress(count)
+        if progress:
+            progress(count)
+
+    def write(self, file_path, export_format, progress=None):
+        """ 将记录导出到文件中，用于后台导出任务
+        Args:
+            file_path: 文件路径
+            export_format: csv/jsonl/xlsx
+            progress: 回调函数，参数为已经导出的行数
+        """
+
+        rows = self._counted_rows(progress)
+        if export_format == 'xlsx':
+            self._write_xlsx(file_path, rows)
+            return
+
+        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            if export_format == 'csv':
+                writer = csv.writer(f)
+                f.write('\ufeff')                # BOM，保证Excel打开中文不乱码
+                writer.writerow(self.headers())
+                for row in rows:
+                    writer.writerow([_to_text(value) for value in row])
+            else:
+                keys = self.keys()
+                for row in rows:
+                    data = dict(zip(keys, [_to_json_value(value) for value in row]))
+                    f.write(json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+
+    def response(self, export_format, filename):
+        """ 根据导出格式生成响应对象
+        Args:
+            export_format: csv/jsonl/xlsx
+            filename: 不包含后缀的文件名
+        """
+
+        return getattr(self, '%s_response' % export_format)(filename)
+
+
+def _to_text(value):
+    """ 将单元格数据转换成字符串，None转换成空字符串 """
+
+    if value is None:
+        return ''
+    return str(value)
+
+
+def _to_json_value(value):
+    """ 将单元格数据转换成json可以序列化的数据，记录对象等转换成字符串 """
+
+    if value is None or isinstance(value, JSON_TYPES):
+        return value
+    return str(value)
+
+
+def _to_xlsx_value(value):
+    """ 将单元格数据转换成xlsx支持的数据类型 """
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
@@ -0,0 +1,207 @@
+import csv
+import json
+from itertools import islice
+
+from django.forms import ModelMultipleChoiceField
+
+from curd.service import bulk
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult(object):
+    """ 导入的统计结果 """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.total = 0              # 读取的行数
+        self.created = 0            # 新增的记录数，dry_run时为校验通过的新增记录数
+        self.updated = 0            # 修改的记录数，dry_run时为校验通过的修改记录数
+        self.failed = 0             # 校验失败的行数
+
+    def __str__(self):
+        return '%s共%s行，新增%s条，修改%s条，失败%s行' % (
+            '(试运行，没有写入数据库)' if self.dry_run else '', self.total, self.created, self.updated, self.failed
+        )
+
+
+class Importer(object):
+    """ 将CSV/JSONL文件中的记录分批导入，使用config对象的ModelForm校验每一行，
+        每一批记录校验之后立即写入数据库，内存占用不会随着文件大小增加
+
+    """
+
+    def __init__(self, config_obj, chunk_size=1000, batch_size=1000, dry_run=False):
+        """ 初始化Importer的实例
+        Args:
+            config_obj: config对象
+            chunk_size: 每一批校验的行数
+            batch_size: 每一条INSERT/UPDATE语句包含的记录数
+            dry_run: 为True时只校验，不写入数据库
+        """
+
+        self.config_obj = config_obj
+        self.model_class = config_obj.model_class
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.form_class = config_obj.get_model_form_class()
+        self.lookup_fields = config_obj.get_import_lookup_fields()
+        self.pk_name = self.model_class._meta.pk.name
+
+        # 表头可以是字段名或者verbose_name
+        self.header_map = {self.pk_name: self.pk_name, 'id': self.pk_name}
+        for name, field in self.form_class.base_fields.items():
+            self.header_map[name] = name
+            self.header_map[str(field.label)] = name
+        self.multiple_names = {
+            name for name, field in self.form_class.base_fields.items()
+            if isinstance(field, ModelMultipleChoiceField)
+        }
+
+    def normalize(self, record):
+        """ 将文件中的一行转换成(主键, 数据字典)，多对多字段的多个值使用逗号分隔，主键为空时新增记录 """
+
+        if not isinstance(record, dict):
+            return None, None
+        data = {}
+        for key, value in record.items():
+            name = self.header_map.get(str(key).strip())
+            if name is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if name in self.multiple_names and not isinstance(value, list):
+                value = [item.strip() for item in str(value or '').split(',') if item.strip()]
+            data[name] = value
+        pk = data.pop(self.pk_name, None)
+        return (pk if pk not in ('', None) else None), data
+
+    def csv_records(self, text_file):
+        """ 逐行读取CSV文件，第一行为表头
+        Return:
+            一个生成器，每次返回(行号, {表头: 值})
+        """
+
+        reader = csv.reader(text_file)
+        headers = [header.lstrip('\ufeff') for header in next(reader, [])]
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield reader.line_num, dict(zip(headers, values))
+
+    def jsonl_records(self, text_file):
+        """ 逐行读取JSONL文件，每一行是一个json对象，不合法的行返回None
+        Return:
+            一个生成器，每次返回(行号, 字典)
+        """
+
+        for line_number, line in enumerate(text_file, 1):
+            line = line.strip().lstrip('\ufeff')
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+    def rows(self, text_file, import_format):
+        """ 流式读取文件中的记录
+        Args:
+            text_file: 文本模式的文件对象
+            import_format: csv/jsonl
+        Return:
+            一个生成器，每次返回(行号, 主键, 数据字典)
+        """
+
+        for line_number, record in getattr(self, '%s_records' % import_format)(text_file):
+            pk, data = self.normalize(record)
+            yield line_number, pk, data
+
+    def resolve_labels(self, rows):
+        """ 将外键、多对多字段的显示值(比如出版社名称)替换成主键。一批记录中每个字段只查询一次，
+            找不到的值保持不变，由表单校验时报告错误
+        Args:
+            rows: (主键, 数据字典)组成的列表，直接修改其中的数据字典
+        """
+
+        for name, label_field in self.lookup_fields.items():
+            field = self.form_class.base_fields.get(name)
+            if field is None:
+                continue
+            multiple = name in self.multiple_names
+            labels = set()
+            for pk, data in rows:
+                if not data or not data.get(name):
+                    continue
+                if multiple:
+                    labels.update(str(value) for value in data[name])
+                else:
+                    labels.add(str(data[name]))
+            if not labels:
+                continue
+
+            key_field = field.to_field_name or 'pk'
+            mapping = {
+                str(label): str(key) for label, key in
+                field.queryset.filter(**{'%s__in' % label_field: labels}).values_list(label_field, key_field)
+            }
+            for pk, data in rows:
+                if not data or not data.get(name):
+                    continue
+                if multiple:
+                    data[name] = [mapping.get(str(value), value) for value in data[name]]
+                else:
+                    data[name] = mapping.get(str(data[name]), data[name])
+
+    def chunks(self, rows):
+        """ 将记录分成每一批chunk_size行 """
+
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def run(self, text_file, import_format, report_file=None, progress=None):
+        """ 导入文件中的所有记录。一批记录中校验通过的记录在一个事务中写入，校验失败的行写入错误报告
+        Args:
+            text_file: 文本模式的文件对象
+            import_format: csv/jsonl
+            report_file: 写入错误报告的文本文件对象，格式为CSV: 行号,字段,错误信息
+            progress: 回调函数，参数为已经处理的行数
+        Return:
+            ImportResult对象
+        """
+
+        result = ImportResult(dry_run=self.dry_run)
+        writer = None
+        if report_file is not None:
+            writer = csv.writer(report_file)
+            writer.writerow(['行号', '字段', '错误信息'])
+
+        for chunk in self.chunks(self.rows(text_file, import_format)):
+            line_numbers = [line_number for line_number, pk, data in chunk]
+            rows = [(pk, data) for line_number, pk, data in chunk]
+            self.resolve_labels(rows)
+            forms, errors = self.config_obj.build_bulk_forms(rows)
+
+            valid_forms = [form for form in forms if form.is_valid()]
+            result.total += len(rows)
+            result.failed += len(errors)
+            for form in valid_forms:
+                if form.instance._state.adding:
+                    result.created += 1
+                else:
+                    result.updated += 1
+            if valid_forms and not self.dry_run:
+                bulk.save_forms(valid_forms, batch_size=self.batch_size)
+
+            if writer is not None:
+                for index in sorted(errors):
+                    for field_name, message_list in errors[index].items():
+                        writer.writerow([line_numbers[index], field_name, '; '.join(message_list)])
+            if progress:
+                progress(result.total)
+        return result
@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.shortcuts import render as django_render
+from django.template.loader import render_to_string
+
+
+_local = threading.local()
+
+
+def is_enabled():
+    """ 是否开启了视图的性能统计: settings.CURD_INSTRUMENTATION """
+
+    return getattr(settings, 'CURD_INSTRUMENTATION', False)
+
+
+class ViewRecord(object):
+    """ 一次视图函数执行的统计数据，同时作为connection.execute_wrapper()的包装函数统计SQL查询 """
+
+    do_not_call_in_templates = True
+
+    def __init__(self, model, view, keep_sql=False):
+        """ 初始化ViewRecord的实例
+        Args:
+            model: 模型类的标识，比如"trial.book"
+            view: 视图函数或者action的名称
+            keep_sql: 是否保存执行的SQL，调试页脚中使用
+        """
+
+        self.model = model
+        self.view = view
+        self.keep_sql = keep_sql
+        self.wall_time = 0.0            # 视图函数的总耗时(秒)
+        self.queries = 0                # SQL查询次数
+        self.query_time = 0.0           # SQL查询的总耗时(秒)
+        self.render_time = 0.0          # 模板渲染的耗时(秒)，包含渲染时执行的查询
+        self.rows = 0                   # 列表页面渲染的行数
+        self.sql_list = []              # [(SQL, 耗时)]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.query_time += duration
+            if self.keep_sql:
+                self.sql_list.append((sql, duration))
+
+    def duplicated_sql(self):
+        """ 执行了多次的SQL(参数不同)，通常是list_display中的函数导致的N+1查询
+        Return:
+            [(SQL, 执行次数)]，按执行次数降序排列
+        """
+
+        counter = Counter(sql for sql, duration in self.sql_list)
+        return [(sql, count) for sql, count in counter.most_common() if count > 1]
+
+
+class Metrics(object):
+    """ 按(模型类, 视图)汇总的统计数据，保存在当前进程中 """
+
+    fields = ('wall_time', 'queries', 'query_time', 'render_time', 'rows')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()      # {(模型类, 视图): {"count": 请求次数, "max_wall_time": 最大耗时, 字段: 总和}}
+
+    def add(self, record):
+        """ 汇总一次视图函数执行的统计数据 """
+
+        with self._lock:
+            item = self._data.get((record.model, record.view))
+            if item is None:
+                item = self._data[(record.model, record.view)] = dict.fromkeys(self.fields, 0)
+                item.update(count=0, max_wall_time=0)
+            item['count'] += 1
+            item['max_wall_time'] = max(item['max_wall_time'], record.wall_time)
+            for field in self.fields:
+                item[field] += getattr(record, field)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self):
+        """ 获取所有统计数据
+        Return:
+            字典组成的列表，每一个字典包含model、view以及各项数据的总和
+        """
+
+        with self._lock:
+            return [dict(item, model=model, view=view) for (model, view), item in self._data.items()]
+
+    def prometheus_text(self):
+        """ 生成Prometheus的文本格式 """
+
+        metric_list = [
+            ('curd_view_requests_total', 'counter', '视图函数的执行次数', 'count'),
+            ('curd_view_seconds_total', 'counter', '视图函数的总耗时', 'wall_time'),
+            ('curd_view_max_seconds', 'gauge', '视图函数的最大耗时', 'max_wall_time'),
+            ('curd_view_queries_total', 'counter', 'SQL查询次数', 'queries'),
+            ('curd_view_query_seconds_total', 'counter', 'SQL查询的总耗时', 'query_time'),
+            ('curd_view_render_seconds_total', 'counter', '模板渲染的总耗时', 'render_time'),
+            ('curd_view_rows_total', 'counter', '列表页面渲染的行数', 'rows'),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for name, metric_type, description, field in metric_list:
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s %s' % (name, metric_type))
+            for item in snapshot:
+                lines.append('%s{model="%s",view="%s"} %s' % (
+                    name, _escape_label(item['model']), _escape_label(item['view']), item[field]
+                ))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+
+
+def current():
+    """ 获取当前线程正在统计的ViewRecord，没有开启统计时为None """
+
+    return getattr(_local, 'record', None)
+
+
+def set_view_name(name):
+    """ 修改当前统计的视图名称，比如列表页面执行action时使用action的名称 """
+
+    record = current()
+    if record is not None:
+        record.view = name
+
+
+@contextmanager
+def record_view(model, view):
+    """ 统计with语句中视图函数的耗时和所有数据库连接上执行的查询，结束后汇总到metrics
+    Args:
+        model: 模型类的标识，比如"trial.book"
+        view: 视图函数的名称
+    Return:
+        ViewRecord对象
+    """
+
+    record = ViewRecord(model, view, keep_sql=settings.DEBUG)
+    previous = current()
+    _local.record = record
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(record))
+            yield record
+    finally:
+        record.wall_time = time.perf_counter() - start
+        _local.record = previous
+        metrics.add(record)
+
+
+def render(request, template_name, context=None, *args, **kwargs):
+    """ 与django.shortcuts.render相同，开启了统计时记录模板渲染的耗时 """
+
+    record = current()
+    if record is None:
+        return django_render(request, template_name, context, *args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return django_render(request, template_name, context, *args, **kwargs)
+    finally:
+        record.render_time += time.perf_counter() - start
+
+
+def add_footer(response, record):
+    """ DEBUG模式下在html页面的末尾添加统计数据，方便在开发时发现N+1查询，
+        settings.CURD_INSTRUMENTATION_FOOTER为False时不添加
+    Args:
+        response: 视图函数返回的响应对象
+        record: ViewRecord对象
+    Return:
+        响应对象
+    """
+
+    if not settings.DEBUG or not getattr(settings, 'CURD_INSTRUMENTATION_FOOTER', True):
+        return response
+    if response.streaming or 'html' not in response.get('Content-Type', ''):
+        return response
+    content = response.content.decode(response.charset)
+    index = content.rfind('</body>')
+    if index < 0:
+        return response
+    footer = render_to_string('curd/instrumentation.html', {
+        "record": record,
+        "wall_ms": '%.1f' % (record.wall_time * 1000),
+        "query_ms": '%.1f' % (record.query_time * 1000),
+        "render_ms": '%.1f' % (record.render_time * 1000),
+        "sql_list": [(sql, '%.2f' % (duration * 1000)) for sql, duration in record.sql_list],
+        "duplicated_sql": record.duplicated_sql(),
+    })
+    response.content = content[:index] + footer + content[index:]
+    if response.has_header('Content-Length'):
+        response['Content-Length'] = str(len(response.content))
+    return response
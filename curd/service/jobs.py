@@ -0,0 +1,295 @@
+import os
+import json
+import socket
+import tempfile
+import threading
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.http.response import HttpResponseBase
+from django.utils import timezone
+
+from curd.models import Job
+
+
+EXPORT_ACTION = '_export'       # 导出任务对应的action名
+IMPORT_ACTION = '_import'       # 导入任务对应的action名
+SESSION_JOBS_KEY = 'curd_jobs'  # session中保存当前用户提交的任务id的key
+SESSION_JOBS_LIMIT = 50         # session中最多保存的任务id数量
+
+
+def async_action(func):
+    """ 将一个action函数标记为在后台任务中执行，不修改原函数，比如:
+            action_list = [async_action(CURDConfig.bulk_delete)]
+    Args:
+        func: action函数
+    Return:
+        设置了is_async属性的函数
+    """
+
+    @wraps(func)
+    def inner(*args, **kwargs):
+        return func(*args, **kwargs)
+    inner.is_async = True
+    return inner
+
+
+def get_export_root():
+    """ 获取导出任务生成的文件存放的目录，可以通过settings.CURD_EXPORT_ROOT配置 """
+
+    export_root = getattr(settings, 'CURD_EXPORT_ROOT', None) or os.path.join(tempfile.gettempdir(), 'curd_exports')
+    os.makedirs(export_root, exist_ok=True)
+    return export_root
+
+
+def get_export_path(filename):
+    """ 获取导出文件的完整路径，文件名中的目录部分会被去掉 """
+
+    return os.path.join(get_export_root(), os.path.basename(filename))
+
+
+def get_import_report_name(job):
+    """ 导入任务生成的错误报告的文件名 """
+
+    return '%s_%s_%s_errors.csv' % (job.app_label, job.model_name, job.pk)
+
+
+def _query_dict_to_dict(query_dict, exclude=()):
+    """ 将QueryDict转换成可以json序列化的字典，每个key对应一个列表 """
+
+    return {key: value_list for key, value_list in query_dict.lists() if key not in exclude}
+
+
+def submit_job(config_obj, request, action, extra_post=None):
+    """ 根据当前请求创建一个后台任务
+    Args:
+        config_obj: 当前请求的config对象
+        request: 当前请求对象
+        action: 要执行的action函数名，导出任务为EXPORT_ACTION，导入任务为IMPORT_ACTION
+        extra_post: 额外保存到任务参数中的POST数据，比如上传的文件保存之后的文件名
+    Return:
+        Job对象
+    """
+
+    app_label, model_name = config_obj.get_app_model()
+    params = {
+        "path": request.path_info,
+        "GET": _query_dict_to_dict(request.GET),
+        "POST": _query_dict_to_dict(request.POST, exclude=('csrfmiddlewaretoken', )),
+    }
+    for key, value in (extra_post or {}).items():
+        params["POST"][key] = [value]
+    user = getattr(request, 'user', None)
+    user_id = str(user.pk) if user is not None and user.is_authenticated else ''
+    job = Job.objects.create(
+        app_label=app_label,
+        model_name=model_name,
+        action=action,
+        params=json.dumps(params),
+        user_id=user_id,
+    )
+    remember_job(request, job)
+    return job
+
+
+def remember_job(request, job):
+    """ 将任务id保存到session中，未登录用户只能查看自己提交的任务，见CURDConfig.get_job
+    Args:
+        request: 当前请求对象
+        job: 当前请求提交的Job对象
+    """
+
+    session = getattr(request, 'session', None)
+    if session is None:
+        return
+    session[SESSION_JOBS_KEY] = (session.get(SESSION_JOBS_KEY) or [])[-(SESSION_JOBS_LIMIT - 1):] + [job.pk]
+
+
+def is_submitted_by(request, job):
+    """ 判断任务是否由当前请求的用户提交。登录用户提交的任务按用户id判断，未登录用户提交的任务按session中保存的任务id判断
+    Args:
+        request: 当前请求对象
+        job: Job对象
+    Return:
+        True/False
+    """
+
+    if job.user_id:
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_authenticated and str(user.pk) == job.user_id
+    session = getattr(request, 'session', None)
+    return session is not None and job.pk in (session.get(SESSION_JOBS_KEY) or [])
+
+
+def build_request(job):
+    """ 根据任务中保存的参数重新构造一个请求对象，action函数可以像在视图中一样使用它 """
+
+    params = job.get_params()
+    request = HttpRequest()
+    request.method = 'POST' if job.action != EXPORT_ACTION else 'GET'
+    request.path = request.path_info = params.get('path', '/')
+    request.GET = QueryDict(mutable=True)
+    for key, value_list in params.get('GET', {}).items():
+        request.GET.setlist(key, value_list)
+    request.POST = QueryDict(mutable=True)
+    for key, value_list in params.get('POST', {}).items():
+        request.POST.setlist(key, value_list)
+
+    if 'django.contrib.auth' in settings.INSTALLED_APPS:
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import AnonymousUser
+        request.user = AnonymousUser()          # 匿名用户提交的任务，action中同样可以使用request.user
+        if job.user_id:
+            request.user = get_user_model()._default_manager.filter(pk=job.user_id).first() or AnonymousUser()
+    return request
+
+
+def run_job(job):
+    """ 执行一个后台任务，任务进度由action函数通过config_obj.update_job_progress()记录
+    Args:
+        job: 状态为"正在执行"的Job对象
+    """
+
+    from curd.service.sites import site
+
+    try:
+        config_obj = site.get_config(job.app_label, job.model_name)
+        if config_obj is None:
+            raise LookupError('模型%s.%s没有注册' % (job.app_label, job.model_name))
+        request = build_request(job)
+        config_obj = config_obj.bind_request(request)
+        config_obj.job = job
+
+        if job.action == EXPORT_ACTION:
+            ret = config_obj.export_to_file(request)
+        elif job.action == IMPORT_ACTION:
+            ret = config_obj.import_from_file(request)
+        else:
+            if job.action not in [func.__name__ for func in config_obj.get_action_list()]:
+                raise LookupError('action %s不存在' % job.action)
+            ret = getattr(config_obj, job.action)(request)
+        result = '' if ret is None or isinstance(ret, HttpResponseBase) else str(ret)
+    except Exception:
+        job.finish(error=traceback.format_exc())
+    else:
+        job.finish(result=result)
+
+
+def get_job_timeout():
+    """ 任务没有活动(心跳)的最长时间(秒)，可以通过settings.CURD_JOB_TIMEOUT配置，默认为1小时 """
+
+    return getattr(settings, 'CURD_JOB_TIMEOUT', 3600)
+
+
+def expire_jobs(timeout=None):
+    """ 将超过timeout秒没有活动的"正在执行"状态的任务标记为执行失败。执行任务的进程被杀死、
+        服务器重启时任务不会再结束，action可能已经执行了一部分，重新执行不一定安全，所以不重新放回队列。
+        任务的活动时间在领取时和每次调用Job.update_progress时更新，执行时间较长的action需要定期调用
+        CURDConfig.update_job_progress，否则会被当作执行进程已经退出
+    Args:
+        timeout: 没有活动的最长时间(秒)，默认为get_job_timeout()
+    Return:
+        标记为执行失败的任务数
+    """
+
+    timeout = get_job_timeout() if timeout is None else timeout
+    now = timezone.now()
+    deadline = now - timedelta(seconds=timeout)
+    inactive = Q(heartbeat_time__lt=deadline) | Q(heartbeat_time__isnull=True, started_time__lt=deadline)
+    return Job.objects.filter(inactive, status=Job.RUNNING).update(
+        status=Job.FAILED,
+        error='任务超过%s秒没有更新进度，执行进程可能已经退出' % timeout,
+        finished_time=now,
+    )
+
+
+def claim_job(worker_name):
+    """ 领取一个等待执行的任务。使用带状态条件的UPDATE语句领取，多个进程/线程同时领取时只有一个能成功，
+        不依赖SELECT ... FOR UPDATE，SQLite中同样可用。领取之前先将执行超时的任务标记为执行失败，见expire_jobs
+    Args:
+        worker_name: 执行进程的名称
+    Return:
+        领取成功时返回Job对象，没有等待执行的任务时返回None
+    """
+
+    expire_jobs()
+    pending_id_list = Job.objects.filter(status=Job.PENDING).order_by('pk').values_list('pk', flat=True)[:10]
+    for job_id in pending_id_list:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+            status=Job.RUNNING,
+            worker=worker_name,
+            started_time=now,
+            heartbeat_time=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+class Worker(object):
+    """ 后台任务执行进程，使用多个线程从任务表中领取并执行任务
+
+    """
+
+    def __init__(self, thread_count=1, poll_interval=2.0, once=False, stdout=None):
+        """ 初始化Worker的实例
+        Args:
+            thread_count: 线程数
+            poll_interval: 没有任务时的轮询间隔，单位为秒
+            once: 为True时执行完当前所有等待执行的任务后退出
+            stdout: 输出日志的文件对象
+        """
+
+        self.thread_count = thread_count
+        self.poll_interval = poll_interval
+        self.once = once
+        self.stdout = stdout
+        self.stop_event = threading.Event()
+        self.name = '%s:%s' % (socket.gethostname(), os.getpid())
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def work(self, index):
+        """ 每一个线程的主循环 """
+
+        worker_name = '%s:%s' % (self.name, index)
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                job = claim_job(worker_name)
+                if job is None:
+                    if self.once:
+                        return
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                self.log('[%s] 开始执行 %s' % (worker_name, job))
+                run_job(job)
+                self.log('[%s] %s %s' % (worker_name, job, job.get_status_display()))
+        finally:
+            connection.close()              # 每个线程都有自己的数据库连接
+
+    def run(self):
+        """ 启动所有线程并等待它们结束 """
+
+        thread_list = [
+            threading.Thread(target=self.work, args=(index, ), daemon=True)
+            for index in range(self.thread_count)
+        ]
+        for thread in thread_list:
+            thread.start()
+        try:
+            for thread in thread_list:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            for thread in thread_list:
+                thread.join()
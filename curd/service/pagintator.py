@@ -1,7 +1,13 @@
+import logging
 from copy import deepcopy
+from django.core.exceptions import ValidationError
+
+
+logger = logging.getLogger(__name__)
+
 
 class Paingator:
-    def __init__(self, request, base_url, obj_count, params=None, per_page_count=10, init_page_count=11):
+    def __init__(self, request, base_url, obj_count, params=None, per_page_count=10, init_page_count=11, is_estimate=False):
         """ 初始化Paingator的实例
         Args:
             request: 当前请求对象
@@ -10,9 +16,11 @@ class Paingator:
             obj_count: 要分页显示的所有记录对象的总个数
             per_page_count: 每一页要显示记录对象数量，默认位10
             init_page_count: 页面中页码的个数，默认位11
+            is_estimate: obj_count是否为估算值，估算值会在页码后面显示"约N页"
         """
 
         self.total_count = obj_count
+        self.is_estimate = is_estimate
         self.per_page_count = per_page_count
         self.init_page_count = init_page_count
         self.half_page_num = int((init_page_count-1)/2)
@@ -30,7 +38,9 @@ class Paingator:
             self.current_page_num = int(request.GET.get('page', 1))
         except Exception as e:
             print(e)
-            self.current_page_num += 1
+            self.current_page_num = 1
+        if self.current_page_num < 1:
+            self.current_page_num = 1
 
         # 生成页面上的起始页码和终止页码
         if self.max_page_num <= init_page_count:
@@ -64,6 +74,16 @@ class Paingator:
 
         return self.current_page_num * self.per_page_count
 
+    def page_queryset(self, queryset):
+        """ 获取当前页面要显示的记录
+        Args:
+            queryset: 要分页的QuerySet对象
+        Return:
+            切片之后的QuerySet对象
+        """
+
+        return queryset[self.start:self.end]
+
     def page_html(self):
         """ 生成页面上的页码超链接
 
@@ -76,6 +96,8 @@ class Paingator:
                 page_link_list.append('<a class="page active" href="%s?%s">%s</a>' % (self.base_url, self.params.urlencode(), i))
             else:
                 page_link_list.append('<a class="page"href="%s?%s">%s</a>' % (self.base_url, self.params.urlencode(), i))
+        if self.is_estimate:
+            page_link_list.append('<span class="page">约%s页</span>' % self.max_page_num)
         page_link_list = ''.join(page_link_list)
         return page_link_list
 
@@ -91,5 +113,156 @@ class Paingator:
                 page_link_list.append('<li class="active"><a class="page" href="%s?%s">%s</a></li>' % (self.base_url, self.params.urlencode(), i))
             else:
                 page_link_list.append('<li><a class="page"href="%s?%s">%s</a></li>' % (self.base_url, self.params.urlencode(), i))
+        if self.is_estimate:
+            page_link_list.append('<li class="disabled"><span>约%s页</span></li>' % self.max_page_num)
         page_link_list = ''.join(page_link_list)
-        return page_link_list
\ No newline at end of file
+        return page_link_list
+
+class KeysetPaingator:
+    """ 基于游标(keyset)的分页，使用"WHERE 排序字段 > 上一页最后一条记录的值"代替OFFSET，
+        不需要统计记录总数，无论翻到多深的页面，每一页的查询代价都是固定的
+
+    """
+
+    after_key = '_after'        # 查询下一页时携带的游标参数
+    before_key = '_before'      # 查询上一页时携带的游标参数
+
+    def __init__(self, request, base_url, ordering, params=None, per_page_count=10):
+        """ 初始化KeysetPaingator的实例
+        Args:
+            request: 当前请求对象
+            base_url: 用于拼接页码超链接的url
+            ordering: 排序字段，必须是有索引且值唯一的字段，比如"id"，降序时为"-id"
+            params: 存放列表页面的搜索条件，生成翻页超链接时需要将其拼接在url的查询部分
+            per_page_count: 每一页要显示记录对象数量，默认位10
+        """
+
+        self.request = request
+        self.base_url = base_url
+        self.ordering = ordering
+        self.field_name = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+        self.per_page_count = per_page_count
+
+        params = deepcopy(params)
+        params._mutable = True
+        for key in (self.after_key, self.before_key, 'page'):
+            params.pop(key, None)
+        self.params = params
+
+        self.after = request.GET.get(self.after_key)
+        self.before = request.GET.get(self.before_key)
+        self.has_prev = False
+        self.has_next = False
+        self.first_value = None
+        self.last_value = None
+
+    def _seek(self, queryset, cursor, forward):
+        """ 根据游标过滤记录并排序
+        Args:
+            queryset: 要分页的QuerySet对象
+            cursor: 游标的值，为None时表示从头开始
+            forward: 向后翻页时为True，向前翻页时为False
+        Return:
+            过滤和排序之后的QuerySet对象
+        """
+
+        ascending = forward != self.descending
+        if cursor is not None:
+            lookup = '%s__%s' % (self.field_name, 'gt' if ascending else 'lt')
+            queryset = queryset.filter(**{lookup: cursor})
+        return queryset.order_by(self.field_name if ascending else '-%s' % self.field_name)
+
+    def page_queryset(self, queryset):
+        """ 获取当前页面要显示的记录，多查询一条记录用来判断是否还有下一页/上一页
+        Args:
+            queryset: 要分页的QuerySet对象
+        Return:
+            当前页面的记录对象组成的列表
+        """
+
+        try:
+            if self.before is not None:
+                rows = list(self._seek(queryset, self.before, forward=False)[:self.per_page_count + 1])
+                self.has_prev = len(rows) > self.per_page_count
+                self.has_next = True
+                rows = rows[:self.per_page_count]
+                rows.reverse()
+            else:
+                rows = list(self._seek(queryset, self.after, forward=True)[:self.per_page_count + 1])
+                self.has_prev = self.after is not None
+                self.has_next = len(rows) > self.per_page_count
+                rows = rows[:self.per_page_count]
+        except (ValueError, ValidationError) as e:      # 客户端提供的游标不合法时从第一页开始
+            logger.debug('游标不合法: %s', e)
+            self.after = self.before = None
+            return self.page_queryset(queryset)
+
+        if rows:
+            self.first_value = self._value(rows[0])
+            self.last_value = self._value(rows[-1])
+        return rows
+
+    def _value(self, row):
+        """ 读取一条记录的排序字段的值，记录可以是记录对象或者values()返回的字典 """
+
+        if isinstance(row, dict):
+            return row[self.field_name]
+        return row.serializable_value(self.field_name)
+
+    def _link(self, key, value):
+        """ 生成翻页超链接的url """
+
+        params = self.params.copy()
+        params[key] = value
+        return '%s?%s' % (self.base_url, params.urlencode())
+
+    def next_link(self):
+        """ 下一页的url，需要在page_queryset()之后调用
+        Return:
+            字符串形式的url，没有下一页时为None
+        """
+
+        if self.has_next and self.last_value is not None:
+            return self._link(self.after_key, self.last_value)
+        return None
+
+    def previous_link(self):
+        """ 上一页的url，需要在page_queryset()之后调用
+        Return:
+            字符串形式的url，没有上一页时为None
+        """
+
+        if self.has_prev and self.first_value is not None:
+            return self._link(self.before_key, self.first_value)
+        return None
+
+    def page_html(self):
+        """ 生成页面上的上一页/下一页超链接
+
+        """
+
+        page_link_list = []
+        previous_link, next_link = self.previous_link(), self.next_link()
+        if previous_link is not None:
+            page_link_list.append('<a class="page" href="%s">上一页</a>' % previous_link)
+        if next_link is not None:
+            page_link_list.append('<a class="page" href="%s">下一页</a>' % next_link)
+        return ''.join(page_link_list)
+
+    def bootstrap_page_html(self):
+        """ 生成页面上的上一页/下一页超链接
+
+        """
+
+        page_link_list = []
+        previous_link, next_link = self.previous_link(), self.next_link()
+        if previous_link is not None:
+            page_link_list.append('<li><a class="page" href="%s">上一页</a></li>' % previous_link)
+        else:
+            page_link_list.append('<li class="disabled"><span>上一页</span></li>')
+        if next_link is not None:
+            page_link_list.append('<li><a class="page" href="%s">下一页</a></li>' % next_link)
+        else:
+            page_link_list.append('<li class="disabled"><span>下一页</span></li>')
+        return ''.join(page_link_list)
@@ -0,0 +1,117 @@
+from django.core.exceptions import FieldDoesNotExist
+
+
+class QueryPlanner(object):
+    """ 列表页面查询规划类，根据list_display以及组合搜索的配置为QuerySet添加
+        select_related/prefetch_related/only/distinct，保证无论一页显示多少条记录，
+        列表页面的查询次数都是固定的
+
+        list_display中的功能函数可以通过设置函数对象的`depends_on`属性来声明它用到的字段，比如：
+            author_display.depends_on = ('authors', )
+            like_this.depends_on = ()               # 只用到了obj.pk
+        没有声明`depends_on`的功能函数可能会访问记录对象的任意字段，此时不会使用only()
+    """
+
+    def __init__(self, model_class, list_display, combain_search_field_list=None, combain_condition=None):
+        """ 初始化QueryPlanner的实例
+        Args:
+            model_class: 列表页面对应的模型类
+            list_display: 列表页面表格要显示的字段与功能函数
+            combain_search_field_list: 组合搜索的SearchOption对象列表
+            combain_condition: 当前生效的组合搜索条件，比如{"authors__in": ['1', '2']}
+        """
+
+        self.model_class = model_class
+        self.list_display = list_display
+        self.combain_search_field_list = combain_search_field_list or []
+        self.combain_condition = combain_condition or {}
+
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only_fields = {model_class._meta.pk.name}
+        self.can_defer = bool(list_display)
+        self.distinct = False
+        self.related_models = set()         # 列表页面用到的关联模型类，用于缓存失效
+        self._analyze()
+
+    def _analyze(self):
+        """ 遍历list_display与组合搜索配置，收集要关联查询的字段 """
+
+        for field in self.list_display:
+            if isinstance(field, str):
+                self.add_path(field)
+                continue
+            depends_on = getattr(field, 'depends_on', None)
+            if depends_on is None:              # 功能函数没有声明依赖，无法确定要加载的字段
+                self.can_defer = False
+                continue
+            for path in depends_on:
+                self.add_path(path)
+
+        # 组合搜索中对多对多/反向关联字段的过滤会产生重复记录
+        for option in self.combain_search_field_list:
+            if '%s__in' % option.field_name not in self.combain_condition:
+                continue
+            try:
+                field = self.model_class._meta.get_field(option.field_name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_many or field.one_to_many:
+                self.distinct = True
+
+    def add_path(self, path):
+        """ 解析一个字段路径，比如"publish"、"authors"、"publish__city"，也可以是反向关联，比如作者的"book"
+        Args:
+            path: 以"__"分隔的字段路径
+        """
+
+        model = self.model_class
+        relation_parts = []
+        accessor_parts = []
+        is_multi = False
+        for index, part in enumerate(path.split('__')):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:           # 属性或者方法，只能加载完整的记录
+                self.can_defer = False
+                break
+
+            is_reverse = field.auto_created and not field.concrete          # 反向关联，比如作者的"book"
+            # 只有当前表中的列才能用于only()
+            if index == 0 and field.concrete and not is_reverse and not field.many_to_many:
+                self.only_fields.add(field.name)
+
+            if not field.is_relation:
+                break
+            relation_parts.append(part)
+            # prefetch_related按照记录对象的属性查找，反向关联的属性名是"book_set"或者related_name
+            accessor_parts.append(field.get_accessor_name() if is_reverse else part)
+            if field.many_to_many or field.one_to_many:
+                is_multi = True
+            model = field.related_model
+            self.related_models.add(model)
+
+        if not relation_parts:
+            return
+        if is_multi:
+            self.prefetch_related.add('__'.join(accessor_parts))
+        else:
+            self.select_related.add('__'.join(relation_parts))
+
+    def plan(self, queryset):
+        """ 将收集到的关联查询条件应用到QuerySet上
+        Args:
+            queryset: 列表页面的QuerySet对象
+        Return:
+            添加了关联查询条件的QuerySet对象
+        """
+
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if self.can_defer:
+            queryset = queryset.only(*sorted(self.only_fields))
+        if self.distinct:
+            queryset = queryset.distinct()
+        return queryset
@@ -0,0 +1,86 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+logger = logging.getLogger('curd.profile')
+
+
+class ColumnProfile(object):
+    """ list_display中一列在当前页面所有单元格上的统计数据 """
+
+    def __init__(self, name):
+        self.name = name
+        self.time = 0.0             # 总耗时(秒)
+        self.queries = 0            # 生成单元格时执行的SQL查询次数
+        self.cells = 0              # 单元格个数
+
+
+class ColumnProfiler(object):
+    """ 统计列表页面每一列的耗时，并将生成单元格时执行的SQL查询归到对应的列，
+        用来找到list_display中拖慢页面的功能函数
+
+    """
+
+    def __init__(self, config_obj, columns):
+        """ 初始化ColumnProfiler的实例
+        Args:
+            config_obj: 当前请求的config对象
+            columns: 列表页面的Column对象
+        """
+
+        self.config_obj = config_obj
+        self.profiles = [ColumnProfile(column.name) for column in columns]
+        self.current = None         # 正在生成单元格的列
+
+    def __call__(self, execute, sql, params, many, context):
+        """ connection.execute_wrapper()的包装函数，将查询归到正在生成单元格的列 """
+
+        if self.current is not None:
+            self.current.queries += 1
+        return execute(sql, params, many, context)
+
+    def row(self, obj, cells):
+        """ 生成一行数据，统计每一个单元格的耗时和查询次数
+        Args:
+            obj: 记录对象
+            cells: 绑定好的读取单元格数据的函数
+        Return:
+            单元格数据组成的列表
+        """
+
+        row = []
+        with ExitStack() as stack:          # 只在生成单元格时监听查询，不会统计到模板中其他部分的查询
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            for profile, cell in zip(self.profiles, cells):
+                self.current = profile
+                start = time.perf_counter()
+                try:
+                    row.append(cell(obj))
+                finally:
+                    profile.time += time.perf_counter() - start
+                    profile.cells += 1
+                    self.current = None
+        return row
+
+    def report(self):
+        """ 按照耗时降序排列的统计结果
+        Return:
+            ColumnProfile对象组成的列表
+        """
+
+        return sorted(self.profiles, key=lambda profile: profile.time, reverse=True)
+
+    def log(self):
+        """ 将统计结果写入"curd.profile"日志 """
+
+        lines = ['%s.%s 列表页面各列耗时:' % self.config_obj.get_app_model()]
+        for profile in self.report():
+            lines.append('  %-30s %10.3fms %5s次查询 %6s个单元格 %10.3fms/单元格' % (
+                profile.name, profile.time * 1000, profile.queries, profile.cells,
+                profile.time * 1000 / profile.cells if profile.cells else 0
+            ))
+        logger.info('\n'.join(lines))
@@ -0,0 +1,102 @@
+import re
+
+from django.urls import URLResolver, Resolver404
+from django.urls.resolvers import RegexPattern, RoutePattern
+
+
+URL_PREFIX_RE = re.compile(r'^(api/)?[^/]+/[^/]+/$')       # 可以通过字典分发的路由前缀
+
+
+class SiteResolver(URLResolver):
+    """ CURDSite的路由分发器。路径的前两段(接口为前三段)就是"<app>/<model>/"，通过一次字典查找
+        交给对应config对象的路由去匹配，不需要逐个尝试所有模型类的正则，注册的模型类再多匹配时间也不会增加。
+        反向解析仍然使用Django的实现，遍历CURDSite生成的路由列表
+
+    """
+
+    def __init__(self, site):
+        """ 初始化SiteResolver的实例
+        Args:
+            site: CURDSite对象，路由在第一次使用时从site中读取，注册新的模型类之后重新读取
+        """
+
+        super().__init__(RegexPattern(r''), None)
+        self.site = site
+
+    @property
+    def url_patterns(self):
+        return self.site.get_url_patterns()
+
+    def reset(self):
+        """ 清空反向解析时生成的数据，CURDSite的路由发生变化时调用。上级路由(比如path('curd/', site.urls)
+            生成的URLResolver)在Django的缓存清空之后重新生成反向解析数据时，会重新读取当前分发器的数据
+        """
+
+        reset_resolver(self)
+
+    def resolve(self, path):
+        path = str(path)
+        url_map, fallback_patterns = self.site.get_url_map()
+
+        parts = path.split('/', 3)
+        for count in (2, 3):            # "<app>/<model>/"和"api/<app>/<model>/"
+            if len(parts) <= count:
+                break
+            pattern = url_map.get('%s/' % '/'.join(parts[:count]))
+            if pattern is not None:
+                return pattern.resolve(path)
+
+        # 自定义CURDSite.get_urls()时添加的其他路由，按顺序逐个匹配
+        tried = []
+        for pattern in fallback_patterns:
+            try:
+                sub_match = pattern.resolve(path)
+            except Resolver404 as e:
+                sub_tried = e.args[0].get('tried')
+                if sub_tried is not None:
+                    tried.extend([pattern] + t for t in sub_tried)
+                else:
+                    tried.append([pattern])
+            else:
+                if sub_match:
+                    return sub_match
+                tried.append([pattern])
+        raise Resolver404({'tried': tried, 'path': path})
+
+
+class LazyConfigResolver(URLResolver):
+    """ 延迟注册的模型类的路由。匹配到该模型类的url时才导入配置类；配置类加载之前，
+        反向解析使用CURDConfig默认的增删改查等路由，加载之后CURDSite会重新生成路由
+
+    """
+
+    def __init__(self, route, lazy_config, api=False):
+        """ 初始化LazyConfigResolver的实例
+        Args:
+            route: 路由前缀，比如"trial/book/"
+            lazy_config: LazyConfig对象
+            api: 是否为json接口的路由
+        """
+
+        super().__init__(RoutePattern(route), None)
+        self.lazy_config = lazy_config
+        self.api = api
+
+    @property
+    def url_patterns(self):
+        config_obj = self.lazy_config.config_obj or self.lazy_config.default_config
+        return config_obj.api_urls if self.api else config_obj.urls
+
+    def resolve(self, path):
+        self.lazy_config.load()
+        return super().resolve(path)
+
+
+def reset_resolver(resolver):
+    """ 清空URLResolver中反向解析时生成的数据，下一次反向解析时重新生成 """
+
+    resolver._reverse_dict = {}
+    resolver._namespace_dict = {}
+    resolver._app_dict = {}
+    resolver._callback_strs = set()
+    resolver._populated = False
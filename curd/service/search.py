@@ -0,0 +1,341 @@
+import time
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router, transaction
+from django.db.models import Q, AutoField, IntegerField, signals
+from django.db.models.expressions import RawSQL
+
+from curd.service import caching
+from curd.service.bulk import iter_pk_batches
+from curd.service.signals import rows_created, rows_deleted, rows_updated
+
+
+class LikeSearchBackend(object):
+    """ 默认的搜索后端，将search_list中的查询条件使用OR连接，比如"author_name__contains"，
+        数据库中为无法使用索引的LIKE '%x%'
+
+    """
+
+    def __init__(self, model_class, search_list):
+        """ 初始化搜索后端
+        Args:
+            model_class: 模型类
+            search_list: config类中声明的搜索条件，比如['author_name__contains']
+        """
+
+        self.model_class = model_class
+        self.search_list = list(search_list)
+
+    def get_like_condition(self, query_str, search_list):
+        """ 使用OR连接search_list中的查询条件 """
+
+        condition = Q()
+        condition.connector = 'OR'
+        for lookup in search_list:
+            condition.children.append((lookup, query_str))
+        return condition
+
+    def get_condition(self, query_str, search_list):
+        """ 根据搜索框中提交的内容生成查询条件
+        Args:
+            query_str: 搜索框中提交的内容
+            search_list: 当前用户可以搜索的条件，即config对象get_search_list()的返回值
+        Return:
+            Q对象
+        """
+
+        return self.get_like_condition(query_str, search_list)
+
+    def connect(self):
+        """ 连接维护索引需要的信号，注册config对象时调用 """
+
+    def rebuild(self, batch_size=1000):
+        """ 重建索引
+        Return:
+            写入索引的记录数
+        """
+
+        return 0
+
+
+_backends = {}          # {模型类: FullTextSearchBackend对象}，用于信号处理函数查找索引
+
+
+class FullTextSearchBackend(LikeSearchBackend):
+    """ 基于全文索引的搜索后端，为search_list中当前表的字段维护一个单独的索引表，通过信号与记录保持同步，
+        搜索时只需要一次使用索引的主键查询:
+            SQLite: FTS5虚拟表，使用trigram分词，与"__contains"一样可以匹配任意子串
+            PostgreSQL: 每个字段一列，使用pg_trgm的GIN索引，LIKE/ILIKE '%x%'可以使用索引
+        搜索时只匹配当前用户可以搜索的字段，并且每个字段单独匹配，搜索内容不会跨越两个字段的边界
+        索引表需要使用management命令"curd_rebuild_search"创建，索引表不存在、数据库不支持、
+        或者搜索内容少于3个字符(trigram无法使用)时，仍然使用LIKE查询。
+        只有"__contains"、"__icontains"使用索引，关联字段(比如"publish__publish_name__contains")无法通过信号同步，
+        与其他查询方式一样依然使用ORM的查询
+    """
+
+    min_query_length = 3        # trigram至少需要3个字符
+    recheck_interval = 30       # 索引表不存在时，搜索时每隔多少秒重新检查一次，写入索引时每次都检查
+    index_lookups = ('contains', 'icontains')       # 可以使用索引的查询方式，exact、startswith等仍然使用ORM的查询
+
+    def __init__(self, model_class, search_list):
+        super().__init__(model_class, search_list)
+        self.index_fields = []
+        for lookup in self.search_list:
+            field_name = self.get_field_name(lookup)
+            if field_name and field_name not in self.index_fields:
+                self.index_fields.append(field_name)
+        self.table_name = 'curd_fts_%s' % model_class._meta.db_table
+        self._ready = False
+        self._checked_at = None
+
+    def get_field_name(self, lookup):
+        """ 从查询条件中取出当前表的字段名，比如"author_name__contains" -> "author_name"，
+            关联字段以及不是子串匹配的查询条件返回None
+        """
+
+        field_name, *rest = lookup.split('__')
+        if len(rest) != 1 or rest[0] not in self.index_lookups:
+            return None
+        try:
+            field = self.model_class._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return None
+        if field.is_relation or not field.concrete:
+            return None
+        return field_name
+
+    @property
+    def connection(self):
+        return connections[router.db_for_write(self.model_class)]
+
+    @property
+    def vendor(self):
+        return self.connection.vendor
+
+    def is_supported(self):
+        """ 数据库和主键类型是否支持全文索引，索引表使用整数主键 """
+
+        pk = self.model_class._meta.pk
+        return (
+            bool(self.index_fields) and
+            self.vendor in ('sqlite', 'postgresql') and
+            isinstance(pk, (AutoField, IntegerField))
+        )
+
+    def is_ready(self, recheck=False):
+        """ 索引表是否已经创建
+        Args:
+            recheck: 为True时不使用缓存的"索引表不存在"的结果。写入索引时使用，
+                其他进程执行curd_rebuild_search创建索引表之后，当前进程的修改不会因为缓存而丢失
+        Return:
+            True/False
+        """
+
+        if self._ready:
+            return True
+        if not recheck and self._checked_at is not None and time.time() - self._checked_at < self.recheck_interval:
+            return False
+        self._checked_at = time.time()
+        if self.is_supported():
+            with self.connection.cursor() as cursor:
+                self._ready = self.table_name in self.connection.introspection.table_names(cursor)
+        return self._ready
+
+    def get_condition(self, query_str, search_list):
+        if len(query_str) < self.min_query_length or not self.is_ready():
+            return self.get_like_condition(query_str, search_list)
+
+        indexed = [lookup for lookup in search_list if self.get_field_name(lookup) in self.index_fields]
+        if not indexed:
+            return self.get_like_condition(query_str, search_list)
+        sql, params = self.get_search_sql(query_str, indexed)
+        condition = Q(pk__in=RawSQL(sql, params))
+        condition.connector = 'OR'
+        for lookup in search_list:
+            if lookup not in indexed:
+                condition.children.append((lookup, query_str))
+        return condition
+
+    def get_search_sql(self, query_str, lookups):
+        """ 生成在索引表中查询主键的SQL语句
+        Args:
+            query_str: 搜索框中提交的内容
+            lookups: 使用索引的查询条件，比如["author_name__contains"]，只在这些字段中搜索
+        Return:
+            (SQL, 参数列表)
+        """
+
+        quote_name = self.connection.ops.quote_name
+        table = quote_name(self.table_name)
+        if self.vendor == 'sqlite':
+            # 列过滤器"{列1 列2}: "搜索内容""，短语只在单独的一列中匹配。trigram分词不区分大小写，
+            # 与SQLite中"__contains"使用的LIKE一样
+            field_names = list(dict.fromkeys(self.get_field_name(lookup) for lookup in lookups))
+            match = '{%s}: "%s"' % (' '.join(field_names), query_str.replace('"', '""'))
+            return 'SELECT rowid FROM %s WHERE %s MATCH %%s' % (table, table), [match]
+
+        # "__contains"区分大小写使用LIKE，"__icontains"使用ILIKE
+        conditions = list(dict.fromkeys(
+            (self.get_field_name(lookup), 'ILIKE' if lookup.endswith('__icontains') else 'LIKE') for lookup in lookups
+        ))
+        like = '%%%s%%' % query_str.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        where = ' OR '.join('%s %s %%s' % (quote_name(field_name), operator) for field_name, operator in conditions)
+        return 'SELECT id FROM %s WHERE %s' % (table, where), [like] * len(conditions)
+
+    def get_create_sql(self):
+        """ 创建索引表的SQL语句列表 """
+
+        quote_name = self.connection.ops.quote_name
+        table = quote_name(self.table_name)
+        if self.vendor == 'sqlite':
+            columns = ', '.join(quote_name(field_name) for field_name in self.index_fields)
+            return ["CREATE VIRTUAL TABLE %s USING fts5(%s, tokenize='trigram')" % (table, columns)]
+        columns = ''.join(', %s text NOT NULL' % quote_name(field_name) for field_name in self.index_fields)
+        sql_list = [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            'CREATE TABLE %s (id bigint PRIMARY KEY%s)' % (table, columns),
+        ]
+        for field_name in self.index_fields:        # 每一列单独的索引，多个字段的OR查询可以合并使用
+            sql_list.append('CREATE INDEX %s ON %s USING gin (%s gin_trgm_ops)' % (
+                quote_name('%s_%s_trgm' % (self.table_name, field_name)), table, quote_name(field_name)
+            ))
+        return sql_list
+
+    def document(self, values):
+        """ 将一条记录中要索引的字段值转换成字符串 """
+
+        return ['' if value is None else str(value) for value in values]
+
+    def index_rows(self, rows):
+        """ 写入或者更新索引
+        Args:
+            rows: (pk, 字段值1, 字段值2...)组成的列表
+        """
+
+        if not rows or not self.is_ready(recheck=True):
+            return
+        quote_name = self.connection.ops.quote_name
+        table = quote_name(self.table_name)
+        placeholders = ', '.join(['%s'] * (len(self.index_fields) + 1))
+        columns = ', '.join(quote_name(name) for name in self.index_fields)
+        with self.connection.cursor() as cursor:
+            if self.vendor == 'sqlite':
+                self.remove([row[0] for row in rows])
+                cursor.executemany(
+                    'INSERT INTO %s (rowid, %s) VALUES (%s)' % (table, columns, placeholders),
+                    [[row[0]] + self.document(row[1:]) for row in rows]
+                )
+            else:
+                update = ', '.join('%s = EXCLUDED.%s' % (quote_name(name), quote_name(name)) for name in self.index_fields)
+                cursor.executemany(
+                    'INSERT INTO %s (id, %s) VALUES (%s) ON CONFLICT (id) DO UPDATE SET %s' % (
+                        table, columns, placeholders, update
+                    ),
+                    [[row[0]] + self.document(row[1:]) for row in rows]
+                )
+
+    def index_pks(self, pk_list):
+        """ 从模型类的表中读取记录并更新索引 """
+
+        rows = self.model_class._base_manager.filter(pk__in=pk_list).values_list('pk', *self.index_fields)
+        self.index_rows([list(row) for row in rows])
+
+    def remove(self, pk_list):
+        """ 从索引中删除记录 """
+
+        if not pk_list or not self.is_ready(recheck=True):
+            return
+        table = self.connection.ops.quote_name(self.table_name)
+        pk_column = 'rowid' if self.vendor == 'sqlite' else 'id'
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM %s WHERE %s IN (%s)' % (table, pk_column, ', '.join(['%s'] * len(pk_list))),
+                list(pk_list)
+            )
+
+    def connect(self):
+        if not self.index_fields:
+            return
+        _backends[self.model_class] = self
+        label = self.model_class._meta.label_lower
+        signals.post_save.connect(_index_saved, sender=self.model_class, dispatch_uid='curd_search_save_%s' % label)
+        signals.post_delete.connect(_index_deleted, sender=self.model_class, dispatch_uid='curd_search_delete_%s' % label)
+        rows_created.connect(_rows_created, sender=self.model_class, dispatch_uid='curd_search_rows_created_%s' % label)
+        rows_deleted.connect(_rows_deleted, sender=self.model_class, dispatch_uid='curd_search_rows_deleted_%s' % label)
+        rows_updated.connect(_rows_updated, sender=self.model_class, dispatch_uid='curd_search_rows_updated_%s' % label)
+
+    def rebuild(self, batch_size=1000):
+        """ 删除并重新创建索引表，分批写入所有记录 """
+
+        if not self.is_supported():
+            return 0
+        quote_name = self.connection.ops.quote_name
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute('DROP TABLE IF EXISTS %s' % quote_name(self.table_name))
+                for sql in self.get_create_sql():
+                    cursor.execute(sql)
+        self._ready = True
+
+        count = 0
+        for pk_list in iter_pk_batches(self.model_class._base_manager.all(), batch_size):
+            with transaction.atomic(using=self.connection.alias):
+                self.index_pks(pk_list)
+            count += len(pk_list)
+        return count
+
+
+def _index_saved(sender, instance, raw=False, **kwargs):
+    """ 记录保存后更新索引，loaddata(raw=True)时同样需要更新 """
+
+    backend = _backends.get(sender)
+    if backend is not None:
+        backend.index_rows([[instance.pk] + [getattr(instance, name) for name in backend.index_fields]])
+
+
+def _index_deleted(sender, instance, **kwargs):
+    backend = _backends.get(sender)
+    if backend is not None:
+        backend.remove([instance.pk])
+
+
+def _rows_created(sender, pk_list, **kwargs):
+    backend = _backends.get(sender)
+    if backend is not None:
+        backend.index_pks(pk_list)
+
+
+def _rows_deleted(sender, pk_list, **kwargs):
+    backend = _backends.get(sender)
+    if backend is not None:
+        backend.remove(pk_list)
+
+
+def _rows_updated(sender, pk_list, field_names, **kwargs):
+    backend = _backends.get(sender)
+    if backend is not None and set(field_names) & set(backend.index_fields):
+        backend.index_pks(pk_list)
+
+
+def replay_signal(signal, sender, **kwargs):
+    """ 对一次已经发送过的信号执行更新索引的处理函数。在信号处理过程中才连接的处理函数不会收到当前信号，
+        延迟注册的配置类在数据变化时才导入，导入之后使用该函数补上这一次变化。重复执行不会产生错误的索引
+    Args:
+        signal: 信号对象
+        sender: 发送信号的模型类
+        kwargs: 信号的参数
+    """
+
+    receiver = {
+        signals.post_save: _index_saved,
+        signals.post_delete: _index_deleted,
+        rows_created: _rows_created,
+        rows_deleted: _rows_deleted,
+        rows_updated: _rows_updated,
+    }.get(signal)
+    if receiver is not None:
+        receiver(sender, **kwargs)
+
+
+for _receiver in (_index_saved, _index_deleted):
+    caching.add_internal_receiver(_receiver)
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+
+# 批量操作直接使用INSERT/UPDATE/DELETE语句时不会发送模型类的信号，通过下面的信号通知缓存、搜索索引等
+rows_created = Signal(providing_args=['pk_list'])                   # sender为模型类
+rows_deleted = Signal(providing_args=['pk_list'])
+rows_updated = Signal(providing_args=['pk_list', 'field_names'])
@@ -1,10 +1,49 @@
-from django.urls import path, re_path
-from django.shortcuts import render, HttpResponse, redirect
+from django.urls import path, re_path, URLResolver, clear_url_caches
+from django.shortcuts import HttpResponse, redirect
 from django.utils.safestring import mark_safe
-from django.urls import reverse
 from django.forms import ModelForm
-from django.http import QueryDict
+from django.forms.models import ModelChoiceField
+from django.http import QueryDict, JsonResponse, FileResponse, Http404
 from curd.service.views import ShowView
+from curd.service.planner import QueryPlanner
+from curd.service.columns import compile_list_display
+from curd.service.urlcache import cached_reverse, clear_url_templates
+from curd.service.resolver import SiteResolver, LazyConfigResolver, URL_PREFIX_RE
+from curd.service.export import Exporter, EXPORT_FORMATS, openpyxl
+from curd.service.importer import Importer, IMPORT_FORMATS
+from curd.service.widgets import autocomplete_form_class
+from curd.service import bulk
+from curd.service import jobs
+from curd.service import search
+from curd.service import caching
+from curd.service import api
+from curd.service import instrumentation
+from curd.service.instrumentation import render
+from curd.service.pagintator import KeysetPaingator
+from curd.service.signals import rows_created, rows_deleted, rows_updated
+from django.contrib import messages
+from django.db.models import Max, signals
+from django.views.decorators.http import condition
+from django.views.decorators.csrf import csrf_exempt
+from django.forms.models import model_to_dict, modelformset_factory
+from django.conf import settings
+from django.apps import apps
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils.module_loading import import_string
+from django.core.exceptions import ValidationError, EmptyResultSet
+from curd.service import counting
+from hashlib import md5
+from io import StringIO
+from uuid import uuid4
+import logging
+import os
+import threading
+from copy import copy
+from types import MethodType
+
+
+logger = logging.getLogger(__name__)
 
 
 class CURDConfig:
@@ -12,12 +51,15 @@ class CURDConfig:
 
     Methods 分类:
         路由部分:
+                bind_request
                 add_request_decorator
                 get_urls
                 extra_url
 
         功能权限部分:
                 get_list_display
+                get_list_columns
+                get_profile_columns
                 get_show_add_btn
                 get_show_search_form
                 get_search_list
@@ -30,23 +72,96 @@ class CURDConfig:
                 checkbox
 
         反向解析url部分:
+                reverse_url
                 get_delete_url
                 get_change_url
                 get_add_url
                 get_show_url
+                get_export_url
+                get_job_url
+                get_job_download_url
+                get_bulk_edit_url
+                get_import_url
+                get_autocomplete_url
 
         视图函数部分:
                 show_view
                 add_view
                 delete_view
                 change_view
+                export_view
+                job_view
+                job_download_view
+                bulk_edit_view
+                import_view
+                autocomplete_view
+
+        批量操作部分:
+                get_action_queryset
+                get_bulk_update_fields
+                bulk_delete
+                bulk_update
+
+        导出部分:
+                get_show_export_btn
+                get_export_display
+                get_exporter
+                export_to_file
+
+        导入部分:
+                get_show_import_btn
+                get_import_lookup_fields
+                get_importer
+                import_from_file
+
+        后台任务部分:
+                is_async_action
+                update_job_progress
+                get_job
 
         表单部分:
                 get_model_form_class
+                build_model_form_class
+                get_autocomplete_fields
+
+        批量编辑部分:
+                get_show_bulk_edit_btn
+                get_bulk_edit_formset_class
+                get_bulk_edit_queryset
+                parse_bulk_csv
+                build_bulk_forms
 
         搜索功能部分:
+                get_search_backend
                 create_search_condition
                 get_combain_search_field_list
+                get_combain_condition
+                get_queryset
+
+        查询规划部分:
+                get_list_queryset_plan
+
+        列表页面缓存部分:
+                get_list_cache_models
+                get_list_cache_key
+
+        接口部分:
+                get_api_urls
+                has_api_permission
+                get_api_actions
+                get_api_list_fields
+                get_api_detail_fields
+                api_list_view
+                api_detail_view
+                api_bulk_view
+
+        条件请求部分:
+                make_etag
+                get_list_etag
+                get_list_last_modified
+                get_change_cache_models
+                get_change_etag
+                get_change_last_modified
 
     """
 
@@ -55,6 +170,7 @@ class CURDConfig:
         self.site = curb_site_obj
         self.request = None
         self._query_str_key = '_filter'
+        self._cache = {}            # 存放编译后的列等只需计算一次的数据，所有请求的副本共享该字典
 
     def get_app_model(self):
         """ 获取当前模型类的名称和该模型类所在应用的名称
@@ -68,18 +184,48 @@ class CURDConfig:
         )
         return app_model
 
-    def add_request_decorator(self, view_func):
+    def bind_request(self, request):
+        """ 为当前请求创建一个配置对象的副本，并为副本添加request属性。
+            注册时创建的config对象被所有线程共享，不能直接修改它的request属性，
+            否则在多线程的WSGI服务器中，并发的请求会相互覆盖对方的request
+        Args:
+            request: 当前请求对象
+        Return:
+            只属于当前请求的config对象
+        """
+
+        config_obj = copy(self)         # 浅拷贝，副本和原对象共享model_class、site等属性
+        config_obj.request = request
+        return config_obj
+
+    def add_request_decorator(self, view_func, conditional=None):
         """ 在执行进入视图函数之前为config对象添加request属性
             本项目中没有使用语法糖"@"，而是使用了比较原始的方式.
             比如：
                 使用"self.add_request_decorator(self.show_view)"
+            视图函数实际上会在bind_request()创建的副本上执行，所以视图函数以及它调用的
+            get_list_display、create_search_condition等方法中仍然可以使用self.request
         Args:
             view_func: 要被装饰的视图函数
+            conditional: (生成ETag的方法名, 生成Last-Modified的方法名)，开启了conditional_get时，
+                GET请求的数据没有变化时直接返回304，不会执行视图函数
         """
 
         def inner(request, *args, **kwargs):
-            self.request = request
-            return view_func(request, *args, **kwargs)
+            config_obj = self.bind_request(request)
+            func = view_func
+            if getattr(view_func, '__self__', None) is self:        # 将方法绑定到当前请求的副本上
+                func = MethodType(view_func.__func__, config_obj)
+            if conditional and config_obj.conditional_get and request.method in ('GET', 'HEAD'):
+                etag_func, last_modified_func = [getattr(config_obj, name) for name in conditional]
+                func = condition(etag_func=etag_func, last_modified_func=last_modified_func)(func)
+            if not instrumentation.is_enabled():
+                return func(request, *args, **kwargs)
+
+            # 统计视图函数的耗时、查询次数等，汇总到CURDSite的metrics接口
+            with instrumentation.record_view(self.model_class._meta.label_lower, view_func.__name__) as record:
+                response = func(request, *args, **kwargs)
+            return instrumentation.add_footer(response, record)
         return inner
 
     def get_urls(self):
@@ -91,10 +237,22 @@ class CURDConfig:
         # 生成增、删、改、查基本映射关系
         app_model = self.get_app_model()
         urlpatterns = [
-            re_path(r'^$', self.add_request_decorator(self.show_view), name='%s_%s_show' % app_model),
+            re_path(r'^$', self.add_request_decorator(self.show_view, ('get_list_etag', 'get_list_last_modified')),
+                    name='%s_%s_show' % app_model),
             re_path(r'^add/$', self.add_request_decorator(self.add_view), name='%s_%s_add' % app_model),
             re_path(r'^(\d+)/delete/$', self.add_request_decorator(self.delete_view), name='%s_%s_delete' % app_model),
-            re_path(r'^(\d+)/change/$', self.add_request_decorator(self.change_view), name='%s_%s_change' % app_model),
+            re_path(r'^(\d+)/change/$',
+                    self.add_request_decorator(self.change_view, ('get_change_etag', 'get_change_last_modified')),
+                    name='%s_%s_change' % app_model),
+            re_path(r'^export/$', self.add_request_decorator(self.export_view), name='%s_%s_export' % app_model),
+            re_path(r'^autocomplete/$', self.add_request_decorator(self.autocomplete_view),
+                    name='%s_%s_autocomplete' % app_model),
+            re_path(r'^import/$', self.add_request_decorator(self.import_view), name='%s_%s_import' % app_model),
+            re_path(r'^bulk_edit/$', self.add_request_decorator(self.bulk_edit_view),
+                    name='%s_%s_bulk_edit' % app_model),
+            re_path(r'^jobs/(\d+)/$', self.add_request_decorator(self.job_view), name='%s_%s_job' % app_model),
+            re_path(r'^jobs/(\d+)/download/$', self.add_request_decorator(self.job_download_view),
+                    name='%s_%s_job_download' % app_model),
         ]
 
         # 扩展路由映射关系
@@ -104,7 +262,30 @@ class CURDConfig:
 
     @property
     def urls(self):
-        return self.get_urls()
+        # 路由只生成一次，视图函数在执行时才绑定到当前请求的副本上，不需要每次重新生成
+        if 'urls' not in self._cache:
+            self._cache['urls'] = self.get_urls()
+        return self._cache['urls']
+
+    def get_api_urls(self):
+        """ 生成json接口的路由关系，CURDSite开启了接口时使用。接口只接受json格式的请求体，不需要校验CSRF token
+        Return:
+            返回存放路由关系的列表
+        """
+
+        app_model = self.get_app_model()
+        return [
+            re_path(r'^$', csrf_exempt(self.add_request_decorator(self.api_list_view)), name='%s_%s_api_list' % app_model),
+            re_path(r'^bulk/$', csrf_exempt(self.add_request_decorator(self.api_bulk_view)), name='%s_%s_api_bulk' % app_model),
+            re_path(r'^(\d+)/$', csrf_exempt(self.add_request_decorator(self.api_detail_view)),
+                    name='%s_%s_api_detail' % app_model),
+        ]
+
+    @property
+    def api_urls(self):
+        if 'api_urls' not in self._cache:
+            self._cache['api_urls'] = self.get_api_urls()
+        return self._cache['api_urls']
 
     def extra_url(self):
         """ 为用户扩展urls提供的接口，只需要在CURDConfig派生类中派生覆盖此方法即可
@@ -131,6 +312,38 @@ class CURDConfig:
             data.insert(0, CURDConfig.checkbox)
         return data
 
+    def get_list_columns(self, list_display):
+        """ 获取list_display编译后的列，同样的list_display只会编译一次
+        Args:
+            list_display: get_list_display()的返回值
+        Return:
+            Column对象组成的元组
+        """
+
+        key = ('columns', tuple(list_display))
+        columns = self._cache.get(key)
+        if columns is None:
+            columns = compile_list_display(self.model_class, list_display)
+            self._cache[key] = columns
+        return columns
+
+    profile_columns = False     # 是否统计列表页面每一列的耗时和查询次数，结果写入"curd.profile"日志
+
+    def get_profile_columns(self):
+        """ 是否统计列表页面每一列的耗时，开启了profile_columns、settings.CURD_PROFILE_COLUMNS，
+            或者staff用户的请求中带有"_profile=1"参数时开启，开启时不使用列表页面的缓存
+        Return:
+            True/False
+        """
+
+        if self.profile_columns or getattr(settings, 'CURD_PROFILE_COLUMNS', False):
+            return True
+        request = self.request
+        if request is None or not request.GET.get('_profile'):
+            return False
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+
     show_add_btn = False        # 先否显示添加按钮权限接口
 
     def get_show_add_btn(self):
@@ -156,6 +369,8 @@ class CURDConfig:
             return '删除'
         return mark_safe('<a href="%s">删除</a>' % (self.get_delete_url(obj.id), ))
 
+    delete.depends_on = ()          # 只用到了记录的id，用于列表页面的查询规划
+
     def change(self, obj=None, is_header=False):
         """ 列表页面单条记录编辑按钮/链接，可以在CURDConfig派生类中根据用户权限分配该功能
         Args:
@@ -175,6 +390,8 @@ class CURDConfig:
             params[self._query_str_key] = query_str
             return mark_safe('<a href="%s?%s">编辑</a>' % (self.get_change_url(obj.id), params.urlencode(), ))
 
+    change.depends_on = ()
+
     def checkbox(self, obj=None, is_header=False):
         """ 列表页面单条记录的选择checkbox，用于批量记录操作，可以在CURDConfig派生类中根据用户权限分配该功能
         Args:
@@ -188,6 +405,20 @@ class CURDConfig:
             return '选择'
         return mark_safe('<input type="checkbox" name="id" value="%s" />' % (obj.id, ))
 
+    checkbox.depends_on = ()
+
+    def reverse_url(self, alias, nid=None):
+        """ 反向解析url，每一个别名只会执行一次reverse()，之后只需要拼接记录id，
+            列表页面每一行的功能链接都应该使用该方法生成
+        Args:
+            alias: url的别名，比如"curd:trial_book_change"
+            nid: 记录的id，没有参数的url不需要传递
+        Return:
+            字符串形式的路径
+        """
+
+        return cached_reverse(alias, nid)
+
     def get_delete_url(self, nid):
         """ 获取删除记录对应的路径
         Args:
@@ -197,7 +428,7 @@ class CURDConfig:
         """
 
         alias = 'curd:%s_%s_delete' % self.get_app_model()
-        return reverse(alias, args=(nid, ))
+        return self.reverse_url(alias, nid)
 
     def get_change_url(self, nid):
         """ 获取编辑记录对应的url
@@ -208,7 +439,7 @@ class CURDConfig:
         """
 
         alias = 'curd:%s_%s_change' % self.get_app_model()
-        return reverse(alias, args=(nid, ))
+        return self.reverse_url(alias, nid)
 
     def get_show_url(self):
         """ 获取列表页面的url
@@ -217,7 +448,7 @@ class CURDConfig:
         """
 
         alias = 'curd:%s_%s_show' % self.get_app_model()
-        return reverse(alias)
+        return self.reverse_url(alias)
 
     def get_add_url(self):
         """ 获取增加记录对应的url
@@ -226,51 +457,161 @@ class CURDConfig:
         """
 
         alias = 'curd:%s_%s_add' % self.get_app_model()
-        return reverse(alias)
+        return self.reverse_url(alias)
+
+    def get_export_url(self):
+        """ 获取导出记录对应的url
+        Return:
+            字符串形式的路径
+        """
+
+        alias = 'curd:%s_%s_export' % self.get_app_model()
+        return self.reverse_url(alias)
+
+    def get_job_url(self, nid):
+        """ 获取后台任务状态对应的url
+        Args:
+            nid: 任务的id
+        Return:
+            字符串形式的路径
+        """
+
+        alias = 'curd:%s_%s_job' % self.get_app_model()
+        return self.reverse_url(alias, nid)
+
+    def get_job_download_url(self, nid):
+        """ 获取后台导出任务生成的文件对应的url
+        Args:
+            nid: 任务的id
+        Return:
+            字符串形式的路径
+        """
+
+        alias = 'curd:%s_%s_job_download' % self.get_app_model()
+        return self.reverse_url(alias, nid)
 
     def show_view(self, request, *args, **kwargs):
         """ 列表页面对应的视图函数
         功能:
             1. 对于GET请求，返回列表页面
             2. 对于批量操作action的POST请求，执行该action，执行完该action之后，可以自定义返回值，也可以没有，按需求而定
+            3. 标记为后台执行的action不会在请求中执行，而是创建一个后台任务，页面中显示任务的进度
         Return:
             HttpResponse: 返回包含渲染好了的页面的响应对象
         """
 
+        job = self.get_job(request.GET.get('_job'))
         if request.method == 'POST' and self.get_show_action_form():            # action操作提交的POEST请求
             func_name = request.POST.get('action')
-            func = getattr(self, func_name)
-            if func:
-                ret = func(request, *args, **kwargs)                            # 可以根据权限自定义返回值
-
-        combain_condition = {}                                                  # 组装组合搜索的条件
-        option_list = self.get_combain_search_field_list()
-        for key in request.GET.keys():
-            value_list = request.GET.getlist(key)
-            flag = False
-            for option in option_list:
-                if option.field_name == key:
-                    flag = True
-                    break
-            if flag:
-                combain_condition['%s__in' % key] = value_list
+            # 只能执行action_list中的函数，防止通过伪造的action执行config对象的其他方法
+            action_dict = {func.__name__: func for func in self.get_action_list()}
+            if func_name in action_dict:
+                if self.is_async_action(action_dict[func_name]):
+                    job = jobs.submit_job(self, request, func_name)
+                else:
+                    instrumentation.set_view_name(func_name)
+                    func = getattr(self, func_name)
+                    ret = func(request, *args, **kwargs)                        # 可以根据权限自定义返回值
 
-        objects = self.model_class.objects.filter(self.create_search_condition()).filter(**combain_condition)
-        show_obj = ShowView(self, objects)
+        objects = self.get_queryset()
+        show_obj = ShowView(self, objects, self.get_combain_condition())
+        show_obj.job = job
         return render(request, 'curd/show.html', {"show_obj": show_obj})
 
+    per_page_count = 2              # 列表页面每页显示的记录数
+    init_page_count = 3             # 列表页面显示的页码个数
+    keyset_pagination = False       # 是否使用基于游标(keyset)的分页，适用于记录非常多的表
+    keyset_ordering = None          # keyset分页使用的排序字段，必须有索引且值唯一，默认为主键，降序时为"-id"
+
+    def get_keyset_ordering(self):
+        """ 获取keyset分页使用的排序字段，可以在派生类中覆盖
+        Return:
+            排序字段的字符串形式，比如"id"或者"-id"
+        """
+
+        ordering = self.keyset_ordering or self.model_class._meta.pk.name
+        field_name = ordering.lstrip('-')
+        if field_name == 'pk':
+            ordering = ordering.replace('pk', self.model_class._meta.pk.name)
+        return ordering
+
+    count_strategy = counting.EXACT     # 列表页面统计记录总数的方式: "exact"/"cached"/"estimated"
+    count_cache_timeout = 60            # "cached"方式下统计结果的缓存时间，单位为秒
+    count_estimate_threshold = 10000    # "estimated"方式下估算值小于该值时仍然精确统计
+
+    pagination_keys = ('page', '_after', '_before', '_job')     # 分页等使用的查询参数，不属于过滤条件
+
+    def get_filter_signature(self, queryset):
+        """ 根据QuerySet编译之后的SQL和参数生成签名，用于拼接统计结果缓存的key。搜索框、组合搜索以及
+            get_search_list()、get_queryset()中根据用户权限产生的条件都包含在SQL中，
+            过滤条件不同的用户不会读到彼此的统计结果；分页参数不会出现在QuerySet中
+        Args:
+            queryset: 要统计的QuerySet对象
+        Return:
+            签名字符串
+        """
+
+        try:
+            sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:          # 比如pk__in=[]，不会执行查询
+            sql, params = '', ()
+        return md5(repr((sql, params)).encode('utf-8')).hexdigest()
+
+    def get_list_count(self, queryset):
+        """ 根据count_strategy统计列表页面的记录总数，可以在派生类中覆盖
+        Args:
+            queryset: 列表页面的QuerySet对象
+        Return:
+            二元元组: (记录总数, 是否为估算值)
+        """
+
+        if self.count_strategy == counting.ESTIMATED and not counting.is_filtered(queryset):
+            estimate = counting.estimated_count(self.model_class, queryset.db)
+            if estimate is not None and estimate >= self.count_estimate_threshold:
+                return estimate, True
+
+        if self.count_strategy in (counting.CACHED, counting.ESTIMATED):
+            # key中包含依赖的模型类的版本号，新增、删除记录之后不需要等待缓存过期
+            cache_key = 'curd:count:%s_%s:%s:%s' % (self.get_app_model() + (
+                self.get_filter_signature(queryset), caching.get_versions(self.get_list_cache_models())
+            ))
+            return counting.cached_count(queryset, cache_key, self.count_cache_timeout), False
+
+        return counting.exact_count(queryset), False
+
     model_form_class = None
 
     def get_model_form_class(self):
         """ 获取modelform表单，如果在派生的CURDConfig中创建了ModelForm派
-            生类，就使用该类，否则使用默认的ViewModelForm
+            生类，就使用该类，否则使用默认的ViewModelForm。
+            关联模型类注册了的外键、多对多字段使用自动补全控件，见get_autocomplete_fields。
+            生成的表单类会被缓存，ModelForm的元类只需要解析一次模型类的字段
 
         Return:
             ModelForm类的派生类
         """
 
+        autocomplete_fields = self.get_autocomplete_fields()
+        key = (
+            'model_form_class',
+            self.model_form_class,
+            None if autocomplete_fields is None else tuple(autocomplete_fields)
+        )
+        form_class = self._cache.get(key)
+        if form_class is None:
+            form_class = self._cache[key] = self.build_model_form_class(autocomplete_fields)
+        return form_class
+
+    def build_model_form_class(self, autocomplete_fields=None):
+        """ 生成get_model_form_class()返回的表单类，每个config对象只会调用一次
+        Args:
+            autocomplete_fields: 使用自动补全控件的字段，None表示所有关联模型类注册了的字段
+        Return:
+            ModelForm类的派生类
+        """
+
         if self.model_form_class:
-            return self.model_form_class
+            form_class = self.model_form_class
         else:
             meta_class = type(
                 'Meta',
@@ -279,12 +620,77 @@ class CURDConfig:
                  "fields": "__all__"}
             )
 
-            ViewModelForm = type(
+            form_class = type(
                 'ViewModelForm',
                 (ModelForm, ),
                 {"Meta": meta_class}
             )
-            return ViewModelForm
+
+        url_map = {}
+        for name, field in form_class.base_fields.items():
+            if not isinstance(field, ModelChoiceField):
+                continue
+            if autocomplete_fields is not None and name not in autocomplete_fields:
+                continue
+            related_config_obj = self.site._registry.get(field.queryset.model)
+            if isinstance(related_config_obj, LazyConfig) and related_config_obj.config_obj is None:
+                # 自动补全的路由与配置类无关，不需要为了生成url导入关联模型类的配置类
+                related_config_obj = related_config_obj.default_config
+            if related_config_obj is not None:
+                url_map[name] = related_config_obj.get_autocomplete_url()
+        return autocomplete_form_class(form_class, url_map)
+
+    autocomplete_fields = None      # 使用自动补全控件的外键、多对多字段，None表示所有关联模型类注册了的字段，[]表示都不使用
+    autocomplete_page_size = 20     # 自动补全接口每页返回的记录数
+
+    def get_autocomplete_fields(self):
+        """ 获取表单中使用自动补全控件的字段，自动补全控件只渲染已经选中的选项，
+            可以在派生类中覆盖
+        Return:
+            字段名组成的列表，None表示所有关联模型类注册了的外键、多对多字段
+        """
+
+        return self.autocomplete_fields
+
+    def get_autocomplete_url(self):
+        """ 获取自动补全接口的url
+        Return:
+            字符串形式的路径
+        """
+
+        alias = 'curd:%s_%s_autocomplete' % self.get_app_model()
+        return self.reverse_url(alias)
+
+    def autocomplete_view(self, request):
+        """ 自动补全接口，其他模型类的表单中指向当前模型类的外键、多对多字段使用。
+            使用搜索后端根据查询参数"term"搜索search_list中的字段，查询参数"page"为页码，
+            每页多查询一条记录用来判断是否还有下一页，不需要统计记录总数。
+            与列表页面的搜索框一样，get_show_search_form()为False时不允许搜索，提交"term"时返回空的结果
+        Args:
+            request: 当前请求对象
+        Return:
+            JsonResponse对象: {"results": [{"id": 主键, "text": 显示的文本}, ...], "more": 是否还有下一页}
+        """
+
+        term = request.GET.get('term', '').strip()
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        if term and not self.get_show_search_form():       # 防止没有搜索权限的用户通过自动补全接口搜索
+            return JsonResponse({"results": [], "more": False})
+
+        queryset = self.model_class.objects.order_by(self.get_keyset_ordering())
+        search_list = self.get_search_list()
+        if term and search_list:
+            queryset = queryset.filter(self.get_search_backend().get_condition(term, search_list)).distinct()
+        size = self.autocomplete_page_size
+        object_list = list(queryset[(page - 1) * size:page * size + 1])
+        return JsonResponse({
+            "results": [{"id": obj.pk, "text": str(obj)} for obj in object_list[:size]],
+            "more": len(object_list) > size,
+        })
 
     show_search_form = False
 
@@ -310,8 +716,23 @@ class CURDConfig:
             result.extend(self.search_list)
         return result
 
+    search_backend = None       # 搜索后端类，默认为search.LikeSearchBackend，可以使用search.FullTextSearchBackend
+
+    def get_search_backend(self):
+        """ 获取搜索后端对象，索引的字段来源于类中声明的search_list，所有请求共享同一个对象
+        Return:
+            搜索后端对象
+        """
+
+        backend = self._cache.get('search_backend')
+        if backend is None:
+            backend_class = self.search_backend or search.LikeSearchBackend
+            backend = backend_class(self.model_class, self.search_list)
+            self._cache['search_backend'] = backend
+        return backend
+
     def create_search_condition(self):
-        """ 根据列表页面搜索框中提交的value创建查询条件
+        """ 根据列表页面搜索框中提交的value创建查询条件，具体的查询方式由搜索后端决定
         Return:
             返回一个包含了查询条件的Q对象
         """
@@ -319,12 +740,9 @@ class CURDConfig:
         from django.db.models import Q
 
         query_str = self.request.GET.get('query')
-        query_condition = Q()
-        query_condition.connector = 'OR'
         if query_str and self.get_show_search_form():       # self.get_show_search_form()判断是为了防止没有所有权限的用户通过url搜索
-            for field in self.get_search_list():
-                query_condition.children.append((field, query_str), )
-        return query_condition
+            return self.get_search_backend().get_condition(query_str, self.get_search_list())
+        return Q()
 
     combain_search_field_list = []
 
@@ -338,6 +756,175 @@ class CURDConfig:
             result.extend(self.combain_search_field_list)
         return result
 
+    def get_combain_condition(self, exclude_field=None):
+        """ 根据请求中的查询参数组装组合搜索的条件
+        Args:
+            exclude_field: 不包含该字段的条件，用于统计该字段每个选项对应的记录数
+        Return:
+            存放了组合搜索条件的字典，比如{"authors__in": ['1', '2']}
+        """
+
+        combain_condition = {}
+        option_list = self.get_combain_search_field_list()
+        for key in self.request.GET.keys():
+            if key == exclude_field:
+                continue
+            value_list = self.request.GET.getlist(key)
+            flag = False
+            for option in option_list:
+                if option.field_name == key:
+                    flag = True
+                    break
+            if flag:
+                combain_condition['%s__in' % key] = value_list
+        return combain_condition
+
+    def get_queryset(self, exclude_field=None):
+        """ 获取列表页面要显示的记录，包含了搜索框和组合搜索的过滤条件
+        Args:
+            exclude_field: 不使用该字段的组合搜索条件
+        Return:
+            过滤后的QuerySet对象
+        """
+
+        combain_condition = self.get_combain_condition(exclude_field)
+        return self.model_class.objects.filter(self.create_search_condition()).filter(**combain_condition)
+
+    plan_list_queryset = True       # 是否根据list_display自动规划关联查询
+
+    def get_list_queryset_plan(self, list_display, combain_condition=None):
+        """ 获取列表页面的查询规划对象，可以在派生类中覆盖该方法以调整规划结果
+        Args:
+            list_display: 列表页面表格要显示的字段与功能函数
+            combain_condition: 当前生效的组合搜索条件
+        Return:
+            QueryPlanner对象，如果plan_list_queryset为False则返回None
+        """
+
+        if not self.plan_list_queryset:
+            return None
+        return QueryPlanner(
+            model_class=self.model_class,
+            list_display=list_display,
+            combain_search_field_list=self.get_combain_search_field_list(),
+            combain_condition=combain_condition
+        )
+
+    list_cache_timeout = 0          # 列表页面表格和页码HTML的缓存时间，单位为秒，为0时不缓存
+
+    def get_list_cache_models(self):
+        """ 获取列表页面缓存依赖的模型类: 当前模型类、list_display(包括功能函数的depends_on)
+            以及组合搜索中用到的关联模型类，这些模型类的数据发生变化时缓存失效
+        Return:
+            模型类组成的列表
+        """
+
+        models = self._cache.get('list_cache_models')
+        if models is None:
+            plan = QueryPlanner(self.model_class, self.list_display, self.combain_search_field_list)
+            model_set = {self.model_class} | plan.related_models
+            for option in self.combain_search_field_list:
+                field = self.model_class._meta.get_field(option.field_name)
+                if field.is_relation:
+                    model_set.add(field.related_model)
+            models = sorted(model_set, key=lambda model: model._meta.label_lower)
+            for model in models:
+                caching.watch_model(model)
+            self._cache['list_cache_models'] = models
+        return models
+
+    def get_list_cache_key(self, list_display):
+        """ 生成列表页面缓存的key，包含了请求路径、排序后的查询参数(包括页码)、list_display
+            以及依赖的模型类的数据版本号
+        Args:
+            list_display: get_list_display()的返回值，不同权限的用户看到的列可能不同
+        Return:
+            缓存的key，没有开启缓存时返回None
+        """
+
+        if not self.list_cache_timeout:
+            return None
+        signature = (
+            self.request.path_info,
+            sorted((key, sorted(value_list)) for key, value_list in self.request.GET.lists()),
+            [field if isinstance(field, str) else field.__qualname__ for field in list_display],
+        )
+        return 'curd:list:%s_%s:%s:%s' % (self.get_app_model() + (
+            md5(repr(signature).encode('utf-8')).hexdigest(), caching.get_versions(self.get_list_cache_models())
+        ))
+
+    conditional_get = False         # 是否支持列表页面和编辑页面的条件请求(ETag/Last-Modified)
+    last_modified_field = None      # 记录最后修改时间的字段，比如"updated_at"，用于生成Last-Modified
+
+    def make_etag(self, models, *extra):
+        """ 根据请求路径、查询参数、当前用户、CSRF token以及依赖的模型类的数据版本号生成ETag，
+            版本号从缓存中读取，不需要查询数据库
+        Args:
+            models: 页面依赖的模型类
+            extra: 其他会影响页面内容的数据
+        Return:
+            ETag字符串
+        """
+
+        user = getattr(self.request, 'user', None)
+        signature = (
+            self.request.path_info,
+            sorted((key, sorted(value_list)) for key, value_list in self.request.GET.lists()),
+            getattr(user, 'pk', None),
+            self.request.META.get('CSRF_COOKIE'),        # 页面表单中包含CSRF token
+            extra,
+            [caching.get_model_version(model) for model in models],
+        )
+        return md5(repr(signature).encode('utf-8')).hexdigest()
+
+    def get_list_etag(self, request, *args, **kwargs):
+        """ 列表页面的ETag，列表页面会显示django.contrib.messages中等待显示的消息，
+            消息同样会改变ETag，否则浏览器会使用缓存的页面，等待显示的消息被隐藏
+        """
+
+        list_display = self.get_list_display()
+        return self.make_etag(
+            self.get_list_cache_models(),
+            [field if isinstance(field, str) else field.__qualname__ for field in list_display],
+            [(message.level, str(message)) for message in messages.get_messages(request)]
+        )
+
+    def get_list_last_modified(self, request, *args, **kwargs):
+        """ 列表页面的Last-Modified，为当前搜索条件下记录的最后修改时间，没有配置last_modified_field时为None。
+            删除记录不会改变该值，由ETag保证删除之后页面会刷新
+        """
+
+        if not self.last_modified_field:
+            return None
+        return self.get_queryset().aggregate(last_modified=Max(self.last_modified_field))['last_modified']
+
+    def get_change_cache_models(self):
+        """ 获取编辑页面依赖的模型类: 当前模型类以及表单中外键、多对多字段关联的模型类 """
+
+        models = self._cache.get('change_cache_models')
+        if models is None:
+            model_set = {self.model_class}
+            for field in self.model_class._meta.get_fields():
+                if field.is_relation and field.concrete and field.related_model:
+                    model_set.add(field.related_model)
+            models = sorted(model_set, key=lambda model: model._meta.label_lower)
+            for model in models:
+                caching.watch_model(model)
+            self._cache['change_cache_models'] = models
+        return models
+
+    def get_change_etag(self, request, nid):
+        """ 编辑页面的ETag """
+
+        return self.make_etag(self.get_change_cache_models())
+
+    def get_change_last_modified(self, request, nid):
+        """ 编辑页面的Last-Modified，为该记录的最后修改时间 """
+
+        if not self.last_modified_field:
+            return None
+        return self.model_class.objects.filter(pk=nid).values_list(self.last_modified_field, flat=True).first()
+
     show_action_form = False
 
     def get_show_action_form(self):
@@ -361,6 +948,353 @@ class CURDConfig:
             result.extend(self.action_list)
         return result
 
+    bulk_batch_size = 1000          # 内置批量操作每一批处理的记录数，每一批在一个事务中执行
+    bulk_update_fields = []         # 允许通过内置的bulk_update批量修改的字段
+
+    def get_bulk_update_fields(self):
+        """ 获取允许批量修改的字段，可以在派生类中根据用户权限覆盖
+
+        """
+
+        result = []
+        if self.bulk_update_fields:
+            result.extend(self.bulk_update_fields)
+        return result
+
+    def get_action_queryset(self, request):
+        """ 获取批量操作要处理的记录。勾选了"选择全部匹配记录"时为当前搜索条件下的所有记录，
+            否则为勾选的记录
+        Args:
+            request: 当前请求对象
+        Return:
+            QuerySet对象
+        """
+
+        if request.POST.get('_select_across') == '1':
+            return self.get_queryset()
+        try:
+            return self.model_class.objects.filter(pk__in=request.POST.getlist('id'))
+        except (ValueError, ValidationError):          # 伪造的id
+            return self.model_class.objects.none()
+
+    def bulk_delete(self, request, *args, **kwargs):
+        """ 内置的批量删除action，分批删除记录，不会把所有记录一次性加载到内存中，
+            可以直接放到action_list中使用: action_list = [CURDConfig.bulk_delete]
+        Args:
+            request: 当前请求对象
+        Return:
+            删除的记录数
+        """
+
+        queryset = self.get_action_queryset(request)
+        if self.job is not None:
+            self.update_job_progress(total=queryset.count())
+        count = bulk.bulk_delete(queryset, batch_size=self.bulk_batch_size, progress=self.update_job_progress)
+        messages.add_message(request, messages.SUCCESS, '成功删除%s条记录' % count, fail_silently=True)
+        return count
+
+    bulk_delete.func_description = '批量删除'
+
+    def bulk_update(self, request, *args, **kwargs):
+        """ 内置的批量修改action，将记录的某个字段修改为同一个值，字段必须在bulk_update_fields中
+        Args:
+            request: 当前请求对象，POST中"_update_field"为字段名，"_update_value"为修改后的值
+        Return:
+            修改的记录数
+        """
+
+        field_name = request.POST.get('_update_field')
+        if field_name not in self.get_bulk_update_fields():
+            messages.add_message(request, messages.ERROR, '不允许批量修改该字段', fail_silently=True)
+            return 0
+
+        field = self.model_class._meta.get_field(field_name)
+        raw_value = request.POST.get('_update_value', '')
+        try:
+            value = None if raw_value == '' and field.null else field.clean(raw_value, None)
+        except ValidationError as e:
+            messages.add_message(request, messages.ERROR, '%s: %s' % (field.verbose_name, ','.join(e.messages)), fail_silently=True)
+            return 0
+
+        queryset = self.get_action_queryset(request)
+        if self.job is not None:
+            self.update_job_progress(total=queryset.count())
+        count = bulk.bulk_update(
+            queryset, field_name, value,
+            batch_size=self.bulk_batch_size,
+            progress=self.update_job_progress
+        )
+        messages.add_message(request, messages.SUCCESS, '成功修改%s条记录' % count, fail_silently=True)
+        return count
+
+    bulk_update.func_description = '批量修改'
+
+    show_export_btn = False         # 是否显示导出按钮权限接口
+
+    def get_show_export_btn(self):
+        """ 获取用户导出记录功能对应的权限。show_export_btn默认为False，
+            可以在派生类中根据用户权限修改
+        Return:
+            用户有导出权限对应的布尔值
+        """
+
+        return self.show_export_btn
+
+    export_display = []             # 要导出的字段与功能函数，为空时根据list_display生成
+    export_chunk_size = 2000        # 导出时每一批从数据库中读取的记录数
+    async_export = False            # 是否在后台任务中导出，导出完成后在列表页面下载文件
+
+    def get_export_display(self):
+        """ 获取要导出的列。没有配置export_display时，导出list_display中的字段，
+            以及设置了`exportable = True`属性的功能函数(删除、编辑等链接不会被导出)
+        Return:
+            字段名与功能函数组成的列表
+        """
+
+        if self.export_display:
+            return list(self.export_display)
+        return [
+            field for field in self.list_display
+            if isinstance(field, str) or getattr(field, 'exportable', False)
+        ]
+
+    def export_view(self, request):
+        """ 导出列表页面搜索、组合搜索过滤之后的所有记录，支持csv、jsonl、xlsx三种格式，
+            通过查询参数"_format"指定，默认为csv。三种格式都以流的形式返回，内存占用与记录数无关，
+            xlsx需要全部写入临时文件之后才能开始返回，记录很多时应该设置async_export在后台导出
+        Args:
+            request: 当前请求对象
+        Return:
+            包含导出文件的响应对象
+        """
+
+        if not self.get_show_export_btn():          # 防止没有权限的用户通过url导出
+            return redirect(self.get_show_url())
+
+        export_format = request.GET.get('_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponse('不支持的导出格式: %s' % export_format, status=400)
+        if export_format == 'xlsx' and openpyxl is None:
+            return HttpResponse('导出xlsx格式需要安装openpyxl', status=400)
+
+        if self.async_export:
+            job = jobs.submit_job(self, request, jobs.EXPORT_ACTION)
+            return redirect('%s?_job=%s' % (self.get_show_url(), job.pk))
+        return self.get_exporter().response(export_format, filename=self.model_class._meta.model_name)
+
+    def get_exporter(self):
+        """ 根据当前请求中的搜索条件创建Exporter对象 """
+
+        return Exporter(
+            config_obj=self,
+            queryset=self.get_queryset(),
+            export_display=self.get_export_display(),
+            chunk_size=self.export_chunk_size,
+            combain_condition=self.get_combain_condition()
+        )
+
+    def export_to_file(self, request):
+        """ 后台导出任务执行的函数，将记录导出到CURD_EXPORT_ROOT目录下的文件中
+        Args:
+            request: 根据任务参数重新构造的请求对象
+        Return:
+            生成的文件名
+        """
+
+        export_format = request.GET.get('_format', 'csv')
+        exporter = self.get_exporter()
+        if self.job is not None:
+            self.update_job_progress(total=exporter.queryset.count())
+        filename = '%s_%s.%s' % (self.model_class._meta.model_name, self.job.pk if self.job else 0, export_format)
+        exporter.write(jobs.get_export_path(filename), export_format, progress=self.update_job_progress)
+        return filename
+
+    show_import_btn = False         # 是否显示导入按钮
+    import_chunk_size = 1000        # 导入时每一批校验和写入的行数
+    import_lookup_fields = {}       # 导入时通过显示值查找关联记录的字段，比如{"publish": "publish_name"}
+
+    def get_show_import_btn(self):
+        """ 获取用户导入记录的权限，默认为False，可以在派生类中根据用户权限修改
+        Return:
+            用户有导入权限对应的布尔值
+        """
+
+        return self.show_import_btn
+
+    def get_import_lookup_fields(self):
+        """ 获取导入时通过显示值查找关联记录的外键、多对多字段，没有配置的字段需要提供主键
+        Return:
+            {表单字段名: 关联模型类中用于查找的字段名}
+        """
+
+        return dict(self.import_lookup_fields)
+
+    def get_import_url(self):
+        """ 获取导入记录对应的url
+        Return:
+            字符串形式的路径
+        """
+
+        alias = 'curd:%s_%s_import' % self.get_app_model()
+        return self.reverse_url(alias)
+
+    def get_importer(self, dry_run=False):
+        """ 创建Importer对象
+        Args:
+            dry_run: 为True时只校验，不写入数据库
+        """
+
+        return Importer(self, chunk_size=self.import_chunk_size, batch_size=self.bulk_batch_size, dry_run=dry_run)
+
+    def import_view(self, request):
+        """ 上传CSV/JSONL文件导入记录。上传的文件分块保存到CURD_EXPORT_ROOT目录之后创建一个后台导入任务，
+            重定向到列表页面显示任务进度，任务完成后可以下载错误报告
+        Args:
+            request: 当前请求对象
+        Return:
+            重定向到列表页面
+        """
+
+        if not self.get_show_import_btn() or request.method != 'POST':        # 防止没有权限的用户通过url导入
+            return redirect(self.get_show_url())
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, '请选择要导入的文件')
+            return redirect(self.get_show_url())
+        import_format = request.POST.get('_format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            messages.error(request, '不支持的导入格式: %s' % import_format)
+            return redirect(self.get_show_url())
+
+        filename = '%s_%s_import_%s.%s' % (self.get_app_model() + (uuid4().hex, import_format))
+        with open(jobs.get_export_path(filename), 'wb') as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+        job = jobs.submit_job(self, request, jobs.IMPORT_ACTION, extra_post={"_file": filename, "_format": import_format})
+        return redirect('%s?_job=%s' % (self.get_show_url(), job.pk))
+
+    def import_from_file(self, request):
+        """ 后台导入任务执行的函数，导入完成后删除上传的文件，有校验失败的行时生成错误报告
+        Args:
+            request: 根据任务参数重新构造的请求对象
+        Return:
+            导入结果的描述
+        """
+
+        file_path = jobs.get_export_path(request.POST.get('_file', ''))
+        importer = self.get_importer(dry_run=bool(request.POST.get('dry_run')))
+        report_path = jobs.get_export_path(jobs.get_import_report_name(self.job)) if self.job else os.devnull
+        try:
+            with open(file_path, encoding='utf-8-sig', newline='') as text_file, \
+                    open(report_path, 'w', encoding='utf-8-sig', newline='') as report_file:    # BOM，保证Excel打开中文不乱码
+                result = importer.run(
+                    text_file,
+                    request.POST.get('_format', 'csv'),
+                    report_file=report_file,
+                    progress=self.update_job_progress
+                )
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        if not result.failed and report_path != os.devnull:
+            os.remove(report_path)
+        return str(result)
+
+    job = None          # 在后台任务中执行时为当前的Job对象
+
+    def is_async_action(self, func):
+        """ 判断action是否需要在后台任务中执行，使用jobs.async_action()标记的action返回True，
+            可以在派生类中覆盖，比如根据选择的记录数决定
+        Args:
+            func: action_list中的函数
+        Return:
+            布尔值
+        """
+
+        return getattr(func, 'is_async', False)
+
+    def update_job_progress(self, processed=None, total=None):
+        """ 记录后台任务的进度，不在后台任务中执行时什么也不做，自定义的action可以直接调用
+        Args:
+            processed: 已处理的记录数
+            total: 要处理的记录总数
+        """
+
+        if self.job is not None:
+            self.job.update_progress(processed=processed, total=total)
+
+    def get_job(self, nid):
+        """ 获取属于当前模型类的后台任务，只能查看当前用户自己提交的任务，未登录用户提交的任务通过session判断
+        Args:
+            nid: 任务的id
+        Return:
+            Job对象，不存在时返回None
+        """
+
+        if not nid or not str(nid).isdigit():
+            return None
+        app_label, model_name = self.get_app_model()
+        job = jobs.Job.objects.filter(pk=nid, app_label=app_label, model_name=model_name).first()
+        if job is None or not jobs.is_submitted_by(self.request, job):
+            return None
+        return job
+
+    def job_view(self, request, nid):
+        """ 返回后台任务的状态和进度，列表页面定时请求该url
+        Args:
+            request: 当前请求对象
+            nid: 任务的id
+        Return:
+            JsonResponse对象
+        """
+
+        job = self.get_job(nid)
+        if job is None:
+            raise Http404
+        data = {
+            "id": job.pk,
+            "status": job.status,
+            "status_display": job.get_status_display(),
+            "total": job.total,
+            "processed": job.processed,
+            "result": job.result,
+            "error": job.error,
+            "message": None,                # 页面中显示的任务结果
+            "download_url": None,
+            "download_text": None,
+        }
+        if job.action == jobs.EXPORT_ACTION and job.status == job.DONE:
+            data["download_url"] = self.get_job_download_url(job.pk)
+            data["download_text"] = '下载文件'
+        elif job.status == job.DONE:
+            data["message"] = job.result
+            if job.action == jobs.IMPORT_ACTION and os.path.exists(jobs.get_export_path(jobs.get_import_report_name(job))):
+                data["download_url"] = self.get_job_download_url(job.pk)
+                data["download_text"] = '下载错误报告'
+        return JsonResponse(data)
+
+    def job_download_view(self, request, nid):
+        """ 下载后台导出任务生成的文件或者导入任务生成的错误报告
+        Args:
+            request: 当前请求对象
+            nid: 任务的id
+        Return:
+            FileResponse对象
+        """
+
+        job = self.get_job(nid)
+        if job is None or job.action not in (jobs.EXPORT_ACTION, jobs.IMPORT_ACTION) or job.status != job.DONE:
+            raise Http404
+        filename = job.result if job.action == jobs.EXPORT_ACTION else jobs.get_import_report_name(job)
+        file_path = jobs.get_export_path(filename)
+        try:
+            response = FileResponse(open(file_path, 'rb'), content_type='application/octet-stream')
+        except FileNotFoundError:
+            raise Http404
+        response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+        return response
+
     def add_view(self, request):
         """ 添加记录路径对应的视图函数
         Args:
@@ -438,6 +1372,445 @@ class CURDConfig:
             else:
                 return render(request, 'curd/change.html', {"form": form})
 
+    show_bulk_edit_btn = False      # 是否显示批量编辑按钮
+    bulk_edit_extra = 5             # 批量编辑页面中新增记录的空行数
+    bulk_edit_max_rows = 10000      # 批量编辑页面一次最多提交的记录数，包括CSV导入
+
+    def get_show_bulk_edit_btn(self):
+        """ 获取用户批量编辑记录的权限，默认为False，可以在派生类中根据用户权限修改
+        Return:
+            用户有批量编辑权限对应的布尔值
+        """
+
+        return self.show_bulk_edit_btn
+
+    def get_bulk_edit_url(self):
+        """ 获取批量编辑页面的url
+        Return:
+            字符串形式的路径
+        """
+
+        alias = 'curd:%s_%s_bulk_edit' % self.get_app_model()
+        return self.reverse_url(alias)
+
+    def get_bulk_edit_formset_class(self):
+        """ 根据get_model_form_class()返回的ModelForm生成批量编辑使用的formset类
+        Return:
+            ModelFormSet类
+        """
+
+        return modelformset_factory(
+            self.model_class,
+            form=self.get_model_form_class(),
+            extra=self.bulk_edit_extra,
+            max_num=self.bulk_edit_max_rows,
+            validate_max=True,
+        )
+
+    def get_bulk_edit_queryset(self, request):
+        """ 批量编辑页面中要修改的记录，由查询参数"id"指定，比如"?id=1&id=2"，没有指定时只显示新增记录的空行 """
+
+        pk_list = request.GET.getlist('id')[:self.bulk_edit_max_rows]
+        m2m_names = [field.name for field in self.model_class._meta.many_to_many]
+        queryset = self.model_class.objects.prefetch_related(*m2m_names).order_by('pk')
+        try:
+            return queryset.filter(pk__in=pk_list) if pk_list else queryset.none()
+        except (ValueError, ValidationError):           # 伪造的id
+            return queryset.none()
+
+    def parse_bulk_csv(self, csv_text):
+        """ 解析批量编辑页面中粘贴或者上传的CSV数据。第一行为表头，可以是字段名或者verbose_name，
+            有主键列且主键不为空的行修改该记录，否则新增记录，多对多字段的多个值使用逗号分隔，
+            import_lookup_fields中的字段可以使用显示值
+        Args:
+            csv_text: CSV格式的字符串
+        Return:
+            二元元组: ((主键, 数据字典)组成的列表, 每一行在CSV中的行号组成的列表)
+        """
+
+        importer = self.get_importer()
+        rows, line_numbers = [], []
+        for line_number, pk, data in importer.rows(StringIO(csv_text), 'csv'):
+            rows.append((pk, data))
+            line_numbers.append(line_number)
+        importer.resolve_labels(rows)
+        return rows, line_numbers
+
+    def bulk_edit_view(self, request):
+        """ 批量编辑页面，一次提交多条新增或者修改的记录:
+                1. 表格形式的formset，每一行是一个ModelForm
+                2. 粘贴或者上传CSV数据
+            所有记录校验通过之后在一个事务中使用bulk_create/bulk_update保存，
+            任何一条记录校验失败都不会保存，页面中显示每一行的错误信息
+        Args:
+            request: 当前请求对象
+        Return:
+            GET请求以及校验失败时返回批量编辑页面，保存成功后重定向到列表页面
+        """
+
+        if not self.get_show_bulk_edit_btn():           # 防止没有权限的用户通过url批量编辑
+            return redirect(self.get_show_url())
+
+        formset_class = self.get_bulk_edit_formset_class()
+        queryset = self.get_bulk_edit_queryset(request)
+        csv_errors = []
+        csv_text = ''
+        if request.method == 'POST' and request.POST.get('_mode') == 'csv':
+            formset = formset_class(queryset=queryset)
+            upload = request.FILES.get('csv_file')
+            csv_text = upload.read().decode('utf-8-sig', errors='replace') if upload else request.POST.get('csv_text', '')
+            rows, line_numbers = self.parse_bulk_csv(csv_text)
+            if len(rows) > self.bulk_edit_max_rows:
+                csv_errors.append((None, {'__all__': ['一次最多导入%s条记录' % self.bulk_edit_max_rows]}))
+            else:
+                forms, errors = self.build_bulk_forms(rows)
+                csv_errors = [(line_numbers[index], errors[index]) for index in sorted(errors)]
+                if not errors:
+                    bulk.save_forms(forms, batch_size=self.bulk_batch_size)
+                    messages.success(request, '批量保存了%s条记录' % len(forms))
+                    return redirect(self.get_show_url())
+        elif request.method == 'POST':
+            formset = formset_class(data=request.POST, queryset=queryset)
+            bulk.prefetch_choices(formset.forms)
+            if formset.is_valid():
+                forms = [form for form in formset.forms if form.has_changed()]
+                bulk.save_forms(forms, batch_size=self.bulk_batch_size)
+                messages.success(request, '批量保存了%s条记录' % len(forms))
+                return redirect(self.get_show_url())
+        else:
+            formset = formset_class(queryset=queryset)
+
+        bulk.share_choices(formset.forms)
+        return render(request, 'curd/bulk_edit.html', {
+            "formset": formset,
+            "csv_text": csv_text,
+            "csv_errors": csv_errors,
+            "show_url": self.get_show_url(),
+        })
+
+    api_actions = ('list', 'retrieve', 'create', 'update', 'bulk')     # 开放的接口
+    api_page_size = 50              # 列表接口每页的记录数，可以通过查询参数"_limit"修改
+    api_max_page_size = 500         # "_limit"的最大值
+
+    def has_api_permission(self, request):
+        """ 当前用户是否可以使用json接口，接口不校验CSRF token，默认只允许登录的staff用户使用，
+            可以在派生类中覆盖，比如改为校验token
+        Args:
+            request: 当前请求对象
+        Return:
+            True/False
+        """
+
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+    def get_api_actions(self):
+        """ 获取当前用户可以使用的接口，可以在派生类中根据用户权限覆盖
+        Return:
+            接口名称组成的列表: list/retrieve/create/update/bulk
+        """
+
+        return list(self.api_actions)
+
+    def get_api_list_fields(self):
+        """ 列表接口返回的字段，为list_display中的字段，功能函数不会被返回 """
+
+        return [field for field in self.get_list_display() if isinstance(field, str)]
+
+    def get_api_detail_fields(self):
+        """ 详情、新增、修改接口返回的字段，为ModelForm中的字段 """
+
+        return list(self.get_model_form_class().base_fields)
+
+    def api_list_view(self, request):
+        """ 列表接口
+            GET: 返回记录列表，支持搜索框("query")和组合搜索的查询参数，使用游标分页("_after"/"_before")
+            POST: 新增一条记录
+        Args:
+            request: 当前请求对象
+        Return:
+            JsonResponse对象
+        """
+
+        if not self.has_api_permission(request):
+            return api.error_response('没有权限', status=403)
+        if request.method == 'POST':
+            return self._api_save(request, instance=None)
+        if request.method != 'GET':
+            return api.error_response('不支持的请求方法', status=405)
+        if 'list' not in self.get_api_actions():
+            return api.error_response('没有权限', status=403)
+
+        try:
+            limit = min(int(request.GET.get('_limit', self.api_page_size)), self.api_max_page_size)
+        except ValueError:
+            limit = self.api_page_size
+        ordering = self.get_keyset_ordering()
+        page_obj = KeysetPaingator(
+            request=request,
+            base_url=request.path_info,
+            ordering=ordering,
+            params=request.GET,
+            per_page_count=max(limit, 1)
+        )
+
+        value_fields, m2m_fields = api.split_fields(self.model_class, self.get_api_list_fields())
+        if page_obj.field_name not in value_fields:
+            value_fields.append(page_obj.field_name)
+        queryset = self.get_queryset()
+        plan = self.get_list_queryset_plan(self.get_list_display(), self.get_combain_condition())
+        if plan and plan.distinct:
+            queryset = queryset.distinct()
+        rows = page_obj.page_queryset(queryset.values(*value_fields))
+        api.attach_m2m(rows, self.model_class, m2m_fields)
+
+        data = {"results": rows, "next": page_obj.next_link(), "previous": page_obj.previous_link()}
+        return api.json_response(data)
+
+    def api_detail_view(self, request, nid):
+        """ 详情接口
+            GET: 返回一条记录
+            PUT: 修改一条记录，需要提供所有字段
+            PATCH: 修改一条记录的部分字段
+        Args:
+            request: 当前请求对象
+            nid: 记录的id
+        Return:
+            JsonResponse对象
+        """
+
+        if not self.has_api_permission(request):
+            return api.error_response('没有权限', status=403)
+        if request.method in ('PUT', 'PATCH'):
+            instance = self.model_class.objects.filter(pk=nid).first()
+            if instance is None:
+                return api.error_response('记录不存在', status=404)
+            return self._api_save(request, instance=instance)
+        if request.method != 'GET':
+            return api.error_response('不支持的请求方法', status=405)
+        if 'retrieve' not in self.get_api_actions():
+            return api.error_response('没有权限', status=403)
+
+        rows = api.serialize(self.model_class.objects.filter(pk=nid), self.get_api_detail_fields())
+        if not rows:
+            return api.error_response('记录不存在', status=404)
+        return api.json_response(rows[0])
+
+    def _make_form(self, data, instance=None, partial=False):
+        """ 根据字典形式的数据创建ModelForm，用于接口和批量编辑，部分修改时未提交的字段使用记录原来的值 """
+
+        model_form_class = self.get_model_form_class()
+        if partial and instance is not None:
+            data = dict(model_to_dict(instance, fields=list(model_form_class.base_fields)), **data)
+        return model_form_class(data=data, instance=instance)
+
+    def build_bulk_forms(self, rows):
+        """ 为多条记录创建表单并校验，用于批量编辑页面的CSV导入和批量接口。
+            外键、多对多字段的关联记录以及要修改的记录都只查询一次，查询次数与记录数无关
+        Args:
+            rows: (主键, 数据字典)组成的列表，主键为None时新增记录，否则修改该记录，只需要提供要修改的字段
+        Return:
+            二元元组: (表单对象列表, {行的索引: {字段名: [错误信息]}})，所有记录都校验通过时第二个元素为空字典
+        """
+
+        pk_field = self.model_class._meta.pk
+        errors = {}
+        pk_list = []
+        for index, (pk, data) in enumerate(rows):
+            try:
+                pk_list.append(None if pk is None else pk_field.to_python(pk))
+            except ValidationError:
+                pk_list.append(None)
+                errors[index] = {pk_field.name: ['主键不合法']}
+
+        m2m_names = [field.name for field in self.model_class._meta.many_to_many]
+        instances = self.model_class.objects.prefetch_related(*m2m_names).in_bulk(
+            [pk for pk in pk_list if pk is not None]
+        )
+        indexed_forms = []
+        for index, ((pk, data), obj_pk) in enumerate(zip(rows, pk_list)):
+            if index in errors:
+                continue
+            if not isinstance(data, dict):
+                errors[index] = {'__all__': ['数据格式不正确']}
+                continue
+            if pk is None:
+                form = self._make_form(data)
+            else:
+                instance = instances.get(obj_pk)
+                if instance is None:
+                    errors[index] = {pk_field.name: ['记录不存在']}
+                    continue
+                form = self._make_form(data, instance=instance, partial=True)
+            indexed_forms.append((index, form))
+
+        forms = [form for index, form in indexed_forms]
+        bulk.prefetch_choices(forms)
+        for index, form in indexed_forms:
+            if not form.is_valid():
+                errors[index] = api.form_errors(form)
+        return forms, errors
+
+    def _api_save(self, request, instance=None):
+        """ 新增或者修改一条记录 """
+
+        action = 'create' if instance is None else 'update'
+        if action not in self.get_api_actions():
+            return api.error_response('没有权限', status=403)
+        try:
+            data = api.parse_body(request)
+        except ValueError as e:
+            return api.error_response(str(e), status=415 if request.content_type != 'application/json' else 400)
+        if not isinstance(data, dict):
+            return api.error_response('请求体必须是json对象')
+
+        form = self._make_form(data, instance=instance, partial=request.method == 'PATCH')
+        if not form.is_valid():
+            return api.error_response('数据校验失败', errors=api.form_errors(form))
+        obj = form.save()
+        rows = api.serialize(self.model_class.objects.filter(pk=obj.pk), self.get_api_detail_fields())
+        return api.json_response(rows[0], status=201 if action == 'create' else 200)
+
+    def api_bulk_view(self, request):
+        """ 批量新增、修改接口，请求体格式为{"create": [{...}, ...], "update": [{"id": 1, ...}, ...]}，
+            修改时只需要提供要修改的字段。所有记录校验通过之后在一个事务中保存，任何一条记录校验失败都不会保存
+        Args:
+            request: 当前请求对象
+        Return:
+            JsonResponse对象，包含新增和修改之后的记录
+        """
+
+        if not self.has_api_permission(request):
+            return api.error_response('没有权限', status=403)
+        if request.method != 'POST':
+            return api.error_response('不支持的请求方法', status=405)
+        if 'bulk' not in self.get_api_actions():
+            return api.error_response('没有权限', status=403)
+        try:
+            data = api.parse_body(request)
+        except ValueError as e:
+            return api.error_response(str(e), status=415 if request.content_type != 'application/json' else 400)
+        if not isinstance(data, dict):
+            return api.error_response('请求体必须是json对象')
+        create_list = data.get('create') or []
+        update_list = data.get('update') or []
+        if not isinstance(create_list, list) or not isinstance(update_list, list):
+            return api.error_response('create和update必须是列表')
+
+        pk_name = self.model_class._meta.pk.name
+        rows = [(None, item) for item in create_list]
+        # 没有提供主键的修改记录使用空字符串，校验时会返回错误信息
+        rows.extend((item.get(pk_name, item.get('id', '')) if isinstance(item, dict) else '', item) for item in update_list)
+        forms, row_errors = self.build_bulk_forms(rows)
+        if row_errors:
+            errors = {"create": {}, "update": {}}
+            for index, row_error in row_errors.items():
+                if index < len(create_list):
+                    errors["create"][index] = row_error
+                else:
+                    errors["update"][index - len(create_list)] = row_error
+            return api.error_response('数据校验失败', errors=errors)
+
+        obj_list = bulk.save_forms(forms, batch_size=self.bulk_batch_size)
+        pk_list = [obj.pk for obj in obj_list]
+        rows = api.serialize(self.model_class.objects.filter(pk__in=pk_list), self.get_api_detail_fields())
+        row_dict = {row[pk_name]: row for row in rows}
+        return api.json_response({"results": [row_dict.get(pk) for pk in pk_list]})
+
+
+_lazy_models = {}       # {模型类或者多对多关系表: (LazyConfig, ...)}，数据变化时需要导入的延迟注册的配置类
+
+
+def watch_lazy_config(lazy_config):
+    """ 延迟注册时不导入配置类，但是配置类需要的版本号、全文索引等信号必须从项目启动时就生效，
+        否则第一次访问之前修改的数据不会让缓存失效、不会写入索引。根据模型类(不需要配置类)监听当前模型类、
+        直接关联的模型类以及多对多关系表的数据变化，发生变化时再导入配置类，见_lazy_model_changed。
+        list_display、depends_on中跨越多个关联的模型类无法在导入配置类之前发现
+    Args:
+        lazy_config: LazyConfig对象
+    """
+
+    model_class = lazy_config.model_class
+    watch_list = [(model_class, False)]
+    for field in model_class._meta.get_fields():
+        if not field.is_relation or field.related_model is None:
+            continue
+        watch_list.append((field.related_model, False))
+        if field.many_to_many:
+            through = field.through if not field.concrete else field.remote_field.through
+            watch_list.append((through, True))
+
+    for model, is_through in watch_list:
+        _lazy_models[model] = tuple(_lazy_models.get(model, ())) + (lazy_config, )
+        label = model._meta.label_lower
+        if is_through:
+            signals.m2m_changed.connect(_lazy_model_changed, sender=model, dispatch_uid='curd_lazy_m2m_%s' % label)
+            continue
+        for name, signal in (('save', signals.post_save), ('delete', signals.post_delete),
+                             ('rows_created', rows_created), ('rows_deleted', rows_deleted),
+                             ('rows_updated', rows_updated)):
+            signal.connect(_lazy_model_changed, sender=model, dispatch_uid='curd_lazy_%s_%s' % (name, label))
+
+
+def _lazy_model_changed(sender, signal, **kwargs):
+    """ 延迟注册的配置类依赖的数据发生变化时导入配置类(连接版本号、全文索引的信号)，
+        并补上当前这一次变化: 信号发送过程中新连接的处理函数不会收到当前信号
+    """
+
+    lazy_list = [lazy_config for lazy_config in _lazy_models.get(sender, ()) if lazy_config.config_obj is None]
+    if not lazy_list:
+        return
+    for lazy_config in lazy_list:
+        try:
+            lazy_config.load()
+        except Exception:           # 配置类有错误时不影响数据的保存，访问该模型类的url时仍然会抛出异常
+            logger.exception('导入配置类%s失败', lazy_config.config_path)
+            for model, lazy_configs in list(_lazy_models.items()):
+                _lazy_models[model] = tuple(item for item in lazy_configs if item is not lazy_config)
+    caching.replay_signal(signal, sender, **kwargs)
+    search.replay_signal(signal, sender, **kwargs)
+
+
+caching.add_internal_receiver(_lazy_model_changed)
+
+
+class LazyConfig(object):
+    """ 延迟注册的config对象的占位，只保存模型类和配置类的路径。访问config对象的属性时才导入配置类、
+        生成config对象并替换CURDSite._registry中的占位，项目启动时不需要导入配置类所在的模块
+
+    """
+
+    def __init__(self, model_class, config_path, site):
+        """ 初始化LazyConfig的实例
+        Args:
+            model_class: 模型类
+            config_path: 配置类的路径，比如"trial.curd.BookConfig"
+            site: CURDSite对象
+        """
+
+        self.model_class = model_class
+        self.config_path = config_path
+        self.site = site
+        self.config_obj = None          # 加载之后的config对象
+        self._default_config = None
+
+    @property
+    def default_config(self):
+        """ 使用CURDConfig生成的config对象，配置类加载之前用来生成默认的路由，反向解析时使用 """
+
+        if self._default_config is None:
+            self._default_config = CURDConfig(self.model_class, self.site)
+        return self._default_config
+
+    def load(self):
+        """ 导入配置类并注册 """
+
+        if self.config_obj is None:
+            self.config_obj = self.site.load_config(self)
+        return self.config_obj
+
+    def __getattr__(self, item):
+        return getattr(self.load(), item)
 
 
 class CURDSite:
@@ -446,21 +1819,85 @@ class CURDSite:
 
 
     """
-    def __init__(self):
+    def __init__(self, enable_api=None, enable_metrics=None):
         self._registry = {}         # 存放model及其对应的CURBConfig()实例键值对
+        self.enable_api = enable_api        # 是否为每个模型类生成json接口，为None时使用settings.CURD_ENABLE_API
+        self.enable_metrics = enable_metrics    # 是否生成统计数据接口，为None时使用settings.CURD_INSTRUMENTATION
+        self._url_patterns = None           # get_urls()生成的路由，第一次使用时生成
+        self._url_map = None                # ({"<app>/<model>/": 路由}, 其他路由)
+        self._resolver = None
+        self._load_lock = threading.RLock()
 
     def register(self, model_class, curd_config_class=None):
         """ 注册传入的model模型类，如果没有提供配置类curd_config_class，默认使用CURDConfig类
         Args:
-            model_class: models.py中要注册的模型类
-            curd_config_class: 模型类对应的配置类
+            model_class: models.py中要注册的模型类，也可以是"app_label.ModelName"形式的字符串
+            curd_config_class: 模型类对应的配置类，为字符串形式的路径(比如"trial.curd.BookConfig")时延迟注册，
+                第一次访问该模型类的url、config对象，或者模型类的数据发生变化时才导入
         Return:
             None
         """
 
-        if not curd_config_class:
-            curd_config_class = CURDConfig
-        self._registry[model_class] = curd_config_class(model_class, self)
+        if isinstance(model_class, str):
+            model_class = apps.get_model(model_class)
+        if isinstance(curd_config_class, str):
+            self._registry[model_class] = LazyConfig(model_class, curd_config_class, self)
+            watch_lazy_config(self._registry[model_class])
+        else:
+            self._registry[model_class] = (curd_config_class or CURDConfig)(model_class, self)
+            self.setup_config(self._registry[model_class])
+
+        # 已经生成的表单类中，指向新注册的模型类的字段需要使用自动补全控件
+        for config_obj in self._registry.values():
+            if isinstance(config_obj, LazyConfig):
+                continue
+            for key in [key for key in config_obj._cache if isinstance(key, tuple) and key[0] == 'model_form_class']:
+                del config_obj._cache[key]
+        self.clear_urls()
+
+    def load_config(self, lazy_config):
+        """ 导入延迟注册的配置类，替换_registry中的占位，由LazyConfig.load()调用
+        Args:
+            lazy_config: LazyConfig对象
+        Return:
+            config对象
+        """
+
+        with self._load_lock:
+            if lazy_config.config_obj is not None:          # 其他线程已经加载
+                return lazy_config.config_obj
+            config_obj = import_string(lazy_config.config_path)(lazy_config.model_class, self)
+            if self._registry.get(lazy_config.model_class) is lazy_config:
+                self._registry[lazy_config.model_class] = config_obj
+                self.setup_config(config_obj)
+                # 配置类扩展或者修改了默认的路由时才需要重新生成反向解析的数据，所有模型类的路由都会重新处理
+                if self.get_route_names(config_obj) != self.get_route_names(lazy_config.default_config):
+                    self.clear_urls()
+            return config_obj
+
+    @staticmethod
+    def get_route_names(config_obj):
+        """ 获取config对象生成的所有路由的(正则, 别名)，用来判断路由是否与默认的路由相同 """
+
+        return [(str(pattern.pattern), pattern.name) for pattern in config_obj.urls + config_obj.api_urls]
+
+    def setup_config(self, config_obj):
+        """ 注册config对象之后连接缓存和全文索引需要的信号，延迟注册的配置类在导入之后执行
+        Args:
+            config_obj: 刚注册的config对象
+        """
+
+        model_class = config_obj.model_class
+
+        # 组合搜索的选项数据会被缓存，需要在所有进程中监听关联模型类的数据变化
+        for option in config_obj.combain_search_field_list:
+            option.watch(model_class)
+        config_obj.get_search_backend().connect()      # 全文索引需要通过信号与记录同步
+        if config_obj.list_cache_timeout or config_obj.conditional_get:
+            # 在所有进程中监听依赖的模型类的数据变化
+            config_obj.get_list_cache_models()
+            if config_obj.conditional_get:
+                config_obj.get_change_cache_models()
 
     def get_urls(self):
         """ 编辑包含已注册模型类的字典，生成路径与下一级路由分发的映射关系
@@ -472,16 +1909,116 @@ class CURDSite:
         for model_class, curd_config_obj in self._registry.items():
             app_name = model_class._meta.app_label
             model_name = model_class._meta.model_name
-            temp_path = path(
-                '{app_name}/{model_name}/'.format(app_name=app_name, model_name=model_name),
-                (curd_config_obj.urls, None, None)
-            )
+            route = '{app_name}/{model_name}/'.format(app_name=app_name, model_name=model_name)
+            if isinstance(curd_config_obj, LazyConfig):         # 匹配到该模型类的url时才导入配置类
+                urlpatterns.append(LazyConfigResolver(route, curd_config_obj))
+                continue
+            temp_path = path(route, (curd_config_obj.urls, None, None))
             urlpatterns.append(temp_path)
+
+        enable_api = self.enable_api if self.enable_api is not None else getattr(settings, 'CURD_ENABLE_API', False)
+        if enable_api:
+            for model_class, curd_config_obj in self._registry.items():
+                route = 'api/{app_name}/{model_name}/'.format(
+                    app_name=model_class._meta.app_label,
+                    model_name=model_class._meta.model_name
+                )
+                if isinstance(curd_config_obj, LazyConfig):
+                    urlpatterns.append(LazyConfigResolver(route, curd_config_obj, api=True))
+                    continue
+                urlpatterns.append(path(route, (curd_config_obj.api_urls, None, None)))
+
+        enable_metrics = self.enable_metrics if self.enable_metrics is not None else instrumentation.is_enabled()
+        if enable_metrics:
+            urlpatterns.append(re_path(r'^metrics/$', self.metrics_view, name='metrics'))
         return urlpatterns
 
+    def has_metrics_permission(self, request):
+        """ 是否可以访问统计数据接口: 请求的地址在settings.CURD_METRICS_ALLOWED_IPS中(比如Prometheus所在的服务器)，
+            或者为登录的staff用户
+        Args:
+            request: 当前请求对象
+        Return:
+            True/False
+        """
+
+        if request.META.get('REMOTE_ADDR') in getattr(settings, 'CURD_METRICS_ALLOWED_IPS', ()):
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+    def metrics_view(self, request):
+        """ 当前进程中各个视图的统计数据，默认为Prometheus的文本格式，"?format=json"时返回json """
+
+        if not self.has_metrics_permission(request):
+            return HttpResponse('没有权限', status=403)
+        if request.GET.get('format') == 'json':
+            return JsonResponse({"results": instrumentation.metrics.snapshot()})
+        return HttpResponse(instrumentation.metrics.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def get_url_patterns(self):
+        """ get_urls()的结果只生成一次，注册新的模型类之后重新生成 """
+
+        if self._url_patterns is None:
+            self._url_patterns = self.get_urls()
+        return self._url_patterns
+
+    def get_url_map(self):
+        """ 将路由按照"<app>/<model>/"前缀放入字典，用于SiteResolver的分发
+        Return:
+            ({前缀: 路由}, 前缀不是"<app>/<model>/"形式的其他路由组成的列表)
+        """
+
+        if self._url_map is None:
+            url_map, fallback_patterns = {}, []
+            for pattern in self.get_url_patterns():
+                route = str(pattern.pattern)
+                if isinstance(pattern, URLResolver) and URL_PREFIX_RE.match(route) and route not in url_map:
+                    url_map[route] = pattern
+                else:
+                    fallback_patterns.append(pattern)
+            self._url_map = (url_map, fallback_patterns)
+        return self._url_map
+
+    def clear_urls(self):
+        """ 清空已经生成的路由，注册新的模型类时调用。路由已经被Django加载时还需要清空Django的缓存 """
+
+        self._url_patterns = None
+        self._url_map = None
+        clear_url_templates()
+        if self._resolver is not None:
+            self._resolver.reset()
+            clear_url_caches()
+
+    def get_config(self, app_label, model_name):
+        """ 根据应用名和模型名获取注册的config对象
+        Args:
+            app_label: 应用名
+            model_name: 模型名(小写)
+        Return:
+            config对象，没有注册时返回None。延迟注册的配置类会被导入
+        """
+
+        for model_class, curd_config_obj in self._registry.items():
+            if (model_class._meta.app_label, model_class._meta.model_name) == (app_label, model_name):
+                if isinstance(curd_config_obj, LazyConfig):
+                    return curd_config_obj.load()
+                return curd_config_obj
+        return None
+
     @property
     def urls(self):
-        return self.get_urls(), 'curd', None
+        if self._resolver is None:
+            self._resolver = SiteResolver(self)
+        return [self._resolver], 'curd', None
 
 
 site = CURDSite()       # 实现单例模式
+
+
+@receiver(setting_changed)
+def _setting_changed(setting, **kwargs):
+    """ 测试中使用override_settings修改了影响路由的设置时，重新生成路由 """
+
+    if setting in ('CURD_ENABLE_API', 'CURD_INSTRUMENTATION'):
+        site.clear_urls()
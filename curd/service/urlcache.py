@@ -0,0 +1,52 @@
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse, get_urlconf, get_script_prefix
+
+
+_PLACEHOLDER = '8097531246'       # 用来代替记录id的占位符，必须能够匹配"(\d+)"这样的路由
+_url_templates = {}               # {(urlconf, script_prefix, alias): (prefix, suffix)}
+
+
+def cached_reverse(alias, nid=None):
+    """ 反向解析url。同一个别名只会执行一次reverse()，将结果拆分成记录id之前和之后两部分，
+        之后每次只需要将记录id拼接进去，适用于列表页面每一行的删除、编辑等链接
+    Args:
+        alias: url的别名，比如"curd:trial_book_change"
+        nid: 记录的id，没有参数的url为None
+    Return:
+        字符串形式的路径
+    """
+
+    if nid is not None and not (isinstance(nid, int) or str(nid).isdigit()):
+        return reverse(alias, args=(nid, ))         # 非数字的参数需要经过reverse()的校验和转义
+
+    key = (get_urlconf(), get_script_prefix(), alias, nid is None)
+    template = _url_templates.get(key)
+    if template is None:
+        if nid is None:
+            template = (reverse(alias), '')
+        else:
+            url = reverse(alias, args=(_PLACEHOLDER, ))
+            prefix, sep, suffix = url.partition(_PLACEHOLDER)
+            if not sep or _PLACEHOLDER in suffix:
+                return reverse(alias, args=(nid, ))
+            template = (prefix, suffix)
+        _url_templates[key] = template
+
+    if nid is None:
+        return template[0]
+    return '%s%s%s' % (template[0], nid, template[1])
+
+
+def clear_url_templates():
+    """ 清空已经缓存的url，路由关系发生变化时需要调用 """
+
+    _url_templates.clear()
+
+
+@receiver(setting_changed)
+def _root_urlconf_changed(sender, setting, **kwargs):
+    """ ROOT_URLCONF发生变化(比如测试中使用override_settings)时清空缓存 """
+
+    if setting == 'ROOT_URLCONF':
+        clear_url_templates()
@@ -1,12 +1,14 @@
-from django.utils.safestring import mark_safe
-from copy import deepcopy
+from django.utils.html import format_html
+from urllib.parse import urlencode
+from curd.service import instrumentation
+from curd.service.profiler import ColumnProfiler
 
 
 class ShowView(object):
     """ 列表页面功能类
 
     """
-    def __init__(self, config_obj, queryset):
+    def __init__(self, config_obj, queryset, combain_condition=None):
         self.queryset = queryset
         self.config_obj = config_obj
         self.request = config_obj.request
@@ -14,25 +16,111 @@ class ShowView(object):
 
         # 用于标注
         self.list_display = self.config_obj.get_list_display()
+        self.columns = self.config_obj.get_list_columns(self.list_display)
         self.show_add_btn = self.config_obj.get_add_url()
         self.search_list = self.config_obj.get_search_list()
         self.show_search_form = self.config_obj.get_show_search_form()
         self.action_list = self.config_obj.get_action_list()
         self.show_action_form = self.config_obj.get_show_action_form()
         self.combain_search_field_list = self.config_obj.get_combain_search_field_list()
+        self.show_export_btn = self.config_obj.get_show_export_btn()
+        self.show_bulk_edit_btn = self.config_obj.get_show_bulk_edit_btn()
+        self.show_import_btn = self.config_obj.get_show_import_btn()
+        self.job = None                     # 当前提交的后台任务，由show_view设置
+        self._fragments = None
+        # 统计每一列的耗时和查询次数，由get_profile_columns()决定是否开启
+        self.profiler = ColumnProfiler(self.config_obj, self.columns) if self.config_obj.get_profile_columns() else None
+
+        # 根据list_display规划关联查询，避免每一行记录都产生额外的查询
+        plan = self.config_obj.get_list_queryset_plan(self.list_display, combain_condition)
+        if plan:
+            if self.config_obj.keyset_pagination:    # 游标分页需要读取排序字段的值
+                plan.add_path(self.config_obj.get_keyset_ordering().lstrip('-'))
+            queryset = plan.plan(queryset)
+        self.queryset = queryset
 
-        from curd.service.pagintator import Paingator
+    def __getattr__(self, name):
+        """ 统计记录总数、查询当前页面的记录推迟到第一次使用时执行，
+            列表页面的缓存命中时不需要查询数据库
+        """
 
-        page_obj = Paingator(
-            base_url=self.request.path_info,
-            obj_count=queryset.count(),     # 所有记录的总个数
-            params=self.request.GET,
-            per_page_count=2,
-            init_page_count=3,
-            request=self.request
-        )
+        if name == 'total_count':
+            return self.get_fragments()['total_count']
+        if name in ('page_obj', 'page_data_list'):
+            self.load()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def load(self):
+        """ 统计记录总数，生成分页对象，并查询当前页面的记录 """
+
+        from curd.service.pagintator import Paingator, KeysetPaingator
+
+        queryset = self.queryset
+        self.total_count = None             # keyset分页时不统计记录总数
+        if self.config_obj.keyset_pagination:        # 基于游标的分页，不需要统计记录总数
+            page_obj = KeysetPaingator(
+                base_url=self.request.path_info,
+                ordering=self.config_obj.get_keyset_ordering(),
+                params=self.request.GET,
+                per_page_count=self.config_obj.per_page_count,
+                request=self.request
+            )
+        else:
+            obj_count, is_estimate = self.config_obj.get_list_count(queryset)
+            self.total_count = obj_count
+            page_obj = Paingator(
+                base_url=self.request.path_info,
+                obj_count=obj_count,            # 所有记录的总个数
+                is_estimate=is_estimate,
+                params=self.request.GET,
+                per_page_count=self.config_obj.per_page_count,
+                init_page_count=self.config_obj.init_page_count,
+                request=self.request
+            )
         self.page_obj = page_obj
-        self.page_data_list = queryset[page_obj.start:page_obj.end]     # 用于生成指定页码对应页面记录
+        self.page_data_list = list(page_obj.page_queryset(queryset))   # 指定页码对应页面记录，只查询一次
+
+    def get_fragments(self):
+        """ 获取列表页面表格和页码的HTML，开启了list_cache_timeout时从缓存中读取，
+            缓存命中时既不查询数据库也不渲染模板
+        Return:
+            {"table": 表格HTML, "page": 页码HTML, "total_count": 记录总数}
+        """
+
+        if self._fragments is not None:
+            return self._fragments
+
+        from django.core.cache import cache
+        from django.template.loader import render_to_string
+        from django.utils.safestring import mark_safe
+        from curd.templatetags.curd_list import list_table
+
+        # 统计各列耗时时不使用缓存
+        cache_key = self.config_obj.get_list_cache_key(self.list_display) if self.profiler is None else None
+        fragments = cache.get(cache_key) if cache_key else None
+        if fragments is None:
+            fragments = {
+                "table": render_to_string('curd/includes/show_table.html', list_table(self)),
+                "page": self.page_obj.bootstrap_page_html(),
+                "total_count": self.total_count,
+            }
+            if cache_key:
+                cache.set(cache_key, fragments, self.config_obj.list_cache_timeout)
+        fragments["table"] = mark_safe(fragments["table"])
+        fragments["page"] = mark_safe(fragments["page"])
+        self._fragments = fragments
+        return fragments
+
+    def table_html(self):
+        """ 列表页面的表格 """
+
+        return self.get_fragments()['table']
+
+    def page_html(self):
+        """ 列表页面的页码 """
+
+        return self.get_fragments()['page']
 
     def th_list(self):
         """ 用于列表页面生成表头数据
@@ -40,37 +128,27 @@ class ShowView(object):
             返回值为包含表头数据的列表
         """
 
-        if self.list_display:
-            head_list = []
-            for field in self.list_display:
-                if isinstance(field, str):
-                    verbose_name = self.config_obj.model_class._meta.get_field(field).verbose_name
-                else:
-                    verbose_name = field( self.config_obj, is_header=True)
-                head_list.append(verbose_name)
-        else:
-            head_list = [self.config_obj.model_class._meta.verbose_name_plural]
-        return head_list
+        return [column.get_header(self.config_obj) for column in self.columns]
 
     def td_list(self):
-        """ 用于生成表格数据
+        """ 用于生成表格数据，每一列在渲染之前已经绑定好了读取数据的函数，
+            每一行只需要依次调用这些函数
         Return:
-            返回一个包含了单元格数据的生成器
-        """
-
-        def generator_tr(objects):
-            def generator_td(obj):
-                if self.config_obj.get_list_display():
-                    for field in self.list_display:
-                        if isinstance(field, str):
-                            val = getattr(obj, field)
-                        else:
-                            val = field(self.config_obj, obj, is_header=False)
-                        yield val
-                else:
-                    yield from self.config_obj.model_class.objects.all()
-            yield from [generator_td(obj) for obj in objects]
-        return generator_tr(self.page_data_list)
+            返回一个生成器，每一个元素为一行单元格数据组成的列表
+        """
+
+        cells = [column.bind(self.config_obj) for column in self.columns]
+        record = instrumentation.current()
+        profiler = self.profiler
+        for obj in self.page_data_list:
+            if record is not None:
+                record.rows += 1
+            if profiler is not None:
+                yield profiler.row(obj, cells)
+            else:
+                yield [cell(obj) for cell in cells]
+        if profiler is not None:
+            profiler.log()
 
     def template_modify_action_list(self):
         """ 为批量操作的actions下拉框提供渲染时使用的数据
@@ -94,46 +172,93 @@ class ShowView(object):
 
         return self.config_obj.get_add_url()
 
+    def bulk_edit_url(self):
+        """ 获取批量编辑页面的url
+
+        """
+
+        return self.config_obj.get_bulk_edit_url()
+
+    def import_url(self):
+        """ 获取导入记录对应的url
+
+        """
+
+        return self.config_obj.get_import_url()
+
+    def bulk_update_field_list(self):
+        """ 为内置的批量修改action提供可以修改的字段
+        Return:
+            (字段名, verbose_name)组成的列表
+        """
+
+        if 'bulk_update' not in [func.__name__ for func in self.action_list]:
+            return []
+        return [
+            (field_name, self.model_class._meta.get_field(field_name).verbose_name)
+            for field_name in self.config_obj.get_bulk_update_fields()
+        ]
+
+    def job_status_url(self):
+        """ 获取当前后台任务状态对应的url，列表页面定时请求该url显示任务进度
+
+        """
+
+        if self.job is None:
+            return None
+        return self.config_obj.get_job_url(self.job.pk)
+
+    def export_url_list(self):
+        """ 获取各个导出格式对应的url，url中保留了当前的搜索条件
+        Return:
+            (格式, url)组成的列表
+        """
+
+        from curd.service.export import EXPORT_FORMATS
+
+        params = self.request.GET.copy()
+        for key in self.config_obj.pagination_keys:
+            params.pop(key, None)
+        base_url = self.config_obj.get_export_url()
+        result = []
+        for export_format in EXPORT_FORMATS:
+            params['_format'] = export_format
+            result.append((export_format, '%s?%s' % (base_url, params.urlencode())))
+        return result
+
     def template_combain_search_field_list(self):
         """  一个生成器函数，用于渲染组合搜索条件以及每一个条件对应的选项
         Return:
             返回值为包含每一行搜索条件选项的SearchRow对象
         """
 
-        from django.db.models import ForeignKey, ManyToManyField
         for search_option_obj in self.combain_search_field_list:
             field = self.model_class._meta.get_field(search_option_obj.field_name)
-            if isinstance(field, ForeignKey):
-                row = SearchRow(
-                    option_obj=search_option_obj,
-                    request=self.request,
-                    data=search_option_obj.get_queryset(field)
-                )
-            elif isinstance(field, ManyToManyField):
-                row = SearchRow(
-                    option_obj=search_option_obj,
-                    request=self.request,
-                    data=search_option_obj.get_queryset(field)
-                )
-            else:
-                row = SearchRow(
-                    option_obj=search_option_obj,
-                    request=self.request,
-                    data=search_option_obj.get_choices(field)
-                )
-            yield row
+            counts = None
+            if search_option_obj.show_count:
+                counts = search_option_obj.get_counts(self.config_obj, field)
+            yield SearchRow(
+                option_obj=search_option_obj,
+                request=self.request,
+                data=search_option_obj.get_option_data(field),
+                counts=counts
+            )
 
 
 class SearchOption(object):
-    """ 封装组合搜索的配置项，比如是否是多选，过滤选项等
+    """ 封装组合搜索的配置项，比如是否是多选，过滤选项等。
+        ForeignKey/ManyToManyField的选项数据(pk, 文本)会被缓存，关联的模型类记录被保存或者删除后缓存失效
 
     """
 
-    def __init__(self, field_name, is_multi=False, condition=None, is_choices=False):
+    def __init__(self, field_name, is_multi=False, condition=None, is_choices=False, cache_timeout=300,
+                 show_count=False):
         self.field_name = field_name
         self.is_multi = is_multi
         self.condition = condition              # 过滤选项的条件
         self.is_choices = is_choices
+        self.cache_timeout = cache_timeout      # 选项数据的缓存时间，单位为秒，为0时不缓存
+        self.show_count = show_count            # 是否显示每个选项在当前搜索条件下对应的记录数
 
     def get_choices(self, field):
         """ 获取字段的choices参数对应列表
@@ -162,16 +287,100 @@ class SearchOption(object):
             return results
         return field.related_model.objects.all()
 
+    def watch(self, model_class):
+        """ 监听选项关联的模型类的数据变化，注册config对象时调用
+        Args:
+            model_class: 组合搜索所在的模型类
+        """
+
+        from curd.service import caching
+
+        field = model_class._meta.get_field(self.field_name)
+        if field.is_relation and self.cache_timeout:
+            caching.watch_model(field.related_model)
+        if self.show_count:                     # 记录数的缓存依赖当前模型类的数据
+            caching.watch_model(model_class)
+
+    def get_cache_key(self, field):
+        """ 生成选项数据的缓存key，包含了字段、过滤条件以及关联模型类的数据版本号 """
+
+        from hashlib import md5
+        from curd.service import caching
+
+        related_model = field.related_model
+        condition = md5(repr(sorted((self.condition or {}).items())).encode('utf-8')).hexdigest()
+        return 'curd:options:%s.%s:%s:%s' % (
+            field.model._meta.label_lower,
+            self.field_name,
+            condition,
+            caching.get_model_version(related_model)
+        )
+
+    def get_option_data(self, field):
+        """ 获取渲染组合搜索选项需要的数据
+        Args:
+            field: 组合搜索的字段对象
+        Return:
+            (pk, 文本)组成的列表，pk为字符串
+        """
+
+        if not field.is_relation:
+            return [(str(pk), text) for pk, text in self.get_choices(field)]
+        if not self.cache_timeout:
+            return [(str(obj.pk), str(obj)) for obj in self.get_queryset(field)]
+
+        from django.core.cache import cache
+
+        self.watch(field.model)
+        cache_key = self.get_cache_key(field)
+        data = cache.get(cache_key)
+        if data is None:
+            data = [(str(obj.pk), str(obj)) for obj in self.get_queryset(field)]
+            cache.set(cache_key, data, self.cache_timeout)
+        return data
+
+    def get_counts(self, config_obj, field):
+        """ 统计每个选项在当前搜索条件下对应的记录数，所有选项只使用一条GROUP BY查询。
+            统计时不使用当前字段自身的组合搜索条件，这样其他选项的记录数不会变成0
+        Args:
+            config_obj: 当前请求的config对象
+            field: 组合搜索的字段对象
+        Return:
+            {字符串形式的选项pk: 记录数}
+        """
+
+        from django.core.cache import cache
+        from django.db.models import Count
+        from curd.service import caching
+
+        model_class = config_obj.model_class
+        self.watch(model_class)
+        queryset = config_obj.get_queryset(exclude_field=self.field_name)
+        cache_key = 'curd:facets:%s.%s:%s:%s' % (
+            model_class._meta.label_lower,
+            self.field_name,
+            config_obj.get_filter_signature(queryset),
+            caching.get_versions(config_obj.get_list_cache_models())
+        )
+        counts = cache.get(cache_key)
+        if counts is None:
+            rows = queryset.order_by().values_list(self.field_name).annotate(count=Count('pk', distinct=True))
+            counts = {str(value): count for value, count in rows if value is not None}
+            cache.set(cache_key, counts, config_obj.count_cache_timeout)
+        return counts
+
 
 class SearchRow(object):
-    """ 用于生成组合搜索中每一行的所有选项以及每一个选项对应url
+    """ 用于生成组合搜索中每一行的所有选项以及每一个选项对应url。
+        除当前字段以外的查询参数只编码一次，每个选项只需要拼接当前字段的参数
 
     """
 
-    def __init__(self, option_obj, request, data):
+    def __init__(self, option_obj, request, data, counts=None):
         self.option_obj = option_obj
         self.request = request
-        self.data = data
+        self.data = data            # (pk, 文本)组成的列表
+        self.counts = counts        # {pk: 记录数}，不显示记录数时为None
 
     def __iter__(self):
         """ 将对象转换成可迭代对象
@@ -179,45 +388,40 @@ class SearchRow(object):
             返回值为每一个选项
         """
 
-        params = deepcopy(self.request.GET)
-        params._mutable = True
-        current_id = params.get(self.option_obj.field_name)
-        current_id_list = params.getlist(self.option_obj.field_name)
-
-        if self.option_obj.field_name in params:
-            origin_list = params.pop(self.option_obj.field_name)
-            url = "{0}?{1}".format(self.request.path_info, params.urlencode())
-            yield mark_safe('<a href="{0}">全部</a>'.format(url))
-            params.setlist(self.option_obj.field_name, origin_list)
+        field_name = self.option_obj.field_name
+        path_info = self.request.path_info
+        current_id_list = self.request.GET.getlist(field_name)
+        current_id = current_id_list[-1] if current_id_list else None
+        base_query = urlencode([
+            (key, value)
+            for key, value_list in self.request.GET.lists() if key != field_name
+            for value in value_list
+        ])
+
+        def build_url(id_list):
+            query = '&'.join(part for part in (base_query, urlencode([(field_name, pk) for pk in id_list])) if part)
+            return '%s?%s' % (path_info, query)
+
+        if current_id_list:
+            yield format_html('<a href="{0}">全部</a>', build_url([]))
         else:
-            url = "{0}?{1}".format(self.request.path_info, params.urlencode())
-            yield mark_safe('<a class="active" href={0}>全部</a>'.format(url))
-
-        # 遍历choices列表或者quersyet，取出渲染模板需要的数据
-        for obj in self.data:
-            if self.option_obj.is_choices:          # 选项为二元元组组成的列表形式
-                pk, text = str(obj[0]), obj[1]
-            else:                                   # 选项为QuerySet
-                pk, text = str(obj.pk), str(obj)
-            if not self.option_obj.is_multi:        # 单选
-                params[self.option_obj.field_name] = pk
-                url = "{0}?{1}".format(self.request.path_info, params.urlencode())
-                if current_id == pk:
-                    yield mark_safe('<a class="active" href="{0}">{1}</a>'.format(url, text))
-                else:
-                    yield mark_safe('<a href="{0}">{1}</a>'.format(url, text))
-            else:                                   # 选项为多选
-                _params = deepcopy(params)
-                id_list = _params.getlist(self.option_obj.field_name)
+            yield format_html('<a class="active" href="{0}">全部</a>', build_url([]))
 
-                if pk in current_id_list:       # 取消勾选条件
+        for pk, text in self.data:
+            if self.counts is not None:
+                text = '%s (%s)' % (text, '{:,}'.format(self.counts.get(pk, 0)))
+            if not self.option_obj.is_multi:        # 单选
+                url = build_url([pk])
+                active = current_id == pk
+            else:                                   # 多选
+                active = pk in current_id_list
+                if active:                          # 取消勾选条件
+                    id_list = list(current_id_list)
                     id_list.remove(pk)
-                    _params.setlist(self.option_obj.field_name, id_list)
-                    url = "{0}?{1}".format(self.request.path_info, _params.urlencode())
-                    yield mark_safe('<a class="active" href="{0}">{1}</a>'.format(url, text))
                 else:
-                    id_list.append(pk)
-                    _params.setlist(self.option_obj.field_name, id_list)
-                    url = "{0}?{1}".format(self.request.path_info, _params.urlencode())
-                    yield mark_safe('<a href="{0}">{1}</a>'.format(url, text))
-
+                    id_list = current_id_list + [pk]
+                url = build_url(id_list)
+            if active:
+                yield format_html('<a class="active" href="{0}">{1}</a>', url, text)
+            else:
+                yield format_html('<a href="{0}">{1}</a>', url, text)
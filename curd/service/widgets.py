@@ -0,0 +1,99 @@
+from copy import deepcopy
+
+from django.forms import Select, SelectMultiple
+from django.forms.models import ModelChoiceField
+
+
+class AutocompleteMixin(object):
+    """ 外键、多对多字段的自动补全控件。页面中只渲染已经选中的选项，其他选项由关联模型类的
+        config对象提供的自动补全接口分页返回，关联表很大时页面也不会加载整张表
+
+    """
+
+    is_autocomplete = True
+
+    def __init__(self, url, attrs=None, choices=()):
+        """ 初始化自动补全控件
+        Args:
+            url: 关联模型类的自动补全接口的url
+            attrs: html属性
+            choices: 字段的选项，ModelChoiceField会将其设置为ModelChoiceIterator
+        """
+
+        self.url = url
+        super().__init__(attrs, choices)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = self.url
+        attrs['class'] = ('%s curd-autocomplete' % attrs.get('class', '')).strip()
+        return attrs
+
+    def use_required_attribute(self, initial):
+        """ Select默认会读取第一个选项，没有空选项时会查询关联表 """
+
+        field = getattr(self.choices, 'field', None)
+        if self.allow_multiple_selected or not isinstance(field, ModelChoiceField):
+            return super().use_required_attribute(initial)
+        return not self.is_hidden and field.empty_label is not None
+
+    def optgroups(self, name, value, attrs=None):
+        """ 只查询已经选中的选项 """
+
+        field = getattr(self.choices, 'field', None)
+        if not isinstance(field, ModelChoiceField):
+            return super().optgroups(name, value, attrs)
+
+        selected = [item for item in value if item not in field.empty_values]
+        choices = []
+        if not self.allow_multiple_selected and field.empty_label is not None:
+            choices.append(('', field.empty_label))
+        if selected:
+            key = field.to_field_name or 'pk'
+            try:
+                object_list = field.queryset.filter(**{'%s__in' % key: selected})
+                choices.extend((field.prepare_value(obj), field.label_from_instance(obj)) for obj in object_list)
+            except (ValueError, TypeError):             # 提交了不合法的值
+                pass
+
+        original_choices = self.choices
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = original_choices
+
+
+class AutocompleteSelect(AutocompleteMixin, Select):
+    """ 外键字段的自动补全控件 """
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, SelectMultiple):
+    """ 多对多字段的自动补全控件 """
+
+
+def autocomplete_form_class(form_class, url_map):
+    """ 生成表单类的派生类，将外键、多对多字段的控件替换成自动补全控件，保留原来控件的html属性
+    Args:
+        form_class: ModelForm类
+        url_map: {字段名: 关联模型类的自动补全接口的url}
+    Return:
+        新的表单类，url_map为空时返回原来的表单类
+    """
+
+    fields = {
+        name: field for name, field in form_class.base_fields.items()
+        if name in url_map and isinstance(field, ModelChoiceField) and not field.widget.is_hidden
+    }
+    if not fields:
+        return form_class
+
+    # 作为声明的字段，modelformset_factory等再次派生表单类时不会被Meta中的配置覆盖
+    attrs = {"__module__": form_class.__module__}
+    for name, field in fields.items():
+        field = deepcopy(field)             # 在类中声明的字段与父类共用同一个对象
+        widget_class = AutocompleteSelectMultiple if field.widget.allow_multiple_selected else AutocompleteSelect
+        field.widget = widget_class(url_map[name], attrs=dict(field.widget.attrs))
+        field.widget.choices = field.choices
+        attrs[name] = field
+    return type(form_class.__name__, (form_class, ), attrs)
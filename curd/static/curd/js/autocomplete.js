@@ -0,0 +1,124 @@
+// 外键、多对多字段的自动补全控件: 在<select class="curd-autocomplete">后面添加一个搜索框，
+// 搜索结果由关联模型类的自动补全接口分页返回，选中的记录作为<option>添加到<select>中
+(function () {
+    function request(url, term, page, callback) {
+        var xhr = new XMLHttpRequest();
+        var sep = url.indexOf('?') === -1 ? '?' : '&';
+        xhr.open('GET', url + sep + 'term=' + encodeURIComponent(term) + '&page=' + page);
+        xhr.onload = function () {
+            if (xhr.status === 200) {
+                callback(JSON.parse(xhr.responseText));
+            }
+        };
+        xhr.send();
+    }
+
+    function choose(select, item) {
+        var value = String(item.id);
+        for (var i = 0; i < select.options.length; i++) {
+            if (select.options[i].value === value) {
+                select.options[i].selected = true;
+                return;
+            }
+        }
+        if (!select.multiple) {
+            for (var j = select.options.length - 1; j >= 0; j--) {
+                if (select.options[j].value !== '') {
+                    select.remove(j);
+                }
+            }
+        }
+        var option = document.createElement('option');
+        option.value = value;
+        option.text = item.text;
+        option.selected = true;
+        select.appendChild(option);
+    }
+
+    function bind(select) {
+        var input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control';
+        input.placeholder = '搜索...';
+        var list = document.createElement('ul');
+        list.className = 'list-group';
+        list.style.display = 'none';
+        list.style.maxHeight = '240px';
+        list.style.overflowY = 'auto';
+        select.parentNode.insertBefore(input, select.nextSibling);
+        select.parentNode.insertBefore(list, input.nextSibling);
+
+        var timer = null;
+        var page = 1;
+
+        function render(data, append) {
+            if (!append) {
+                list.innerHTML = '';
+            }
+            var more = list.querySelector('.more');
+            if (more) {
+                list.removeChild(more);
+            }
+            data.results.forEach(function (item) {
+                var li = document.createElement('li');
+                li.className = 'list-group-item';
+                li.style.cursor = 'pointer';
+                li.textContent = item.text;
+                li.onmousedown = function (event) {
+                    event.preventDefault();
+                    choose(select, item);
+                    list.style.display = 'none';
+                    input.value = '';
+                };
+                list.appendChild(li);
+            });
+            if (data.more) {
+                var li = document.createElement('li');
+                li.className = 'list-group-item more text-muted';
+                li.style.cursor = 'pointer';
+                li.textContent = '更多...';
+                li.onmousedown = function (event) {
+                    event.preventDefault();
+                    page += 1;
+                    request(select.dataset.autocompleteUrl, input.value, page, function (data) {
+                        render(data, true);
+                    });
+                };
+                list.appendChild(li);
+            }
+            list.style.display = list.children.length ? '' : 'none';
+        }
+
+        function search() {
+            page = 1;
+            request(select.dataset.autocompleteUrl, input.value, page, function (data) {
+                render(data, false);
+            });
+        }
+
+        input.oninput = function () {
+            clearTimeout(timer);
+            timer = setTimeout(search, 250);
+        };
+        input.onfocus = search;
+        input.onblur = function () {
+            list.style.display = 'none';
+        };
+    }
+
+    function init() {
+        var selects = document.querySelectorAll('select.curd-autocomplete');
+        for (var i = 0; i < selects.length; i++) {
+            if (!selects[i].dataset.autocompleteBound) {
+                selects[i].dataset.autocompleteBound = '1';
+                bind(selects[i]);
+            }
+        }
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
@@ -1,5 +1,6 @@
 from django.template import Library
-from django.urls import reverse
+
+from curd.service.urlcache import cached_reverse
 
 register = Library()
 
@@ -13,7 +14,7 @@ def form_popup(form_obj):
         if isinstance(bound_field.field, ModelChoiceField):
             field_related_model_class = bound_field.field.queryset.model
             app_model = field_related_model_class._meta.app_label, field_related_model_class._meta.model_name
-            base_url = reverse("curd:%s_%s_add" % app_model)
+            base_url = cached_reverse("curd:%s_%s_add" % app_model)     # 每个关联模型类只需要reverse()一次
             popup_url = "%s?_popbackid=%s" % (base_url, bound_field.auto_id)
             temp["is_popup"] = True
             temp["popup_url"] = popup_url
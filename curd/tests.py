@@ -1,3 +1,1078 @@
-from django.test import TestCase
+import os
+import csv
+import json
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django import forms
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import signals
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, resolve, Resolver404
+from django.utils import timezone
+
+from curd.models import Job
+from curd.service import sites, jobs, bulk, instrumentation, search, caching, profiler
+from curd.service.planner import QueryPlanner
+from curd.service.signals import rows_updated
+from trial import models
+from trial.curd import BookConfig, AuthorConfig
+
+
+class ListPageQueryCountTest(TestCase):
+    """ 列表页面的查询次数必须是固定的，不能随着每页显示的记录数增加 """
+
+    @classmethod
+    def setUpTestData(cls):
+        publish_list = [
+            models.Publish.objects.create(publish_name='出版社%s' % i, city='北京', email='p%s@example.com' % i)
+            for i in range(3)
+        ]
+        author_list = [
+            models.Author.objects.create(author_name='作者%s' % i, age=30 + i, gender=1 + i % 2)
+            for i in range(4)
+        ]
+        for i in range(12):
+            book = models.Book.objects.create(book_name='图书%s' % i, price=10 + i, publish=publish_list[i % 3])
+            book.authors.set(author_list[:i % 4 + 1])
+
+    def setUp(self):
+        cache.clear()               # 组合搜索的选项数据会被缓存
+
+    def test_book_list(self):
+        # 记录总数 + 组合搜索的作者、出版社 + 当前页面的图书(关联出版社) + 当前页面图书的作者
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('curd:trial_book_show'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '出版社0')
+
+    def test_book_list_query_count_independent_of_page_size(self):
+        per_page_count = BookConfig.per_page_count
+        BookConfig.per_page_count = 10
+        try:
+            with self.assertNumQueries(5):
+                response = self.client.get(reverse('curd:trial_book_show'))
+        finally:
+            BookConfig.per_page_count = per_page_count
+        self.assertContains(response, '图书9')
+
+    def test_book_list_with_combain_search(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('curd:trial_book_show'), {"authors": ['1', '2'], "publish": '1'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_combain_search_options_are_cached(self):
+        self.client.get(reverse('curd:trial_book_show'))
+        # 作者、出版社的选项数据已经缓存
+        with self.assertNumQueries(3):
+            self.client.get(reverse('curd:trial_book_show'))
+
+        models.Author.objects.create(author_name='新作者', age=40, gender=1)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('curd:trial_book_show'))
+        self.assertContains(response, '新作者')
+
+    def test_cached_count_follows_data_and_queryset(self):
+        config_obj = sites.site.get_config('trial', 'book').bind_request(self.client.get('/').wsgi_request)
+        with mock.patch.object(BookConfig, 'count_strategy', 'cached'):
+            self.assertEqual(config_obj.get_list_count(models.Book.objects.all()), (12, False))
+            with self.assertNumQueries(0):
+                config_obj.get_list_count(models.Book.objects.all())
+
+            # 新增记录之后版本号增加，不需要等待缓存过期
+            models.Book.objects.create(book_name='新书', price=10, publish=models.Publish.objects.first())
+            self.assertEqual(config_obj.get_list_count(models.Book.objects.all()), (13, False))
+
+            # 同样的查询参数，get_queryset()中的条件不同时不共用统计结果
+            self.assertEqual(config_obj.get_list_count(models.Book.objects.filter(price__lt=12)), (3, False))
+
+    def test_model_version_does_not_repeat_after_eviction(self):
+        version = caching.get_model_version(models.Author)
+        caching.bump_model_version(models.Author)
+        bumped = caching.get_model_version(models.Author)
+        self.assertGreater(bumped, version)
+
+        # 版本号丢失之后重新生成的版本号不会与之前的重复
+        cache.delete(caching._version_key(models.Author))
+        self.assertNotIn(caching.get_model_version(models.Author), (version, bumped))
+        cache.delete(caching._version_key(models.Author))
+        caching.bump_model_version(models.Author)
+        self.assertNotIn(caching.get_model_version(models.Author), (version, bumped))
+
+    def test_combain_search_counts(self):
+        publish_option = BookConfig.combain_search_field_list[1]
+        with mock.patch.object(publish_option, 'show_count', True):
+            self.client.get(reverse('curd:trial_book_show'))
+            # 出版社选项的记录数只需要一条GROUP BY查询，结果被缓存
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('curd:trial_book_show'), {"publish": '1'})
+            self.assertContains(response, '出版社1 (4)')
+            response = self.client.get(reverse('curd:trial_book_show'), {"authors": '4'})
+        # 只有i % 4 == 3的图书有作者3
+        self.assertContains(response, '出版社0 (1)')
+        self.assertContains(response, '出版社2 (1)')
+
+    def test_list_cache(self):
+        with mock.patch.object(BookConfig, 'list_cache_timeout', 60):
+            self.client.get(reverse('curd:trial_book_show'))
+            # 表格、页码和组合搜索的选项都已经缓存，不需要查询数据库
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('curd:trial_book_show'))
+            self.assertContains(response, '图书0')
+
+            # 修改关联的出版社之后缓存失效
+            models.Publish.objects.filter(pk=1).first().save()
+            with self.assertNumQueries(4):          # 作者的选项数据仍然在缓存中
+                self.client.get(reverse('curd:trial_book_show'))
+            # 每一页单独缓存
+            with self.assertNumQueries(3):
+                self.client.get(reverse('curd:trial_book_show'), {"page": 2})
+
+    def test_conditional_get(self):
+        url = reverse('curd:trial_book_show')
+        with mock.patch.object(BookConfig, 'conditional_get', True):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.client.get(url, {"page": 2}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+            models.Book.objects.first().authors.clear()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+            # 等待显示的消息不会被304隐藏，显示之后恢复原来的ETag
+            etag = self.client.get(url)['ETag']
+            with mock.patch.object(BookConfig, 'show_import_btn', True):
+                self.client.post(reverse('curd:trial_book_import'))
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, '请选择要导入的文件')
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            change_url = reverse('curd:trial_book_change', args=(1, ))
+            self.client.get(change_url)           # 第一次请求设置CSRF cookie
+            etag = self.client.get(change_url)['ETag']
+            self.assertEqual(self.client.get(change_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            models.Author.objects.create(author_name='新作者', age=40, gender=1)     # 表单中作者的选项发生变化
+            self.assertEqual(self.client.get(change_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_author_list(self):
+        # 记录总数 + 当前页面的作者
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('curd:trial_author_show'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_publish_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('curd:trial_publish_show'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_reverse_relation_is_prefetched_by_accessor(self):
+        def book_display(config, obj=None, is_header=False):
+            if is_header:
+                return '图书'
+            return ','.join('%s(%s)' % (book, book.publish) for book in obj.book_set.all())
+        book_display.depends_on = ('book__publish', )
+
+        plan = QueryPlanner(models.Author, ['author_name', book_display])
+        self.assertEqual(plan.prefetch_related, {'book_set__publish'})
+        self.assertEqual(plan.only_fields, {'id', 'author_name'})
+        self.assertIn(models.Book, plan.related_models)
+        # 作者 + 作者的图书 + 图书的出版社
+        with self.assertNumQueries(3):
+            rows = [book_display(None, author) for author in plan.plan(models.Author.objects.order_by('pk'))]
+        self.assertEqual(len(rows), 4)
+        self.assertIn('图书0(出版社0)', rows[0])
+
+
+class RequestScopedConfigTest(TestCase):
+    """ 注册时创建的config对象被所有线程共享，处理请求时不能修改它 """
+
+    def test_shared_config_is_not_mutated(self):
+        config_obj = sites.site.get_config('trial', 'author')
+        response = self.client.get(reverse('curd:trial_author_show'), {"query": '作者'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(config_obj.request)
+
+    def test_bind_request(self):
+        config_obj = sites.site.get_config('trial', 'author')
+        request = self.client.get(reverse('curd:trial_author_show')).wsgi_request
+        bound_config_obj = config_obj.bind_request(request)
+        self.assertIs(bound_config_obj.request, request)
+        self.assertIs(bound_config_obj.model_class, config_obj.model_class)
+        self.assertIsNone(config_obj.request)
+
+    def test_model_form_class_is_cached(self):
+        config_obj = sites.site.get_config('trial', 'publish')
+        form_class = config_obj.get_model_form_class()
+        self.assertIs(config_obj.bind_request(None).get_model_form_class(), form_class)
+        with mock.patch.object(type(config_obj), 'model_form_class', None):
+            default_form_class = config_obj.get_model_form_class()
+            self.assertIsNot(default_form_class, form_class)
+            self.assertIs(config_obj.get_model_form_class(), default_form_class)
+
+
+class JobTest(TestCase):
+    """ 标记为后台执行的action和导出在请求中只创建任务，由后台进程执行 """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            models.Author.objects.create(author_name='作者%s' % i, age=30 + i, gender=1)
+
+    def run_pending_jobs(self):
+        job = jobs.claim_job('test')
+        while job is not None:
+            jobs.run_job(job)
+            job = jobs.claim_job('test')
+
+    def test_async_action(self):
+        action_list = [jobs.async_action(sites.CURDConfig.bulk_delete)]
+        with mock.patch.object(AuthorConfig, 'action_list', action_list):
+            response = self.client.post(reverse('curd:trial_author_show'), {"action": 'bulk_delete', "_select_across": '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(models.Author.objects.count(), 5)
+        job = Job.objects.get()
+        self.assertContains(response, reverse('curd:trial_author_job', args=(job.pk, )))
+
+        with mock.patch.object(AuthorConfig, 'action_list', action_list):
+            self.run_pending_jobs()
+        self.assertEqual(models.Author.objects.count(), 0)
+        data = self.client.get(reverse('curd:trial_author_job', args=(job.pk, ))).json()
+        self.assertEqual(data['status'], Job.DONE)
+        self.assertEqual((data['processed'], data['total']), (5, 5))
+        self.assertEqual(data['result'], '5')
+
+    def test_build_request_for_anonymous_job(self):
+        job = Job.objects.create(app_label='trial', model_name='author', action='bulk_delete')
+        request = jobs.build_request(job)
+        self.assertFalse(request.user.is_authenticated)
+
+    def test_stuck_job_is_failed(self):
+        job = Job.objects.create(app_label='trial', model_name='author', action='bulk_delete', status=Job.RUNNING,
+                                 started_time=timezone.now() - timedelta(hours=2))
+        running = Job.objects.create(app_label='trial', model_name='author', action='bulk_delete', status=Job.RUNNING,
+                                     started_time=timezone.now())
+        self.assertIsNone(jobs.claim_job('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_time)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Job.RUNNING)
+
+    def test_heartbeat_keeps_long_job_running(self):
+        job = Job.objects.create(app_label='trial', model_name='author', action='bulk_delete', status=Job.RUNNING,
+                                 worker='test', started_time=timezone.now() - timedelta(hours=2))
+        job.update_progress(1, 5)
+        self.assertEqual(jobs.expire_jobs(), 0)
+        self.assertTrue(job.finish(result='5'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_expired_job_is_not_finished_again(self):
+        job = Job.objects.create(app_label='trial', model_name='author', action='bulk_delete', status=Job.RUNNING,
+                                 worker='test', started_time=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.expire_jobs(), 1)
+        self.assertFalse(job.finish(result='5'))
+        self.assertEqual(job.status, Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.result, '')
+
+    def test_anonymous_job_is_only_visible_to_submitter(self):
+        with mock.patch.object(AuthorConfig, 'show_export_btn', True), \
+                mock.patch.object(AuthorConfig, 'async_export', True):
+            self.client.get(reverse('curd:trial_author_export'), {"_format": 'jsonl'})
+        job = Job.objects.get()
+        url = reverse('curd:trial_author_job', args=(job.pk, ))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client_class().get(url).status_code, 404)
+
+    def test_async_export(self):
+        with mock.patch.object(AuthorConfig, 'show_export_btn', True), \
+                mock.patch.object(AuthorConfig, 'async_export', True):
+            response = self.client.get(reverse('curd:trial_author_export'), {"_format": 'jsonl'})
+            job = Job.objects.get()
+            self.assertRedirects(response, '%s?_job=%s' % (reverse('curd:trial_author_show'), job.pk))
+            self.run_pending_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE, job.error)
+        response = self.client.get(reverse('curd:trial_author_job_download', args=(job.pk, )))
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+
+
+class ExportTest(TestCase):
+    """ 导出以流的形式返回，分批查询数据库，查询次数只与批次数有关 """
+
+    @classmethod
+    def setUpTestData(cls):
+        publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        author = models.Author.objects.create(author_name='作者', age=30, gender=1)
+        for i in range(12):
+            book = models.Book.objects.create(book_name='图书%s' % i, price=10 + i, publish=publish)
+            book.authors.add(author)
+
+    def export(self, export_format):
+        """ 导出图书并读取全部内容，返回内容和读取内容时执行的查询次数 """
+
+        with mock.patch.object(BookConfig, 'export_chunk_size', 5):
+            response = self.client.get(reverse('curd:trial_book_export'), {"_format": export_format})
+            self.assertTrue(response.streaming)
+            with CaptureQueriesContext(connection) as queries:
+                content = b''.join(response.streaming_content)
+        return content, len(queries)
+
+    def test_csv(self):
+        content, query_count = self.export('csv')
+        rows = list(csv.reader(StringIO(content.decode('utf-8-sig'))))
+        self.assertEqual(rows[0], ['书名', '图书价格', '作者', '出版社'])
+        self.assertEqual(len(rows), 13)
+        # 3批图书 + 3批作者 + 最后一次确认没有更多记录
+        self.assertEqual(query_count, 7)
+
+    def test_jsonl(self):
+        content, query_count = self.export('jsonl')
+        rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(list(rows[0]), ['book_name', 'price', 'author_display', 'publish'])
+        self.assertEqual(rows[0]['author_display'], '作者')
+        self.assertEqual(query_count, 7)
+
+    def test_xlsx(self):
+        import openpyxl
+
+        content, query_count = self.export('xlsx')
+        with tempfile.TemporaryFile() as f:
+            f.write(content)
+            sheet = openpyxl.load_workbook(f, read_only=True).active
+            rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows[0], ['书名', '图书价格', '作者', '出版社'])
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(query_count, 7)
+
+
+class FullTextSearchTest(TestCase):
+    """ 全文索引与记录保持同步，搜索时使用索引表查询主键 """
+
+    def setUp(self):
+        for i in range(3):
+            models.Author.objects.create(author_name='作者%s号' % i, age=30 + i, gender=1)
+        self.backend = sites.site.get_config('trial', 'author').get_search_backend()
+        self.backend.rebuild()
+
+    def tearDown(self):
+        self.backend._ready = False             # 测试结束后索引表会随着事务回滚
+
+    def search(self, query_str):
+        response = self.client.get(reverse('curd:trial_author_show'), {"query": query_str})
+        return [row[1] for row in response.context['show_obj'].td_list()]
+
+    def test_search_uses_index(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.search('者1号'), ['作者1号'])
+        condition = sites.site.get_config('trial', 'author').bind_request(
+            self.client.get(reverse('curd:trial_author_show'), {"query": '者1号'}).wsgi_request
+        ).create_search_condition()
+        self.assertIn('MATCH', str(models.Author.objects.filter(condition).query))
+
+    def test_only_substring_lookups_use_index(self):
+        backend = search.FullTextSearchBackend(models.Author, [
+            'author_name', 'author_name__exact', 'author_name__startswith', 'age__gte',
+            'author_name__icontains', 'gender__contains',
+        ])
+        self.assertEqual(backend.index_fields, ['author_name', 'gender'])
+        backend._ready = True
+        condition = backend.get_condition('者1号', ['author_name__exact', 'author_name__startswith'])
+        self.assertNotIn('MATCH', str(models.Author.objects.filter(condition).query))
+        self.assertEqual(list(models.Author.objects.filter(condition)), [])
+
+    def test_search_is_limited_to_given_fields(self):
+        condition = self.backend.get_condition('者1号', ['gender__contains'])
+        self.assertIn('MATCH', str(models.Author.objects.filter(condition).query))
+        self.assertEqual(list(models.Author.objects.filter(condition)), [])
+        condition = self.backend.get_condition('者1号', ['author_name__contains'])
+        self.assertEqual([author.author_name for author in models.Author.objects.filter(condition)], ['作者1号'])
+
+    def test_writes_are_indexed_after_table_is_created_elsewhere(self):
+        # 当前进程缓存了"索引表不存在"的结果，其他进程在此期间创建了索引表
+        self.backend._ready = False
+        self.backend._checked_at = time.time()
+        author = models.Author.objects.create(author_name='新来的作者', age=40, gender=1)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM %s' % self.backend.table_name)
+            self.assertIn((author.pk, ), cursor.fetchall())
+
+    def test_postgresql_contains_is_case_sensitive(self):
+        with mock.patch.object(search.FullTextSearchBackend, 'vendor', 'postgresql'):
+            sql, params = self.backend.get_search_sql('abc', ['author_name__contains', 'gender__icontains'])
+        self.assertIn('"author_name" LIKE %s', sql)
+        self.assertIn('"gender" ILIKE %s', sql)
+        self.assertEqual(params, ['%abc%', '%abc%'])
+
+    def test_index_is_kept_in_sync(self):
+        author = models.Author.objects.create(author_name='新来的作者', age=40, gender=1)
+        self.assertEqual(self.search('新来的'), ['新来的作者'])
+        author.author_name = '改名的作者'
+        author.save()
+        self.assertEqual(self.search('新来的'), [])
+        self.assertEqual(self.search('改名的'), ['改名的作者'])
+
+        # 批量删除直接使用DELETE语句，通过rows_deleted信号删除索引
+        bulk.bulk_delete(models.Author.objects.all())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM %s' % self.backend.table_name)
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+@override_settings(CURD_ENABLE_API=True)
+class ApiTest(TestCase):
+    """ 每个注册的模型类都有json接口，列表接口的查询次数不随记录数增加 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='password', is_staff=True)
+        cls.publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        cls.author_list = [
+            models.Author.objects.create(author_name='作者%s' % i, age=30 + i, gender=1) for i in range(3)
+        ]
+        for i in range(5):
+            book = models.Book.objects.create(book_name='图书%s' % i, price=10 + i, publish=cls.publish)
+            book.authors.set(cls.author_list)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def post_json(self, url, data, method='post'):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+    def test_permission(self):
+        url = reverse('curd:trial_book_api_list')
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user('user', password='password'))
+        self.assertEqual(self.post_json(url, {"book_name": '新书'}).status_code, 403)
+        self.assertEqual(self.post_json(reverse('curd:trial_book_api_bulk'), {"create": []}).status_code, 403)
+        self.assertFalse(models.Book.objects.filter(book_name='新书').exists())
+
+        with mock.patch.object(BookConfig, 'has_api_permission', lambda config_obj, request: True):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_disabled_by_default(self):
+        with override_settings(CURD_ENABLE_API=False):
+            with self.assertRaises(Resolver404):
+                resolve('/curd/api/trial/book/')
+        self.assertEqual(resolve('/curd/api/trial/book/').url_name, 'trial_book_api_list')
+
+    def test_list(self):
+        url = reverse('curd:trial_book_api_list')
+        # 会话和用户 + 当前页面的图书，list_display中的功能函数不会被返回
+        with self.assertNumQueries(3):
+            data = self.client.get(url, {"_limit": 2}).json()
+        self.assertEqual([row['book_name'] for row in data['results']], ['图书0', '图书1'])
+        self.assertEqual(data['results'][0]['publish'], self.publish.pk)
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([row['book_name'] for row in data['results']], ['图书2', '图书3'])
+        self.assertIsNotNone(data['previous'])
+
+        data = self.client.get(reverse('curd:trial_author_api_list'), {"query": '作者2'}).json()
+        self.assertEqual([row['author_name'] for row in data['results']], ['作者2'])
+
+    def test_malformed_cursor_starts_from_first_page(self):
+        with self.assertLogs('curd.service.pagintator', 'DEBUG'):
+            data = self.client.get(reverse('curd:trial_book_api_list'), {"_after": 'abc', "_limit": 2}).json()
+        self.assertEqual([row['book_name'] for row in data['results']], ['图书0', '图书1'])
+
+    def test_retrieve(self):
+        book = models.Book.objects.get(book_name='图书0')
+        # 会话和用户 + 图书 + 多对多关系表
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse('curd:trial_book_api_detail', args=(book.pk, ))).json()
+        self.assertEqual(sorted(data['authors']), sorted(author.pk for author in self.author_list))
+        self.assertEqual(self.client.get(reverse('curd:trial_book_api_detail', args=(0, ))).status_code, 404)
+
+    def test_create_and_update(self):
+        url = reverse('curd:trial_publish_api_list')
+        response = self.post_json(url, {"publish_name": '新出版社', "city": '上海', "email": 'new@example.com'})
+        self.assertEqual(response.status_code, 201)
+        nid = response.json()['id']
+
+        detail_url = reverse('curd:trial_publish_api_detail', args=(nid, ))
+        response = self.post_json(detail_url, {"city": '广州'}, method='patch')
+        self.assertEqual(response.json()['city'], '广州')
+        self.assertEqual(response.json()['publish_name'], '新出版社')
+
+        response = self.post_json(detail_url, {"city": '深圳'}, method='put')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('publish_name', response.json()['errors'])
+
+        response = self.client.post(url, {"publish_name": '表单'})
+        self.assertEqual(response.status_code, 415)
+
+    def test_bulk(self):
+        url = reverse('curd:trial_publish_api_bulk')
+        response = self.post_json(url, {
+            "create": [{"publish_name": '出版社%s' % i, "city": '上海', "email": 'p%s@example.com' % i} for i in range(3)],
+            "update": [{"id": self.publish.pk, "city": '上海'}],
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(models.Publish.objects.filter(city='上海').count(), 4)
+
+        # 任何一条记录校验失败时都不会保存
+        response = self.post_json(url, {
+            "create": [{"publish_name": '出版社x', "city": '上海', "email": 'x@example.com'}, {"city": '上海'}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['errors']['create']), ['1'])
+        self.assertFalse(models.Publish.objects.filter(publish_name='出版社x').exists())
+
+
+class BulkEditTest(TestCase):
+    """ 批量编辑页面一次提交多条记录，校验和保存的查询次数与记录数无关 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.publish_list = [
+            models.Publish.objects.create(publish_name='出版社%s' % i, city='北京', email='p%s@example.com' % i)
+            for i in range(2)
+        ]
+        cls.author_list = [
+            models.Author.objects.create(author_name='作者%s' % i, age=30 + i, gender=1) for i in range(2)
+        ]
+
+    def setUp(self):
+        patcher = mock.patch.object(BookConfig, 'show_bulk_edit_btn', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse('curd:trial_book_bulk_edit')
+
+    def csv_text(self, count):
+        lines = ['book_name,price,publish,authors']
+        for i in range(count):
+            lines.append('图书%s,%s,%s,"%s,%s"' % (
+                i, 10 + i, self.publish_list[i % 2].pk, self.author_list[0].pk, self.author_list[1].pk
+            ))
+        return '\n'.join(lines)
+
+    def test_get_query_count_independent_of_rows(self):
+        with self.assertNumQueries(0):              # 自动补全控件只渲染选中的选项
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['formset'].forms), BookConfig.bulk_edit_extra)
+        with mock.patch.object(BookConfig, 'autocomplete_fields', []):
+            with self.assertNumQueries(2):          # 普通的下拉框，出版社和作者的选项各查询一次
+                self.client.get(self.url)
+            with mock.patch.object(BookConfig, 'bulk_edit_extra', 20), self.assertNumQueries(2):
+                self.client.get(self.url)
+
+    def test_formset(self):
+        data = {
+            "_mode": 'formset',
+            "form-TOTAL_FORMS": '3',
+            "form-INITIAL_FORMS": '0',
+            "form-0-book_name": '图书a',
+            "form-0-price": '10',
+            "form-0-publish": self.publish_list[0].pk,
+            "form-0-authors": [self.author_list[0].pk],
+            "form-1-book_name": '图书b',
+            "form-1-price": '20',
+            "form-1-publish": self.publish_list[1].pk,
+            "form-1-authors": [self.author_list[1].pk],
+        }
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('curd:trial_book_show'), fetch_redirect_response=False)
+        self.assertEqual(models.Book.objects.count(), 2)
+        book = models.Book.objects.get(book_name='图书b')
+        self.assertEqual(list(book.authors.all()), [self.author_list[1]])
+
+        # 修改已有的记录
+        data = {
+            "_mode": 'formset',
+            "form-TOTAL_FORMS": '1',
+            "form-INITIAL_FORMS": '1',
+            "form-0-id": book.pk,
+            "form-0-book_name": '图书c',
+            "form-0-price": '30',
+            "form-0-publish": self.publish_list[1].pk,
+            "form-0-authors": [self.author_list[1].pk],
+        }
+        self.client.post('%s?id=%s' % (self.url, book.pk), data)
+        self.assertEqual(models.Book.objects.get(pk=book.pk).book_name, '图书c')
+
+    def test_csv(self):
+        response = self.client.post(self.url, {"_mode": 'csv', "csv_text": self.csv_text(50)})
+        self.assertRedirects(response, reverse('curd:trial_book_show'), fetch_redirect_response=False)
+        self.assertEqual(models.Book.objects.count(), 50)
+        self.assertEqual(models.Book.objects.filter(authors=self.author_list[1]).count(), 50)
+
+        # 修改记录只需要提供要修改的列，校验失败时报告行号，所有记录都不会保存
+        book_list = list(models.Book.objects.order_by('pk')[:2])
+        csv_text = 'id,price\n%s,99\n%s,abc' % (book_list[0].pk, book_list[1].pk)
+        response = self.client.post(self.url, {"_mode": 'csv', "csv_text": csv_text})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([line for line, errors in response.context['csv_errors']], [3])
+        self.assertFalse(models.Book.objects.filter(price=99).exists())
+
+    def test_csv_query_count(self):
+        # 数据库不能返回bulk_create()生成的主键时(SQLite)，有多对多数据的记录需要逐条插入，其他查询与记录数无关
+        per_row = 0 if connection.features.can_return_ids_from_bulk_insert else 1
+        queries = []
+        for count in (10, 100):
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(self.url, {"_mode": 'csv', "csv_text": self.csv_text(count)})
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[1] - queries[0], 90 * per_row)
+
+    def test_prefetch_keeps_choice_restrictions(self):
+        other = models.Publish.objects.create(publish_name='出版社x', city='上海', email='x@example.com')
+
+        class BookForm(forms.ModelForm):
+            # 自定义的表单字段不会加上模型字段的limit_choices_to
+            publish = forms.ModelChoiceField(queryset=models.Publish.objects.all())
+            authors = forms.ModelMultipleChoiceField(queryset=models.Author.objects.filter(age__lt=31))
+
+            class Meta:
+                model = models.Book
+                fields = ['book_name', 'price', 'publish', 'authors']
+
+        def validate(publish, author):
+            form_list = [
+                BookForm(data={"book_name": '图书%s' % i, "price": 10, "publish": publish.pk, "authors": [author.pk]})
+                for i in range(3)
+            ]
+            with self.assertNumQueries(2):          # 出版社和作者各查询一次，校验时不再查询
+                bulk.prefetch_choices(form_list)
+                return [sorted(form.errors) for form in form_list if not form.is_valid()]
+
+        remote_field = models.Book._meta.get_field('publish').remote_field
+        with mock.patch.object(remote_field, 'limit_choices_to', {"city": '北京'}):
+            self.assertEqual(validate(self.publish_list[0], self.author_list[0]), [])
+            self.assertEqual(validate(other, self.author_list[0]), [['publish']] * 3)
+            self.assertEqual(validate(self.publish_list[0], self.author_list[1]), [['authors']] * 3)
+
+
+class BulkOperationTest(TestCase):
+    """ 批量删除、修改在没有信号处理函数时直接使用DELETE/UPDATE语句，并通过rows_*信号通知缓存和索引 """
+
+    @classmethod
+    def setUpTestData(cls):
+        publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        book = models.Book.objects.create(book_name='图书', price=10, publish=publish)
+        for i in range(5):
+            book.authors.add(models.Author.objects.create(author_name='作者%s' % i, age=30 + i, gender=1))
+
+    def test_raw_delete_without_listeners(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(bulk.bulk_delete(models.Author.objects.all(), batch_size=2), 5)
+        sql_list = [query['sql'] for query in queries]
+        # 3批，每一批只有一条删除作者的DELETE语句，不会在Python中加载记录
+        self.assertEqual(len([sql for sql in sql_list if sql.startswith('DELETE FROM "trial_author"')]), 3)
+        self.assertFalse([sql for sql in sql_list if sql.startswith('SELECT') and 'author_name' in sql])
+        self.assertFalse(models.Author.objects.exists())
+        self.assertFalse(models.Book.authors.through.objects.exists())
+
+    def test_delete_with_listener_falls_back_to_delete(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+        signals.post_delete.connect(receiver, sender=models.Author)
+        self.addCleanup(signals.post_delete.disconnect, receiver, sender=models.Author)
+
+        self.assertIsNone(bulk.get_fast_delete_fields(models.Author))
+        pk_list = list(models.Author.objects.values_list('pk', flat=True))
+        self.assertEqual(bulk.bulk_delete(models.Author.objects.all(), batch_size=2), 5)
+        self.assertEqual(sorted(deleted), sorted(pk_list))
+
+    def test_bulk_update_sends_rows_updated(self):
+        received = []
+
+        def receiver(sender, pk_list, field_names, **kwargs):
+            received.append((sender, len(pk_list), field_names))
+        rows_updated.connect(receiver)
+        self.addCleanup(rows_updated.disconnect, receiver)
+
+        version = caching.get_model_version(models.Author)
+        self.assertEqual(bulk.bulk_update(models.Author.objects.all(), 'age', 50, batch_size=2), 5)
+        self.assertEqual(received, [(models.Author, 2, ['age']), (models.Author, 2, ['age']), (models.Author, 1, ['age'])])
+        self.assertNotEqual(caching.get_model_version(models.Author), version)
+        self.assertEqual(models.Author.objects.filter(age=50).count(), 5)
+
+
+class ImportTest(TestCase):
+    """ 分批导入CSV/JSONL文件，关联记录通过显示值查找，每一批的查询次数与行数无关 """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(2):
+            models.Publish.objects.create(publish_name='出版社%s' % i, city='北京', email='p%s@example.com' % i)
+            models.Author.objects.create(author_name='作者%s' % i, age=30 + i, gender=1)
+
+    def setUp(self):
+        patcher = mock.patch.multiple(
+            BookConfig,
+            show_import_btn=True,
+            import_lookup_fields={"publish": 'publish_name', "authors": 'author_name'},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_file(self, content, suffix):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def csv_content(self, count, bad_lines=()):
+        lines = ['书名,图书价格,出版社,作者']
+        for i in range(count):
+            lines.append('图书%s,%s,%s,"作者0,作者1"' % (i, 'abc' if i in bad_lines else 10 + i, '出版社%s' % (i % 2)))
+        return '\n'.join(lines)
+
+    def test_command(self):
+        path = self.write_file(self.csv_content(30, bad_lines=(3, )), '.csv')
+        report_path = self.write_file('', '.csv')
+        out = StringIO()
+        call_command('curd_import', 'trial.book', path, '--chunk-size', '10', '--report', report_path, stdout=out)
+        self.assertIn('新增29条', out.getvalue())
+        self.assertEqual(models.Book.objects.count(), 29)
+        self.assertEqual(models.Book.objects.filter(publish__publish_name='出版社1').count(), 14)
+        with open(report_path, encoding='utf-8-sig') as f:
+            self.assertEqual([row[:2] for row in csv.reader(f)][1:], [['5', 'price']])      # 表头是第1行
+
+    def test_dry_run_and_jsonl(self):
+        content = '\n'.join(json.dumps({
+            "book_name": '图书%s' % i, "price": 10, "publish": '出版社0', "authors": ['作者0', '作者1']
+        }, ensure_ascii=False) for i in range(5))
+        path = self.write_file(content + '\n{broken', '.jsonl')
+        out = StringIO()
+        call_command('curd_import', 'trial.book', path, '--dry-run', stdout=out, stderr=StringIO())
+        self.assertIn('新增5条', out.getvalue())
+        self.assertIn('失败1行', out.getvalue())
+        self.assertEqual(models.Book.objects.count(), 0)
+
+        call_command('curd_import', 'trial.book', path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(models.Book.objects.filter(authors__author_name='作者1').count(), 5)
+
+    def test_query_count_independent_of_rows(self):
+        # 数据库不能返回bulk_create()生成的主键时(SQLite)，有多对多数据的记录需要逐条插入
+        per_row = 0 if connection.features.can_return_ids_from_bulk_insert else 1
+        config_obj = sites.site.get_config('trial', 'book')
+        queries = []
+        for count in (10, 200):
+            importer = config_obj.get_importer()
+            with CaptureQueriesContext(connection) as context:
+                result = importer.run(StringIO(self.csv_content(count)), 'csv')
+            self.assertEqual(result.created, count)
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[1] - queries[0], 190 * per_row)
+
+    def test_import_view(self):
+        upload = SimpleUploadedFile('books.csv', self.csv_content(5, bad_lines=(0, )).encode('utf-8'))
+        response = self.client.post(reverse('curd:trial_book_import'), {"file": upload})
+        job = Job.objects.get()
+        self.assertRedirects(response, '%s?_job=%s' % (reverse('curd:trial_book_show'), job.pk), fetch_redirect_response=False)
+
+        jobs.run_job(jobs.claim_job('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE, job.error)
+        self.assertEqual(models.Book.objects.count(), 4)
+        data = self.client.get(reverse('curd:trial_book_job', args=(job.pk, ))).json()
+        self.assertIn('失败1行', data['message'])
+        response = self.client.get(data['download_url'])
+        self.addCleanup(os.remove, jobs.get_export_path(jobs.get_import_report_name(job)))
+        self.assertIn('price', b''.join(response.streaming_content).decode('utf-8-sig'))
+
+
+class AutocompleteTest(TestCase):
+    """ 外键、多对多字段使用自动补全控件，表单页面不会加载整张关联表 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        cls.author_list = [
+            models.Author.objects.create(author_name='作者%02d' % i, age=30, gender=1) for i in range(30)
+        ]
+        cls.book = models.Book.objects.create(book_name='图书', price=10, publish=cls.publish)
+        cls.book.authors.set(cls.author_list[:2])
+
+    def test_add_page(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('curd:trial_book_add'))
+        self.assertContains(response, 'data-autocomplete-url="%s"' % reverse('curd:trial_author_autocomplete'))
+        self.assertNotContains(response, '作者00')
+        self.assertContains(response, 'popUp(')               # popup添加关联记录仍然可用
+
+    def test_change_page_renders_selected_options_only(self):
+        response = self.client.get(reverse('curd:trial_book_change', args=(self.book.pk, )))
+        self.assertContains(response, '作者01')
+        self.assertNotContains(response, '作者02')
+        self.assertContains(response, '出版社')
+
+    def test_autocomplete_view(self):
+        url = reverse('curd:trial_author_autocomplete')
+        with mock.patch.object(AuthorConfig, 'autocomplete_page_size', 10):
+            with self.assertNumQueries(1):
+                data = self.client.get(url).json()
+            self.assertEqual(len(data['results']), 10)
+            self.assertTrue(data['more'])
+            data = self.client.get(url, {"page": 3}).json()
+            self.assertEqual(len(data['results']), 10)
+            self.assertFalse(data['more'])
+
+        data = self.client.get(url, {"term": '作者1'}).json()
+        self.assertEqual([item['text'] for item in data['results']], ['作者%02d' % i for i in range(10, 20)])
+
+    def test_autocomplete_search_requires_search_permission(self):
+        url = reverse('curd:trial_author_autocomplete')
+        with mock.patch.object(AuthorConfig, 'show_search_form', False):
+            with self.assertNumQueries(0):
+                data = self.client.get(url, {"term": '作者1'}).json()
+            self.assertEqual(data, {"results": [], "more": False})
+            self.assertTrue(self.client.get(url).json()['results'])
+
+    def test_post_still_validates(self):
+        data = {"book_name": '新书', "price": '20', "publish": self.publish.pk, "authors": [self.author_list[5].pk]}
+        self.client.post(reverse('curd:trial_book_add'), data)
+        self.assertEqual(list(models.Book.objects.get(book_name='新书').authors.all()), [self.author_list[5]])
+
+
+class UrlDispatchTest(TestCase):
+    """ 路由只生成一次，按照"<app>/<model>/"通过字典分发 """
+
+    @override_settings(CURD_ENABLE_API=True)
+    def test_resolve(self):
+        match = resolve(reverse('curd:trial_book_change', args=(1, )))
+        self.assertEqual(match.url_name, 'trial_book_change')
+        self.assertEqual(match.app_name, 'curd')
+        self.assertEqual(match.args, ('1', ))
+        self.assertEqual(resolve(reverse('curd:trial_author_api_detail', args=(2, ))).url_name, 'trial_author_api_detail')
+        with self.assertRaises(Resolver404):
+            resolve('/curd/trial/unknown/')
+        with self.assertRaises(Resolver404):
+            resolve('/curd/trial/book/unknown/')
+
+    def test_urls_are_memoized(self):
+        site = sites.CURDSite(enable_api=False)
+        site.register(models.Author, AuthorConfig)
+        self.assertIs(site.urls[0][0], site.urls[0][0])
+        self.assertIs(site.get_url_patterns(), site.get_url_patterns())
+        config_obj = site._registry[models.Author]
+        self.assertIs(config_obj.urls, config_obj.bind_request(None).urls)
+
+    def test_register_after_urls_are_loaded(self):
+        site = sites.CURDSite(enable_api=False)
+        site.register(models.Author, AuthorConfig)
+        resolver = site.urls[0][0]
+        self.assertEqual(resolver.resolve('trial/author/').url_name, 'trial_author_show')
+        with self.assertRaises(Resolver404):
+            resolver.resolve('trial/book/')
+
+        site.register(models.Book, BookConfig)
+        self.assertEqual(resolver.resolve('trial/book/1/delete/').url_name, 'trial_book_delete')
+        self.assertEqual(resolver.reverse('trial_book_change', 3), 'trial/book/3/change/')
+
+
+class LazyRegistrationTest(TestCase):
+    """ 使用配置类的路径注册时，第一次匹配到模型类的url才导入配置类 """
+
+    def setUp(self):
+        # 测试中创建的CURDSite延迟注册的配置类以及它们的全文索引不会影响其他测试
+        for patcher in (mock.patch.dict(sites._lazy_models), mock.patch.dict(search._backends)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_config_is_imported_on_first_hit(self):
+        site = sites.CURDSite(enable_api=False)
+        site.register('trial.Author', 'trial.curd.AuthorConfig')
+        site.register('trial.Publish', 'trial.missing.PublishConfig')
+        resolver = site.urls[0][0]
+
+        # 反向解析使用默认的路由，不需要导入配置类
+        self.assertEqual(resolver.reverse('trial_publish_change', 2), 'trial/publish/2/change/')
+        self.assertIsInstance(site._registry[models.Publish], sites.LazyConfig)
+        with self.assertRaises(ImportError):
+            resolver.resolve('trial/publish/')
+
+        self.assertEqual(resolver.resolve('trial/author/').url_name, 'trial_author_show')
+        self.assertIsInstance(site._registry[models.Author], AuthorConfig)
+        self.assertEqual(resolver.resolve('trial/author/1/like/').url_name, 'trial_author_like')
+        self.assertEqual(resolver.reverse('trial_author_like', 1), 'trial/author/1/like/')
+
+    def test_extra_url_is_reversible_after_loading(self):
+        self.client.get(reverse('curd:trial_author_show'))
+        self.assertEqual(reverse('curd:trial_author_like', args=(1, )), '/curd/trial/author/1/like/')
+
+    def test_writes_before_first_hit_load_config(self):
+        site = sites.CURDSite(enable_api=False)
+        site.register('trial.Book', 'trial.curd.BookConfig')
+        self.assertTrue(signals.post_save.has_listeners(models.Publish))
+
+        # 出版社是图书直接关联的模型类，数据变化时导入BookConfig，并补上这一次变化的版本号和索引
+        with mock.patch.object(caching, 'replay_signal') as replay_signal:
+            publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        self.assertIsInstance(site._registry[models.Book], BookConfig)
+        replay_signal.assert_called_once_with(signals.post_save, models.Publish, instance=publish, created=True,
+                                              update_fields=None, raw=False, using='default')
+
+        # 导入之后不再重复处理
+        with mock.patch.object(caching, 'replay_signal') as replay_signal:
+            publish.save()
+        replay_signal.assert_not_called()
+
+    def test_broken_config_does_not_break_writes(self):
+        site = sites.CURDSite(enable_api=False)
+        site.register('trial.Publish', 'trial.missing.PublishConfig')
+        with self.assertLogs('curd.service.sites', 'ERROR'):
+            models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        self.assertEqual(models.Publish.objects.count(), 1)
+
+    def test_autocomplete_url_does_not_load_related_config(self):
+        site = sites.CURDSite(enable_api=False)
+        site.register(models.Book, BookConfig)
+        site.register('trial.Author', 'trial.missing.AuthorConfig')
+        site.register('trial.Publish', 'trial.missing.PublishConfig')
+        form_class = site._registry[models.Book].get_model_form_class()
+        self.assertEqual(form_class.base_fields['authors'].widget.url, reverse('curd:trial_author_autocomplete'))
+        self.assertIsInstance(site._registry[models.Author], sites.LazyConfig)
+        self.assertIsNone(site._registry[models.Author].config_obj)
+
+    def test_get_config_loads_config(self):
+        site = sites.CURDSite()
+        site.register('trial.Book', 'trial.curd.BookConfig')
+        self.assertIsInstance(site.get_config('trial', 'book'), BookConfig)
+        self.assertIs(site.get_config('trial', 'book'), site._registry[models.Book])
+
+
+@override_settings(CURD_INSTRUMENTATION=True)
+class InstrumentationTest(TestCase):
+    """ 统计每个视图的耗时、SQL查询次数和渲染的行数 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='password', is_staff=True)
+        publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        author = models.Author.objects.create(author_name='作者', age=30, gender=1)
+        for i in range(3):
+            models.Book.objects.create(book_name='图书%s' % i, price=10, publish=publish).authors.set([author])
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.metrics.clear()
+
+    def get_item(self, model, view):
+        for item in instrumentation.metrics.snapshot():
+            if (item['model'], item['view']) == (model, view):
+                return item
+        return None
+
+    def test_show_view(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('curd:trial_book_show'))
+        item = self.get_item('trial.book', 'show_view')
+        self.assertEqual(item['count'], 1)
+        self.assertEqual(item['queries'], len(context.captured_queries))
+        self.assertEqual(item['rows'], BookConfig.per_page_count)
+        self.assertGreater(item['render_time'], 0)
+        self.assertGreaterEqual(item['wall_time'], item['render_time'])
+
+    def test_action_is_recorded_by_name(self):
+        self.client.post(reverse('curd:trial_author_show'), {"action": 'multi_delete', "id": ['1']})
+        self.assertEqual(self.get_item('trial.author', 'multi_delete')['count'], 1)
+        self.assertIsNone(self.get_item('trial.author', 'show_view'))
+
+    def test_metrics_view(self):
+        self.client.get(reverse('curd:trial_book_change', args=(1, )))
+        self.assertEqual(self.client.get(reverse('curd:metrics')).status_code, 403)
+        with self.settings(CURD_METRICS_ALLOWED_IPS=['127.0.0.1']):
+            response = self.client.get(reverse('curd:metrics'))
+        self.assertContains(response, 'curd_view_requests_total{model="trial.book",view="change_view"} 1')
+
+        self.client.force_login(self.staff)
+        data = self.client.get(reverse('curd:metrics'), {"format": 'json'}).json()
+        self.assertEqual([(item['model'], item['view']) for item in data['results']], [('trial.book', 'change_view')])
+
+    def test_debug_footer(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse('curd:trial_book_show'))
+        self.assertContains(response, 'curd-instrumentation')
+        response = self.client.get(reverse('curd:trial_book_show'))
+        self.assertNotContains(response, 'curd-instrumentation')
+
+    def test_duplicated_sql(self):
+        record = instrumentation.ViewRecord('trial.book', 'show_view', keep_sql=True)
+        with connection.execute_wrapper(record):
+            for book in models.Book.objects.all():
+                book.publish.publish_name
+        self.assertEqual(record.queries, 4)
+        self.assertEqual(record.duplicated_sql()[0][1], 3)
+
+    def test_disabled(self):
+        with self.settings(CURD_INSTRUMENTATION=False):
+            self.client.get(reverse('curd:trial_book_show'))
+        self.assertEqual(instrumentation.metrics.snapshot(), [])
+
+
+def author_count(self, obj=None, is_header=False):
+    """ 没有声明depends_on的功能函数，每一行都会查询一次 """
+
+    if is_header:
+        return '作者数'
+    return obj.authors.count()
+
+
+class ColumnProfilerTest(TestCase):
+    """ 统计列表页面每一列的耗时，查询归到触发它的列 """
+
+    @classmethod
+    def setUpTestData(cls):
+        publish = models.Publish.objects.create(publish_name='出版社', city='北京', email='p@example.com')
+        for i in range(3):
+            models.Book.objects.create(book_name='图书%s' % i, price=10, publish=publish)
+        cls.staff = User.objects.create_user('staff', password='password', is_staff=True)
+        cls.user = User.objects.create_user('user', password='password')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_profile_columns(self):
+        self.client.force_login(self.staff)
+        with mock.patch.object(BookConfig, 'list_display', ['book_name', author_count, 'publish']), \
+                mock.patch.object(BookConfig, 'per_page_count', 3):
+            with self.assertLogs('curd.profile', 'INFO') as logs:
+                response = self.client.get(reverse('curd:trial_book_show'), {"_profile": '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('trial.book', logs.output[0])
+
+        report = response.context['show_obj'].profiler.report()
+        profile_dict = {profile.name: profile for profile in report}
+        self.assertEqual(profile_dict['author_count'].queries, 3)
+        self.assertEqual(profile_dict['author_count'].cells, 3)
+        self.assertEqual(profile_dict['publish'].queries, 0)        # 出版社已经通过select_related查询
+        self.assertEqual(profile_dict['book_name'].queries, 0)
+        self.assertEqual(report, sorted(report, key=lambda profile: profile.time, reverse=True))
+
+    def test_only_staff_can_profile(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(profiler.logger, 'info') as log_info:
+            response = self.client.get(reverse('curd:trial_book_show'), {"_profile": '1'})
+        log_info.assert_not_called()
+        self.assertIsNone(response.context['show_obj'].profiler)
+
+    def test_profile_bypasses_list_cache(self):
+        with mock.patch.object(BookConfig, 'list_cache_timeout', 60), \
+                mock.patch.object(BookConfig, 'profile_columns', True):
+            self.client.get(reverse('curd:trial_book_show'))
+            with self.assertLogs('curd.profile', 'INFO'):
+                self.client.get(reverse('curd:trial_book_show'))
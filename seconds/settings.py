@@ -122,3 +122,12 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 TEMPLATE_DIRS = (os.path.join(BASE_DIR,  'templates'),)
+
+# 为每个注册的模型类生成json接口: /curd/api/<app_label>/<model_name>/，默认关闭，
+# 开启之后只有has_api_permission()允许的用户(默认为staff用户)可以使用
+CURD_ENABLE_API = False
+
+# 统计每个视图的耗时、SQL查询次数等: DEBUG时在页面底部显示，/curd/metrics/提供Prometheus格式的汇总数据，默认关闭。
+# 统计数据接口只允许staff用户以及CURD_METRICS_ALLOWED_IPS中的地址访问
+CURD_INSTRUMENTATION = False
+CURD_METRICS_ALLOWED_IPS = []
@@ -1,12 +1,12 @@
 from django.apps import AppConfig
-from django.utils.module_loading import autodiscover_modules
 
 
 class TrialConfig(AppConfig):
     name = 'trial'
 
-    def ready(self):
-        """ 项目启动时，自动加载已注册所有应用中的curd.py文件
-
-        """
-        autodiscover_modules('curd')
+    # 由curd应用在启动时延迟注册，第一次访问模型类的url时才导入curd.py
+    curd_configs = {
+        'Publish': 'trial.curd.PublishConfig',
+        'Author': 'trial.curd.AuthorConfig',
+        'Book': 'trial.curd.BookConfig',
+    }
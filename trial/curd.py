@@ -1,9 +1,10 @@
 from curd.service import sites
 from django.utils.safestring import mark_safe
-from django.urls import re_path, reverse
+from django.urls import re_path
 from django.forms import ModelForm, widgets
 from django.shortcuts import HttpResponse
 from curd.service.views import SearchOption
+from curd.service.search import FullTextSearchBackend
 
 from trial import models
 
@@ -48,8 +49,8 @@ class BookModelForm(ModelForm):
         widgets = {
             'book_name': widgets.TextInput(attrs={"class": 'form-control', "placeholder": '图书名'}),
             'price': widgets.TextInput(attrs={"class": 'form-control', "placeholder": '价格'}),
-            'authors': widgets.SelectMultiple(attrs={"class": 'form-control'},choices=models.Author.objects.all()),
-            'publish': widgets.Select(attrs={"class": 'form-control'},choices=models.Publish.objects.all()),
+            'authors': widgets.SelectMultiple(attrs={"class": 'form-control'}),
+            'publish': widgets.Select(attrs={"class": 'form-control'}),
         }
 
 class AuthorConfig(sites.CURDConfig):
@@ -105,7 +106,7 @@ class AuthorConfig(sites.CURDConfig):
         """
 
         alias = "curd:%s_%s_like" % self.get_app_model()
-        return reverse(alias, args=(nid, ))
+        return self.reverse_url(alias, nid)
 
     def like_this(self, obj=None, is_header=False):
         """ 列表页面"喜欢"功能链接
@@ -120,6 +121,8 @@ class AuthorConfig(sites.CURDConfig):
             return '喜欢吗'
         return mark_safe('<a href="%s">喜欢这个记录</a>' % self.get_like_url(obj.id))
 
+    like_this.depends_on = ()
+
     def get_list_display(self):
         """ 覆盖基类CURDConfig中的get_list_display方法，并添加
             一个，如果只是想添加一个功能，可以不覆盖姊方法，仅仅将创建的函数通过"list_display"传递即可
@@ -136,9 +139,11 @@ class AuthorConfig(sites.CURDConfig):
         return data
 
     model_form_class = AuthorModelForm
-    action_list = [multi_delete,]
+    action_list = [multi_delete, sites.CURDConfig.bulk_delete, sites.CURDConfig.bulk_update]
+    bulk_update_fields = ['age', 'gender']
     list_display = ['author_name', 'age', 'gender']
     search_list = ['author_name__contains', 'gender__contains']
+    search_backend = FullTextSearchBackend     # 执行"python manage.py curd_rebuild_search"之后使用全文索引
 
 
 class BookConfig(sites.CURDConfig):
@@ -162,7 +167,7 @@ class BookConfig(sites.CURDConfig):
         """
 
         alias = "curd:%s_%s_like" % self.get_app_model()
-        return reverse(alias, args=(nid, ))
+        return self.reverse_url(alias, nid)
 
     def like_this(self, obj=None, is_header=False):
         """ 列表页面"喜欢"功能链接
@@ -177,6 +182,8 @@ class BookConfig(sites.CURDConfig):
             return '喜欢吗'
         return mark_safe('<a href="%s">喜欢这个记录</a>' % self.get_like_url(obj.id))
 
+    like_this.depends_on = ()
+
     def author_display(self, obj=None, is_header=False):
         """ 定制作者字段在表格中显示的数据，如果默认会显示"trial.Author.None"
         Args:
@@ -193,6 +200,10 @@ class BookConfig(sites.CURDConfig):
         authors = ','.join(author_list)
         return authors
 
+    author_display.depends_on = ('authors', )       # 列表页面会通过prefetch_related一次性查询所有作者
+    author_display.exportable = True                # 导出时作为一列
+
+    show_export_btn = True
     list_display = ['book_name', 'price', author_display, 'publish', like_this]
     combain_search_field_list = [
         SearchOption('authors', is_multi=True),
@@ -204,7 +215,3 @@ class BookConfig(sites.CURDConfig):
 class PublishConfig(sites.CURDConfig):
     list_display = ['publish_name', 'city', 'email']
     model_form_class = PublishModelForm
-
-sites.site.register(models.Publish, PublishConfig)
-sites.site.register(models.Author, AuthorConfig)
-sites.site.register(models.Book, BookConfig)
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author_name', models.CharField(max_length=32, verbose_name='作者名称')),
+                ('age', models.IntegerField(verbose_name='年龄')),
+                ('gender', models.IntegerField(choices=[(1, 'male'), (2, 'female')], verbose_name='性别')),
+            ],
+            options={
+                'verbose_name_plural': '作者表',
+            },
+        ),
+        migrations.CreateModel(
+            name='Publish',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('publish_name', models.CharField(max_length=32, verbose_name='出版社名称')),
+                ('city', models.CharField(max_length=32, verbose_name='所在城市')),
+                ('email', models.EmailField(max_length=254, verbose_name='联系邮箱')),
+            ],
+            options={
+                'verbose_name_plural': '出版社表',
+            },
+        ),
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_name', models.CharField(max_length=32, verbose_name='书名')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='图书价格')),
+                ('authors', models.ManyToManyField(to='trial.Author', verbose_name='作者')),
+                ('publish', models.ForeignKey(on_delete=True, to='trial.Publish', verbose_name='出版社')),
+            ],
+            options={
+                'verbose_name_plural': '图书表',
+            },
+        ),
+    ]